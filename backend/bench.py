@@ -0,0 +1,784 @@
+"""Local benchmarks for the JobPortal API.
+
+Run from the backend directory, e.g.::
+
+    python bench.py db-latency --concurrency 200
+    python bench.py db-latency --mongo-url mongodb://localhost:27017/
+    python bench.py load --save baseline.json
+    python bench.py load --compare baseline.json
+    python bench.py jwt
+    python bench.py serialize
+    python bench.py search --users 1000000
+    python bench.py burst --clients 1000
+    python bench.py stats-stream --clients 5000
+    python bench.py cold-start --budget-ms 1000
+    python bench.py degraded-db --concurrency 50
+"""
+import asyncio
+import json
+import random
+import math
+import subprocess
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from typing import Optional
+
+import typer
+
+import config
+import storage
+from storage import MemoryUserStore
+
+cli = typer.Typer(help="JobPortal API benchmarks")
+
+
+@cli.callback()
+def bench():
+    """JobPortal API benchmarks."""
+
+
+def percentile(sorted_values, pct: float) -> float:
+    if not sorted_values:
+        return 0.0
+    index = max(0, math.ceil(pct / 100.0 * len(sorted_values)) - 1)
+    return sorted_values[index]
+
+
+def summarize(name: str, latencies, elapsed: float, errors: int = 0) -> dict:
+    values = sorted(latencies)
+    return {
+        "name": name,
+        "requests": len(values) + errors,
+        "errors": errors,
+        "throughput": (len(values) + errors) / elapsed if elapsed else 0.0,
+        "p50_ms": percentile(values, 50) * 1000,
+        "p95_ms": percentile(values, 95) * 1000,
+        "p99_ms": percentile(values, 99) * 1000,
+    }
+
+
+def print_report(results):
+    typer.echo(f"{'scenario':<28}{'req':>8}{'err':>6}{'req/s':>11}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}")
+    for r in results:
+        typer.echo(
+            f"{r['name']:<28}{r['requests']:>8}{r['errors']:>6}{r['throughput']:>11.1f}"
+            f"{r['p50_ms']:>10.2f}{r['p95_ms']:>10.2f}{r['p99_ms']:>10.2f}"
+        )
+
+
+# In-process stand-in for a Mongo round-trip of fixed latency. The blocking
+# variant behaves like pymongo (holds the thread), the async one like Motor.
+class SimulatedCollection:
+    def __init__(self, latency: float):
+        self.latency = latency
+
+    def find_one_blocking(self, query, projection=None):
+        time.sleep(self.latency)
+        return None
+
+    async def find_one(self, query, projection=None):
+        await asyncio.sleep(self.latency)
+        return None
+
+
+async def run_concurrent(lookup, concurrency: int, rounds: int):
+    """Issue ``concurrency`` simultaneous lookups per round.
+
+    Latency is measured from the moment the round is released, so time spent
+    waiting for a blocked event loop is counted, as it is for real clients.
+    """
+    latencies = []
+
+    async def one(released: float):
+        await lookup()
+        latencies.append(time.perf_counter() - released)
+
+    start = time.perf_counter()
+    for _ in range(rounds):
+        released = time.perf_counter()
+        await asyncio.gather(*(one(released) for _ in range(concurrency)))
+    return latencies, time.perf_counter() - start
+
+
+@cli.command("db-latency")
+def db_latency(
+    mongo_url: Optional[str] = typer.Option(None, help="Benchmark a local mongod instead of the stand-in"),
+    concurrency: int = typer.Option(100, help="Simultaneous lookups per round"),
+    rounds: int = typer.Option(10),
+    latency_ms: float = typer.Option(2.0, help="Stand-in round-trip latency"),
+):
+    """p99 latency of user lookups: blocking pymongo vs the async store."""
+
+    async def main():
+        if mongo_url:
+            from pymongo import MongoClient
+
+            blocking_client = MongoClient(mongo_url)
+            blocking = blocking_client[config.MONGO_DB_NAME].users
+            store = storage.connect(mongo_url, engine="mongo")
+
+            async def before():
+                blocking.find_one({"id": str(uuid.uuid4())}, storage.PUBLIC_PROJECTION)
+        else:
+            from mongostore import MongoUserStore
+
+            collection = SimulatedCollection(latency_ms / 1000.0)
+            store = MongoUserStore(None, collection)
+
+            async def before():
+                collection.find_one_blocking({"id": str(uuid.uuid4())})
+
+        async def after():
+            await store.find_by_id(str(uuid.uuid4()))
+
+        results = []
+        for name, lookup in (("blocking driver (before)", before), ("async store (after)", after)):
+            latencies, elapsed = await run_concurrent(lookup, concurrency, rounds)
+            results.append(summarize(name, latencies, elapsed))
+        if mongo_url:
+            blocking_client.close()
+            storage.close()
+        return results
+
+    print_report(asyncio.run(main()))
+
+
+@contextmanager
+def boot_server(port: int, mongo_url: Optional[str] = None, rate_limits: bool = False):
+    """Run server.app under uvicorn in a background thread.
+
+    Without ``mongo_url`` the app runs on the in-memory storage engine.
+    Auth rate limits are lifted unless ``rate_limits`` is set, since every
+    benchmark client shares one IP.
+    """
+    import uvicorn
+    import ratelimit
+
+    if not rate_limits:
+        for rule in ratelimit.DEFAULT_RULES:
+            ratelimit.DEFAULT_RULES[rule] = (10 ** 9, 1.0)
+
+    engine, url = config.STORAGE_ENGINE, config.MONGO_URL
+    config.STORAGE_ENGINE = "mongo" if mongo_url else "memory"
+    config.MONGO_URL = mongo_url or url
+    try:
+        import server
+
+        srv = uvicorn.Server(uvicorn.Config(server.app, host="127.0.0.1", port=port, log_level="warning"))
+        thread = threading.Thread(target=srv.run, daemon=True)
+        thread.start()
+        while not srv.started:
+            if not thread.is_alive():
+                raise RuntimeError("API server failed to start")
+            time.sleep(0.05)
+        try:
+            yield f"http://127.0.0.1:{port}"
+        finally:
+            srv.should_exit = True
+            thread.join()
+    finally:
+        config.STORAGE_ENGINE, config.MONGO_URL = engine, url
+
+
+async def drive(name: str, make_request, total: int, concurrency: int) -> dict:
+    """Run ``total`` requests from ``concurrency`` closed-loop clients."""
+    import httpx
+
+    latencies = []
+    errors = 0
+    jobs = iter(range(total))
+
+    async def client():
+        nonlocal errors
+        for i in jobs:
+            started = time.perf_counter()
+            try:
+                response = await make_request(i)
+                ok = response.status_code < 400
+            except httpx.HTTPError:
+                ok = False
+            if ok:
+                latencies.append(time.perf_counter() - started)
+            else:
+                errors += 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*(client() for _ in range(concurrency)))
+    result = summarize(name, latencies, time.perf_counter() - start, errors)
+    result["error_rate"] = errors / total if total else 0.0
+    return result
+
+
+async def run_load(base_url: str, users: int, requests: int, concurrency: int) -> list:
+    import httpx
+
+    run_id = uuid.uuid4().hex[:8]
+    password = "BenchPassword123!"
+    accounts = [
+        {
+            "name": f"Bench User {i}",
+            "email": f"bench-{run_id}-{i}@example.com",
+            "password": password,
+            "user_type": ("hirer", "applicant", "freelancer")[i % 3],
+        }
+        for i in range(users)
+    ]
+    tokens = []
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=60.0) as http:
+
+        async def signup(i):
+            response = await http.post("/api/signup", json=accounts[i])
+            if response.status_code == 200:
+                tokens.append(response.json()["access_token"])
+            return response
+
+        async def signin(i):
+            account = accounts[i % users]
+            return await http.post("/api/signin", json={"email": account["email"], "password": password})
+
+        def auth(i):
+            return {"Authorization": f"Bearer {tokens[i % len(tokens)]}"}
+
+        async def profile(i):
+            return await http.get("/api/profile", headers=auth(i))
+
+        async def list_users(i):
+            return await http.get("/api/users", headers=auth(i))
+
+        async def platform_stats(i):
+            return await http.get("/api/stats")
+
+        results = [await drive("signup", signup, users, concurrency)]
+        if not tokens:
+            raise RuntimeError("No signup succeeded; cannot run authenticated scenarios")
+        for name, make_request in (
+            ("signin", signin),
+            ("profile", profile),
+            ("users", list_users),
+            ("stats", platform_stats),
+        ):
+            # bcrypt-bound scenarios get the smaller budget
+            total = users if name == "signin" else requests
+            results.append(await drive(name, make_request, total, concurrency))
+    return results
+
+
+def git_commit() -> Optional[str]:
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(results, baseline: dict, tolerance: float) -> list:
+    """Scenarios whose p99 or throughput regressed by more than ``tolerance``."""
+    previous = {r["name"]: r for r in baseline["results"]}
+    regressions = []
+    typer.echo(f"\ncompared with {baseline['meta'].get('commit')} ({baseline['meta'].get('timestamp')})")
+    for r in results:
+        old = previous.get(r["name"])
+        if not old:
+            continue
+        p99_change = (r["p99_ms"] - old["p99_ms"]) / old["p99_ms"] if old["p99_ms"] else 0.0
+        rps_change = (r["throughput"] - old["throughput"]) / old["throughput"] if old["throughput"] else 0.0
+        flag = ""
+        if p99_change > tolerance or rps_change < -tolerance or r["errors"] > old["errors"]:
+            flag = "  REGRESSION"
+            regressions.append(r["name"])
+        typer.echo(f"{r['name']:<28}p99 {p99_change:+8.1%}   req/s {rps_change:+8.1%}{flag}")
+    return regressions
+
+
+@cli.command("jwt")
+def jwt_throughput(
+    tokens: int = typer.Option(1000, help="Distinct tokens in the working set"),
+    rounds: int = typer.Option(20, help="Passes over the working set"),
+):
+    """Tokens verified per second for each JWT backend, with and without the cache."""
+    from tokens import CODECS, build_token_service
+
+    expires = datetime.utcnow() + timedelta(minutes=30)
+    typer.echo(f"{'backend':<10}{'cache':<8}{'verified/s':>14}")
+    for backend in CODECS:
+        for cache_size in (0, tokens):
+            service = build_token_service(backend, cache_size=cache_size)
+            working_set = [service.encode({"sub": str(uuid.uuid4()), "exp": expires}) for _ in range(tokens)]
+            start = time.perf_counter()
+            for _ in range(rounds):
+                for token in working_set:
+                    service.decode(token)
+            rate = tokens * rounds / (time.perf_counter() - start)
+            typer.echo(f"{backend:<10}{'on' if cache_size else 'off':<8}{rate:>14,.0f}")
+
+
+@cli.command("serialize")
+def serialize(
+    page_size: int = typer.Option(50, help="Users per /api/users page"),
+    iterations: int = typer.Option(5000),
+):
+    """Per-response serialization cost: FastAPI's default path vs the orjson fast path."""
+    import json as stdlib_json
+
+    import orjson
+    from fastapi.encoders import jsonable_encoder
+    from pydantic import TypeAdapter
+
+    from server import User, public_user
+
+    def row(i):
+        return {
+            "id": str(uuid.uuid4()),
+            "name": f"User {i}",
+            "email": f"user{i}@example.com",
+            "user_type": "applicant",
+            "created_at": datetime.utcnow(),
+        }
+
+    def default_render(content):
+        # What JSONResponse.render does after jsonable_encoder
+        return stdlib_json.dumps(
+            jsonable_encoder(content), ensure_ascii=False, allow_nan=False, separators=(",", ":")
+        ).encode()
+
+    profile_doc = row(0)
+    page = [row(i) for i in range(page_size)]
+    user_adapter = TypeAdapter(User)
+
+    def profile_before():
+        # build model in handler, re-validate through response_model, encode
+        default_render(user_adapter.validate_python(User(**profile_doc)))
+
+    def profile_after():
+        orjson.dumps(public_user(profile_doc).model_dump())
+
+    def users_before():
+        formatted = [{k: u[k] for k in ("id", "name", "email", "user_type", "created_at")} for u in page]
+        body = {"users": formatted, "total": len(formatted), "next_cursor": None}
+        # no response_model on this route, but jsonable_encoder still walks every row
+        default_render(body)
+
+    def users_after():
+        orjson.dumps({"users": page, "total": len(page), "next_cursor": None})
+
+    typer.echo(f"{'endpoint':<16}{'before us':>12}{'after us':>12}{'saved us':>12}{'speedup':>10}")
+    for name, before, after in (
+        ("/api/profile", profile_before, profile_after),
+        (f"/api/users[{page_size}]", users_before, users_after),
+    ):
+        timings = []
+        for fn in (before, after):
+            start = time.perf_counter()
+            for _ in range(iterations):
+                fn()
+            timings.append((time.perf_counter() - start) / iterations * 1e6)
+        typer.echo(
+            f"{name:<16}{timings[0]:>12.1f}{timings[1]:>12.1f}"
+            f"{timings[0] - timings[1]:>12.1f}{timings[0] / timings[1]:>9.1f}x"
+        )
+
+
+SYLLABLES = ("an", "bel", "cor", "da", "el", "fin", "gar", "hal", "is", "jo", "ka", "lin",
+             "mar", "nor", "ol", "per", "quin", "ros", "sam", "tor", "ul", "ven", "wil", "yan")
+
+
+def synthetic_users(count: int, seed: int = 1):
+    """``count`` users with syllable-built names, one per millisecond of created_at."""
+    rng = random.Random(seed)
+    base = datetime(2024, 1, 1)
+    for i in range(count):
+        first = "".join(rng.choice(SYLLABLES) for _ in range(2)).title()
+        last = "".join(rng.choice(SYLLABLES) for _ in range(3)).title()
+        yield {
+            "id": str(uuid.UUID(int=rng.getrandbits(128))),
+            "name": f"{first} {last}",
+            "email": f"{first.lower()}.{last.lower()}{i}@example.com",
+            "password": "x",
+            "user_type": ("hirer", "applicant", "freelancer")[i % 3],
+            "created_at": base + timedelta(milliseconds=i),
+        }
+
+
+@cli.command("search")
+def search_latency(
+    users: int = typer.Option(1_000_000, help="Users in the searched store"),
+    queries: int = typer.Option(500, help="Queries per scenario"),
+    page_size: int = typer.Option(50),
+    mongo_url: Optional[str] = typer.Option(None, help="Search a throwaway collection in a local mongod"),
+):
+    """Latency of one /api/users/search page at ``--users`` users, by query selectivity."""
+
+    async def main():
+        started = time.perf_counter()
+        population = list(synthetic_users(users))
+        if mongo_url:
+            from mongostore import MongoUserStore
+
+            store = storage.connect(mongo_url, engine="mongo")
+            collection = store.database.search_bench_users
+            store = MongoUserStore(store.client, collection, store.database.search_bench_stats)
+            await collection.drop()
+            for i in range(0, users, 10_000):
+                await store.insert_many(population[i:i + 10_000])
+            await store.ensure_indexes()
+        else:
+            store = MemoryUserStore()
+            store.load(population)
+        typer.echo(f"loaded {users:,} users in {time.perf_counter() - started:.1f}s")
+
+        rng = random.Random(2)
+        sample = rng.sample(population, min(queries, users))
+        scenarios = (
+            ("exact email", lambda u: (u["email"], None)),
+            ("name word, 4 chars", lambda u: (u["name"].split()[1][:4], None)),
+            ("first + last prefix", lambda u: (f"{u['name'].split()[0][:3]} {u['name'].split()[1][:3]}", None)),
+            ("name word + type", lambda u: (u["name"].split()[1][:4], u["user_type"])),
+            ("2 chars (broad)", lambda u: (u["name"][:2], None)),
+        )
+        results = []
+        for name, make_query in scenarios:
+            latencies = []
+            start = time.perf_counter()
+            for user in sample:
+                query, user_type = make_query(user)
+                issued = time.perf_counter()
+                await store.search(query, user_type, limit=page_size + 1).to_list(length=page_size + 1)
+                latencies.append(time.perf_counter() - issued)
+            results.append(summarize(name, latencies, time.perf_counter() - start))
+        if mongo_url:
+            await collection.drop()
+            await store.stats_collection.drop()
+            storage.close()
+        return results
+
+    print_report(asyncio.run(main()))
+
+
+class CountingStore(MemoryUserStore):
+    """Memory engine whose reads take ``latency`` seconds and are counted."""
+
+    def __init__(self, latency: float):
+        super().__init__()
+        self.latency = latency
+        self.ops = 0
+
+    async def _round_trip(self):
+        self.ops += 1
+        await asyncio.sleep(self.latency)
+
+    async def find_by_id(self, user_id):
+        await self._round_trip()
+        return await super().find_by_id(user_id)
+
+    async def count_by_user_type(self):
+        await self._round_trip()
+        return await super().count_by_user_type()
+
+
+@cli.command("burst")
+def burst(
+    clients: int = typer.Option(1000, help="Concurrent clients released together"),
+    distinct_users: int = typer.Option(10, help="Users the clients' tokens belong to"),
+    rounds: int = typer.Option(5, help="Bursts per scenario, each against cold caches"),
+    latency_ms: float = typer.Option(5.0, help="Simulated DB round-trip"),
+):
+    """DB operations behind a burst of identical /api/profile and /api/stats reads.
+
+    Runs the app in process with caches cleared before every burst, with
+    request coalescing off and then on.
+    """
+    import httpx
+
+    import server
+    import stats
+
+    async def main():
+        store = storage.install(CountingStore(latency_ms / 1000.0))
+        now = datetime.utcnow()
+        store.load([
+            {"id": str(uuid.uuid4()), "name": f"Burst User {i}", "email": f"burst{i}@example.com",
+             "password": "x", "user_type": "applicant", "created_at": now + timedelta(milliseconds=i)}
+            for i in range(distinct_users)
+        ])
+        stats_service = await stats.start(store)
+        tokens = [server.create_access_token({"sub": user_id}) for user_id in store.by_id]
+        flights = (server.principal_flight, stats_service.flight)
+        transport = httpx.ASGITransport(app=server.app)
+        results = []
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as http:
+            for path in ("/api/profile", "/api/stats"):
+                for coalesce in (False, True):
+                    for flight in flights:
+                        flight.enabled = coalesce
+                    latencies = []
+                    errors = 0
+                    store.ops = 0
+                    elapsed = 0.0
+
+                    async def one(i, released):
+                        nonlocal errors
+                        headers = {"Authorization": f"Bearer {tokens[i % len(tokens)]}"}
+                        response = await http.get(path, headers=headers)
+                        if response.status_code == 200:
+                            latencies.append(time.perf_counter() - released)
+                        else:
+                            errors += 1
+
+                    for _ in range(rounds):
+                        server.principal_cache.clear()
+                        stats_service._expires_at = 0.0
+                        released = time.perf_counter()
+                        await asyncio.gather(*(one(i, released) for i in range(clients)))
+                        elapsed += time.perf_counter() - released
+                    result = summarize(f"{path} {'coalesced' if coalesce else 'uncoalesced'}",
+                                       latencies, elapsed, errors)
+                    result["db_ops"] = store.ops
+                    results.append(result)
+        stats.shutdown()
+        storage.close()
+        return results
+
+    results = asyncio.run(main())
+    print_report(results)
+    typer.echo(f"\n{'scenario':<28}{'db ops':>8}{'ops/burst':>11}{'db ops/s':>11}")
+    for r in results:
+        elapsed = r["requests"] / r["throughput"] if r["throughput"] else 0.0
+        typer.echo(
+            f"{r['name']:<28}{r['db_ops']:>8}{r['db_ops'] / rounds:>11.1f}"
+            f"{r['db_ops'] / elapsed if elapsed else 0.0:>11.1f}"
+        )
+
+
+@cli.command("stats-stream")
+def stats_stream(
+    clients: int = typer.Option(5000, help="Connected /api/stats/stream clients"),
+    updates: int = typer.Option(10, help="Stats changes pushed to the clients"),
+    interval: float = typer.Option(0.2, help="Aggregator refresh interval in seconds"),
+    latency_ms: float = typer.Option(5.0, help="Simulated DB round-trip"),
+):
+    """DB queries and fan-out latency behind ``--clients`` live stats streams.
+
+    Drives the stream generators in process, without HTTP, on interval
+    refreshes; a user is added before each update.
+    """
+    import stats
+    import statsstream
+
+    published = {}
+
+    class TimedBroadcaster(statsstream.StatsBroadcaster):
+        def _publish(self, payload):
+            super()._publish(payload)
+            published.setdefault(self.published, time.perf_counter())
+
+    async def main():
+        store = CountingStore(latency_ms / 1000.0)
+        stats_service = stats.StatsService(store)
+        broadcaster = TimedBroadcaster(stats_service, store, interval=interval, change_stream=False)
+        await broadcaster.start()
+        latencies = []
+
+        async def client():
+            async for frame in broadcaster.events():
+                if frame.startswith(b"id: "):
+                    event_id = int(frame[4:frame.index(b"\n")])
+                    if event_id > 1:
+                        latencies.append(time.perf_counter() - published[event_id])
+
+        tasks = [asyncio.create_task(client()) for _ in range(clients)]
+        await asyncio.sleep(interval)
+        now = datetime.utcnow()
+        for i in range(updates):
+            await store.insert({"id": str(uuid.uuid4()), "name": f"Stream User {i}", "email": f"s{i}@example.com",
+                                "password": "x", "user_type": "hirer", "created_at": now})
+            await asyncio.sleep(interval)
+        refreshes = store.ops
+        await broadcaster.stop()
+        await asyncio.gather(*tasks)
+        return refreshes, latencies, broadcaster.published
+
+    refreshes, latencies, events = asyncio.run(main())
+    latencies.sort()
+    typer.echo(f"{clients} clients, {events} snapshots published, {len(latencies)} deliveries")
+    typer.echo(f"db queries: {refreshes} (one per refresh; polling clients would each send an HTTP request)")
+    typer.echo(
+        f"fan-out latency ms: p50 {percentile(latencies, 50) * 1000:.2f}  "
+        f"p99 {percentile(latencies, 99) * 1000:.2f}  max {percentile(latencies, 100) * 1000:.2f}"
+    )
+
+
+@cli.command("cold-start")
+def cold_start(
+    runs: int = typer.Option(7, help="Fresh interpreters to start"),
+    budget_ms: float = typer.Option(1000.0, help="Fail if the median process-to-first-response exceeds this"),
+    engine: str = typer.Option("memory", help="Storage engine the lifespan opens"),
+    path: str = typer.Option("/api/stats", help="First request served after startup"),
+):
+    """Time from launching a worker process to its first response, by phase.
+
+    Each run imports server, runs the lifespan and serves ``path`` in a new
+    interpreter; ``manage.py profile-startup`` shows where the time goes.
+    """
+    import statistics
+
+    import startup
+
+    samples = [startup.measure(path, engine) for _ in range(runs)]
+    typer.echo(f"{'phase':<22}{'median ms':>11}{'max ms':>10}")
+    for phase, label in startup.PHASES:
+        values = [sample[phase] for sample in samples]
+        typer.echo(f"{label:<22}{statistics.median(values):>11.1f}{max(values):>10.1f}")
+
+    median = statistics.median(sample["spawn_ms"] for sample in samples)
+    if median > budget_ms:
+        typer.echo(f"\ncold start {median:.0f} ms is over the {budget_ms:.0f} ms budget")
+        raise typer.Exit(code=1)
+    typer.echo(f"\ncold start {median:.0f} ms, within the {budget_ms:.0f} ms budget")
+
+
+# (name, chaos settings) for degraded-db, mildest first
+DEGRADED_SCENARIOS = (
+    ("healthy", {"latency": 0.002}),
+    ("slow", {"latency": 0.2, "jitter": 3.0}),
+    ("errors", {"error_rate": 0.5}),
+    ("stalls", {"stall_rate": 0.05}),
+    ("outage", {"stall_rate": 1.0}),
+)
+
+
+@cli.command("degraded-db")
+def degraded_db(
+    concurrency: int = typer.Option(50, help="Clients sending /api/users requests back to back"),
+    duration: float = typer.Option(3.0, help="Seconds each scenario runs"),
+    users: int = typer.Option(1000, help="Users seeded in the in-memory store"),
+    stall_seconds: float = typer.Option(10.0, help="How long a stalled call hangs"),
+    timeout_ms: float = typer.Option(config.DB_OPERATION_TIMEOUT_MS, help="Per-call DB timeout"),
+    unguarded: bool = typer.Option(True, help="Also run each scenario without the guard"),
+    slack_ms: float = typer.Option(250.0, help="Allowed p99 above the request deadline"),
+):
+    """Tail latency of /api/users while the database is slow, failing or stalled.
+
+    Runs the app in process over a seeded in-memory store with faults
+    injected by ``chaos.ChaosUserStore``, with the storage guard (timeouts,
+    deadline, circuit breaker) and, for comparison, without. Fails if a
+    guarded p99 exceeds ``DB_REQUEST_DEADLINE_MS`` plus ``--slack-ms``.
+    """
+    import httpx
+
+    import server
+    from chaos import ChaosUserStore
+    from resilience import CircuitBreaker, GuardedUserStore
+
+    async def main():
+        engine = MemoryUserStore()
+        engine.load(synthetic_users(users))
+        tokens = [server.create_access_token({"sub": user_id}) for user_id in list(engine.by_id)[:10]]
+        # Unguarded faults escape as 500s rather than raising in the client
+        transport = httpx.ASGITransport(app=server.app, raise_app_exceptions=False)
+        results = []
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as http:
+            for name, settings in DEGRADED_SCENARIOS:
+                for guarded in (True, False) if unguarded else (True,):
+                    chaos = ChaosUserStore(engine, latency=0.0, jitter=0.0, error_rate=0.0, stall_rate=0.0,
+                                           stall_seconds=stall_seconds, seed=1)
+                    chaos.configure(**settings)
+                    store = chaos
+                    if guarded:
+                        store = GuardedUserStore(chaos, timeout_ms / 1000, CircuitBreaker(f"bench_{name}"))
+                    storage.install(store)
+                    server.principal_cache.clear()
+                    latencies = []
+                    statuses = {}
+                    ends = time.perf_counter() + duration
+
+                    async def client(i):
+                        headers = {"Authorization": f"Bearer {tokens[i % len(tokens)]}"}
+                        while time.perf_counter() < ends:
+                            started = time.perf_counter()
+                            response = await http.get("/api/users", params={"limit": 20}, headers=headers)
+                            latencies.append(time.perf_counter() - started)
+                            statuses[response.status_code] = statuses.get(response.status_code, 0) + 1
+
+                    started = time.perf_counter()
+                    await asyncio.gather(*(client(i) for i in range(concurrency)))
+                    latencies.sort()
+                    results.append({
+                        "name": name,
+                        "guarded": guarded,
+                        "requests": len(latencies),
+                        "ok": statuses.get(200, 0),
+                        "unavailable": statuses.get(503, 0),
+                        "other": sum(count for code, count in statuses.items() if code not in (200, 503)),
+                        "throughput": len(latencies) / (time.perf_counter() - started),
+                        "p50_ms": percentile(latencies, 50) * 1000,
+                        "p99_ms": percentile(latencies, 99) * 1000,
+                        "max_ms": percentile(latencies, 100) * 1000,
+                        "opened": store.breaker.opened if guarded else None,
+                    })
+        storage.close()
+        return results
+
+    results = asyncio.run(main())
+    typer.echo(f"{'scenario':<10}{'guard':>7}{'req':>8}{'200':>8}{'503':>8}{'other':>7}{'req/s':>10}"
+               f"{'p50 ms':>10}{'p99 ms':>10}{'max ms':>10}{'opened':>8}")
+    for r in results:
+        typer.echo(
+            f"{r['name']:<10}{'on' if r['guarded'] else 'off':>7}{r['requests']:>8}{r['ok']:>8}"
+            f"{r['unavailable']:>8}{r['other']:>7}{r['throughput']:>10.1f}{r['p50_ms']:>10.1f}"
+            f"{r['p99_ms']:>10.1f}{r['max_ms']:>10.1f}{'' if r['opened'] is None else r['opened']:>8}"
+        )
+
+    bound = config.DB_REQUEST_DEADLINE_MS + slack_ms
+    over = [r["name"] for r in results if r["guarded"] and r["p99_ms"] > bound]
+    if over:
+        typer.echo(f"\nguarded p99 over {bound:.0f} ms in: {', '.join(over)}")
+        raise typer.Exit(code=1)
+    typer.echo(f"\nguarded p99 within {bound:.0f} ms in every scenario")
+
+
+@cli.command("load")
+def load(
+    url: Optional[str] = typer.Option(None, help="Benchmark an already running server instead of booting one"),
+    mongo_url: Optional[str] = typer.Option(None, help="Boot against a local mongod instead of the in-memory store"),
+    port: int = typer.Option(8765, help="Port for the booted server"),
+    users: int = typer.Option(50, help="Accounts to sign up; also the signin request count"),
+    requests: int = typer.Option(2000, help="Requests per read scenario"),
+    concurrency: int = typer.Option(50),
+    save: Optional[str] = typer.Option(None, help="Write results as baseline JSON to this path"),
+    compare_to: Optional[str] = typer.Option(None, "--compare", help="Baseline JSON to compare against"),
+    tolerance: float = typer.Option(0.2, help="Allowed relative regression before failing"),
+    rate_limits: bool = typer.Option(False, help="Keep the auth rate limits in force"),
+):
+    """Concurrent signup/signin/profile/users/stats load test."""
+    if url:
+        results = asyncio.run(run_load(url, users, requests, concurrency))
+    else:
+        with boot_server(port, mongo_url, rate_limits) as base_url:
+            results = asyncio.run(run_load(base_url, users, requests, concurrency))
+    print_report(results)
+
+    report = {
+        "meta": {
+            "commit": git_commit(),
+            "timestamp": datetime.utcnow().isoformat(),
+            "target": url or ("mongodb" if mongo_url else "memory"),
+            "users": users,
+            "requests": requests,
+            "concurrency": concurrency,
+        },
+        "results": results,
+    }
+    if save:
+        with open(save, "w") as f:
+            json.dump(report, f, indent=2)
+    if compare_to:
+        with open(compare_to) as f:
+            if compare(results, json.load(f), tolerance):
+                raise typer.Exit(code=1)
+
+
+if __name__ == "__main__":
+    cli()
@@ -0,0 +1,227 @@
+"""Streaming bulk import and export of users (CSV or NDJSON).
+
+Imports read rows incrementally, hash each batch's passwords in parallel on
+a process pool and write it with one unordered ``insert_many``; a duplicate
+email fails only its own row, and a batch the database could not take fails
+only its own rows. Exports stream straight off the DB cursor.
+"""
+import asyncio
+import csv
+import io
+import json
+import multiprocessing
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+
+from pydantic import BaseModel, EmailStr, ValidationError
+
+import config
+import resilience
+from hashing import hash_password
+from stats import USER_TYPES
+from storage import DatabaseUnavailable, DuplicateEmailError
+
+FORMATS = ("csv", "ndjson")
+EXPORT_FIELDS = ("id", "name", "email", "user_type", "created_at")
+
+
+class ImportRow(BaseModel):
+    name: str
+    email: EmailStr
+    password: str
+    user_type: str
+
+
+def _decode(line: bytes):
+    try:
+        return line.decode("utf-8").rstrip("\r")
+    except UnicodeDecodeError as e:
+        return e
+
+
+async def iter_lines(chunks):
+    """Split an async stream of byte chunks into decoded lines.
+
+    A line that is not valid UTF-8 is yielded as its UnicodeDecodeError, so
+    it fails only its own row.
+    """
+    buffer = b""
+    async for chunk in chunks:
+        buffer += chunk
+        *lines, buffer = buffer.split(b"\n")
+        for line in lines:
+            yield _decode(line)
+    if buffer:
+        yield _decode(buffer)
+
+
+async def iter_rows(lines, fmt: str):
+    """Yield ``(row_number, dict)`` from lines of CSV (with header) or NDJSON.
+
+    CSV records must not span lines, so fields cannot contain newlines.
+    """
+    header = None
+    row_number = 0
+    async for line in lines:
+        if isinstance(line, UnicodeDecodeError):
+            row_number += 1
+            yield row_number, line
+            continue
+        if not line.strip():
+            continue
+        if fmt == "csv":
+            values = next(csv.reader([line]))
+            if header is None:
+                header = [name.strip() for name in values]
+                continue
+            row_number += 1
+            yield row_number, dict(zip(header, values))
+        else:
+            row_number += 1
+            try:
+                yield row_number, json.loads(line)
+            except ValueError as e:
+                yield row_number, e
+
+
+def _hash_many(passwords):
+    return [hash_password(password) for password in passwords]
+
+
+class ImportReport:
+    def __init__(self):
+        self.imported = 0
+        self.by_user_type = {}
+        self.failed = []
+
+    def fail(self, row: int, email, error: str):
+        self.failed.append({"row": row, "email": email, "error": error})
+
+    def as_dict(self) -> dict:
+        failed = sorted(self.failed, key=lambda failure: failure["row"])
+        return {"imported": self.imported, "failed_count": len(failed), "failed": failed}
+
+
+async def _write_batch(store, batch, executor, workers: int, report: ImportReport):
+    loop = asyncio.get_running_loop()
+    passwords = [row.password for _, row in batch]
+    size = max(1, -(-len(passwords) // workers))
+    chunks = await asyncio.gather(*(
+        loop.run_in_executor(executor, _hash_many, passwords[i:i + size])
+        for i in range(0, len(passwords), size)
+    ))
+    hashes = [hashed for chunk in chunks for hashed in chunk]
+
+    now = datetime.utcnow()
+    documents = [
+        {
+            "id": str(uuid.uuid4()),
+            "name": row.name,
+            "email": row.email,
+            "password": hashed,
+            "user_type": row.user_type,
+            "created_at": now,
+            "updated_at": now,
+        }
+        for (_, row), hashed in zip(batch, hashes)
+    ]
+    try:
+        with resilience.call_timeout(config.BULK_IMPORT_DB_TIMEOUT_MS / 1000):
+            failed = await store.insert_many(documents)
+    except DatabaseUnavailable as e:
+        # Some of the batch may have gone in; re-importing it only fails
+        # those rows as duplicates
+        for row_number, row in batch:
+            report.fail(row_number, row.email, f"Database unavailable, row not confirmed: {e}")
+        return
+    for index, (row_number, row) in enumerate(batch):
+        if index in failed:
+            error = failed[index]
+            message = "Email already registered" if isinstance(error, DuplicateEmailError) else str(error)
+            report.fail(row_number, row.email, message)
+        else:
+            report.imported += 1
+            report.by_user_type[row.user_type] = report.by_user_type.get(row.user_type, 0) + 1
+
+
+async def import_users(store, rows, executor, workers: int,
+                       batch_size: int = config.BULK_IMPORT_BATCH_SIZE, stats_service=None) -> ImportReport:
+    """Validate, hash and insert ``rows`` (from :func:`iter_rows`) in batches."""
+    report = ImportReport()
+    batch = []
+    async for row_number, raw in rows:
+        if isinstance(raw, UnicodeDecodeError):
+            report.fail(row_number, None, f"Invalid UTF-8: {raw}")
+            continue
+        if isinstance(raw, Exception):
+            report.fail(row_number, None, f"Invalid JSON: {raw}")
+            continue
+        try:
+            row = ImportRow(**raw)
+        except ValidationError as e:
+            errors = "; ".join(f"{'.'.join(map(str, err['loc']))}: {err['msg']}" for err in e.errors())
+            report.fail(row_number, raw.get("email"), errors)
+            continue
+        except TypeError:
+            report.fail(row_number, None, "Row must be an object")
+            continue
+        if row.user_type not in USER_TYPES:
+            report.fail(row_number, row.email, f"Invalid user type {row.user_type!r}")
+            continue
+        batch.append((row_number, row))
+        if len(batch) >= batch_size:
+            await _write_batch(store, batch, executor, workers, report)
+            batch = []
+    if batch:
+        await _write_batch(store, batch, executor, workers, report)
+
+    if stats_service is not None:
+        for user_type, count in report.by_user_type.items():
+            await stats_service.record_signup(user_type, count)
+    return report
+
+
+_executor = None
+
+
+def start(workers: int = config.BULK_IMPORT_WORKERS):
+    """Create the worker's import pool; its processes start with the first import.
+
+    Spawned rather than forked, so children don't inherit the server's
+    driver and hashing threads.
+    """
+    global _executor
+    _executor = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"))
+
+
+def shutdown():
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(wait=False, cancel_futures=True)
+    _executor = None
+
+
+def get_import_executor() -> ProcessPoolExecutor:
+    if _executor is None:
+        raise RuntimeError("Import pool is not running; bulk.start() must run at startup")
+    return _executor
+
+
+def _format_row(user: dict, fmt: str) -> str:
+    if fmt == "ndjson":
+        return json.dumps(user, default=datetime.isoformat) + "\n"
+    out = io.StringIO()
+    csv.writer(out).writerow([
+        user[field].isoformat() if isinstance(user[field], datetime) else user[field]
+        for field in EXPORT_FIELDS
+    ])
+    return out.getvalue()
+
+
+async def export_users(store, fmt: str, **filters):
+    """Yield users as CSV (with header) or NDJSON text, one row at a time."""
+    if fmt == "csv":
+        yield ",".join(EXPORT_FIELDS) + "\r\n"
+    async for user in store.find_page(**filters):
+        yield _format_row(user, fmt)
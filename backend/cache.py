@@ -0,0 +1,88 @@
+"""Small in-process caches shared by the API's hot paths."""
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+
+
+class TTLCache:
+    """Bounded LRU cache whose entries also expire after ``ttl`` seconds.
+
+    Not thread-safe; meant to be used from the event loop only.
+    """
+
+    _MISSING = object()
+
+    def __init__(self, maxsize: int = 1024, ttl: float = 60.0, clock=time.monotonic):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._clock = clock
+        self._data = OrderedDict()
+        # key -> [fills in progress, invalidations since the first began]
+        self._fills = {}
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __len__(self):
+        return len(self._data)
+
+    def get(self, key, default=None):
+        entry = self._data.get(key, self._MISSING)
+        if entry is not self._MISSING:
+            value, expires_at = entry
+            if expires_at > self._clock():
+                self._data.move_to_end(key)
+                self.hits += 1
+                return value
+            del self._data[key]
+        self.misses += 1
+        return default
+
+    def set(self, key, value, ttl: float = None):
+        ttl = self.ttl if ttl is None else ttl
+        if ttl <= 0:
+            return
+        self._data[key] = (value, self._clock() + ttl)
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+            self.evictions += 1
+
+    def invalidate(self, key):
+        self._data.pop(key, None)
+        if key in self._fills:
+            self._fills[key][1] += 1
+
+    @contextmanager
+    def filling(self, key):
+        """For loading ``key`` from its source: yields ``fill(value)``, which
+        caches ``value`` unless ``key`` was invalidated after the block
+        began, since the value may then predate the write."""
+        state = self._fills.setdefault(key, [0, 0])
+        state[0] += 1
+        invalidations = state[1]
+
+        def fill(value):
+            if state[1] == invalidations:
+                self.set(key, value)
+
+        try:
+            yield fill
+        finally:
+            state[0] -= 1
+            if not state[0]:
+                del self._fills[key]
+
+    def clear(self):
+        self._data.clear()
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._data),
+            "maxsize": self.maxsize,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_ratio": self.hits / lookups if lookups else 0.0,
+        }
@@ -0,0 +1,103 @@
+"""Fault injection around a storage engine, for testing a degraded database locally.
+
+:class:`ChaosUserStore` adds latency, errors and stalls to the calls it
+passes on, so timeouts, deadlines and the circuit breaker can be exercised
+without a real outage. Enable it for a server with ``CHAOS_ENABLED=1`` and
+the ``CHAOS_*`` settings; ``bench.py degraded-db`` drives it directly. Never
+enable it in production.
+"""
+import asyncio
+import random
+
+import config
+import metrics
+from storage import UserStoreWrapper
+
+CHAOS_FAULTS = metrics.REGISTRY.register(metrics.Counter(
+    "chaos_faults_total", "Faults injected into storage calls by kind (latency, error, stall)", ("kind",)))
+
+
+# What configure() may change while running
+SETTINGS = ("latency", "jitter", "error_rate", "stall_rate", "stall_seconds")
+
+
+class InjectedFault(ConnectionError):
+    """A storage call failed on purpose."""
+
+
+class _ChaosCursor:
+    def __init__(self, store, cursor):
+        self._store = store
+        self._cursor = cursor
+
+    async def to_list(self, length=None):
+        await self._store._inject()
+        return await self._cursor.to_list(length)
+
+    def __aiter__(self):
+        return self._iterate()
+
+    async def _iterate(self):
+        # Faults hit the first fetch, like a query that never comes back
+        await self._store._inject()
+        async for row in self._cursor:
+            yield row
+
+
+class ChaosUserStore(UserStoreWrapper):
+    """Before each call: with ``stall_rate`` hang for ``stall_seconds``, else
+    with ``error_rate`` raise :class:`InjectedFault`, else sleep ``latency``
+    plus up to ``jitter`` seconds. The settings can be changed while running.
+    """
+
+    def __init__(self, inner, latency: float = config.CHAOS_LATENCY_MS / 1000,
+                 jitter: float = config.CHAOS_JITTER_MS / 1000,
+                 error_rate: float = config.CHAOS_ERROR_RATE, stall_rate: float = config.CHAOS_STALL_RATE,
+                 stall_seconds: float = config.CHAOS_STALL_SECONDS, seed: int = None):
+        super().__init__(inner)
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.stall_rate = stall_rate
+        self.stall_seconds = stall_seconds
+        self._random = random.Random(seed)
+
+    @property
+    def transient_errors(self):
+        return self.inner.transient_errors + (InjectedFault,)
+
+    def configure(self, **settings):
+        for name, value in settings.items():
+            if name not in SETTINGS:
+                raise ValueError(f"Unknown chaos setting: {name!r}")
+            setattr(self, name, value)
+
+    async def _inject(self):
+        roll = self._random.random()
+        if roll < self.stall_rate:
+            CHAOS_FAULTS.inc(kind="stall")
+            await asyncio.sleep(self.stall_seconds)
+        elif roll < self.stall_rate + self.error_rate:
+            CHAOS_FAULTS.inc(kind="error")
+            raise InjectedFault("injected storage failure")
+        delay = self.latency + self._random.random() * self.jitter
+        if delay > 0:
+            CHAOS_FAULTS.inc(kind="latency")
+            await asyncio.sleep(delay)
+
+    async def _call(self, function, *args, **kwargs):
+        await self._inject()
+        return await function(*args, **kwargs)
+
+    def _cursor(self, cursor):
+        return _ChaosCursor(self, cursor)
+
+    # Startup migrations run unharmed, so a chaos server still boots
+    async def ensure_indexes(self):
+        return await self.inner.ensure_indexes()
+
+    async def rebuild_user_counts(self):
+        return await self.inner.rebuild_user_counts()
+
+    async def ensure_user_counts(self):
+        return await self.inner.ensure_user_counts()
@@ -0,0 +1,147 @@
+import os
+
+# Environment variables
+MONGO_URL = os.environ.get('MONGO_URL', 'mongodb://localhost:27017/')
+MONGO_DB_NAME = os.environ.get('MONGO_DB_NAME', 'jobportal')
+SECRET_KEY = os.environ.get('SECRET_KEY', 'your-secret-key-change-this-in-production')
+ALGORITHM = "HS256"
+ACCESS_TOKEN_EXPIRE_MINUTES = 30
+REFRESH_TOKEN_EXPIRE_DAYS = int(os.environ.get('REFRESH_TOKEN_EXPIRE_DAYS', '14'))
+# A refresh token spent this recently may be presented again (e.g. by a second
+# tab refreshing at the same time) without counting as reuse
+REFRESH_REUSE_GRACE_SECONDS = float(os.environ.get('REFRESH_REUSE_GRACE_SECONDS', '10'))
+
+# User storage engine: 'mongo', or 'memory' to run without a database
+STORAGE_ENGINE = os.environ.get('STORAGE_ENGINE', 'mongo')
+
+# JWT library ('pyjwt' or 'jose') and the cache of verified tokens
+JWT_BACKEND = os.environ.get('JWT_BACKEND', 'pyjwt')
+TOKEN_CACHE_SIZE = int(os.environ.get('TOKEN_CACHE_SIZE', '10000'))
+TOKEN_CACHE_TTL_SECONDS = float(os.environ.get('TOKEN_CACHE_TTL_SECONDS', '300'))
+
+# MongoDB connection pool (one pool per worker process)
+MONGO_MAX_POOL_SIZE = int(os.environ.get('MONGO_MAX_POOL_SIZE', '100'))
+MONGO_MIN_POOL_SIZE = int(os.environ.get('MONGO_MIN_POOL_SIZE', '0'))
+MONGO_MAX_IDLE_TIME_MS = int(os.environ.get('MONGO_MAX_IDLE_TIME_MS', '60000'))
+MONGO_WAIT_QUEUE_TIMEOUT_MS = int(os.environ.get('MONGO_WAIT_QUEUE_TIMEOUT_MS', '5000'))
+# Driver timeouts; socketTimeoutMS also bounds how long a driver thread stays
+# blocked on a call whose caller already gave up
+MONGO_SERVER_SELECTION_TIMEOUT_MS = int(os.environ.get('MONGO_SERVER_SELECTION_TIMEOUT_MS', '2000'))
+MONGO_CONNECT_TIMEOUT_MS = int(os.environ.get('MONGO_CONNECT_TIMEOUT_MS', '2000'))
+MONGO_SOCKET_TIMEOUT_MS = int(os.environ.get('MONGO_SOCKET_TIMEOUT_MS', '5000'))
+
+# Each storage call gets DB_OPERATION_TIMEOUT_MS, capped by what is left of
+# the request's DB_REQUEST_DEADLINE_MS. After DB_BREAKER_FAILURES consecutive
+# timeouts or connection errors, storage calls fail fast (503) for
+# DB_BREAKER_RESET_SECONDS, then one trial call decides whether to recover
+DB_OPERATION_TIMEOUT_MS = int(os.environ.get('DB_OPERATION_TIMEOUT_MS', '2000'))
+DB_REQUEST_DEADLINE_MS = int(os.environ.get('DB_REQUEST_DEADLINE_MS', '3000'))
+DB_BREAKER_FAILURES = int(os.environ.get('DB_BREAKER_FAILURES', '5'))
+DB_BREAKER_RESET_SECONDS = float(os.environ.get('DB_BREAKER_RESET_SECONDS', '5'))
+
+# Fault injection around the storage engine, for local resilience testing
+# only: added latency (plus up to JITTER), failed calls, and stalled calls
+CHAOS_ENABLED = os.environ.get('CHAOS_ENABLED', 'false').lower() in ('1', 'true', 'yes')
+CHAOS_LATENCY_MS = float(os.environ.get('CHAOS_LATENCY_MS', '0'))
+CHAOS_JITTER_MS = float(os.environ.get('CHAOS_JITTER_MS', '0'))
+CHAOS_ERROR_RATE = float(os.environ.get('CHAOS_ERROR_RATE', '0'))
+CHAOS_STALL_RATE = float(os.environ.get('CHAOS_STALL_RATE', '0'))
+CHAOS_STALL_SECONDS = float(os.environ.get('CHAOS_STALL_SECONDS', '30'))
+
+# Password hash scheme and cost; `manage.py calibrate-hash` suggests values.
+# 'argon2' needs the optional argon2-cffi package. Hashes made with another
+# scheme or cost are upgraded transparently at the next successful signin.
+PASSWORD_SCHEME = os.environ.get('PASSWORD_SCHEME', 'bcrypt')
+BCRYPT_ROUNDS = int(os.environ.get('BCRYPT_ROUNDS', '12'))
+ARGON2_TIME_COST = int(os.environ.get('ARGON2_TIME_COST', '3'))
+ARGON2_MEMORY_COST_KIB = int(os.environ.get('ARGON2_MEMORY_COST_KIB', '65536'))
+ARGON2_PARALLELISM = int(os.environ.get('ARGON2_PARALLELISM', '1'))
+
+# Password hashing executor: 'thread' or 'process'
+HASH_EXECUTOR = os.environ.get('HASH_EXECUTOR', 'thread')
+HASH_WORKERS = int(os.environ.get('HASH_WORKERS', str(os.cpu_count() or 1)))
+# Requests allowed to wait for a hashing worker before new ones get 503
+HASH_MAX_QUEUE = int(os.environ.get('HASH_MAX_QUEUE', '64'))
+HASH_RETRY_AFTER_SECONDS = int(os.environ.get('HASH_RETRY_AFTER_SECONDS', '1'))
+
+# Authenticated principal cache for get_current_user
+PRINCIPAL_CACHE_SIZE = int(os.environ.get('PRINCIPAL_CACHE_SIZE', '10000'))
+PRINCIPAL_CACHE_TTL_SECONDS = float(os.environ.get('PRINCIPAL_CACHE_TTL_SECONDS', '30'))
+# Build the principal from signed token claims and skip the DB lookup entirely
+AUTH_STATELESS = os.environ.get('AUTH_STATELESS', 'false').lower() in ('1', 'true', 'yes')
+
+# Concurrent identical reads (principal lookups, stats refreshes) share one DB call
+COALESCE_READS = os.environ.get('COALESCE_READS', 'true').lower() in ('1', 'true', 'yes')
+
+# /api/users pagination
+DEFAULT_USERS_PAGE_SIZE = int(os.environ.get('DEFAULT_USERS_PAGE_SIZE', '50'))
+MAX_USERS_PAGE_SIZE = int(os.environ.get('MAX_USERS_PAGE_SIZE', '500'))
+# /api/users/search: shortest query term; a one-letter prefix matches a
+# large share of users, and costs a scan to match
+SEARCH_MIN_TERM_LENGTH = int(os.environ.get('SEARCH_MIN_TERM_LENGTH', '2'))
+
+# /api/stats: 'aggregate' runs one $group per refresh, 'counters' reads
+# counts materialized in the stats collection and bumped by sign_up. The
+# first worker started in 'counters' mode builds them; after running in
+# 'aggregate' mode, recount with manage.py rebuild-stats
+STATS_MODE = os.environ.get('STATS_MODE', 'aggregate')
+STATS_CACHE_TTL_SECONDS = float(os.environ.get('STATS_CACHE_TTL_SECONDS', '5'))
+
+# /api/stats/stream: one aggregator per worker pushes stats to every client.
+# It refreshes on user changes from a change stream (at most once per min
+# interval) when the engine has one, otherwise every interval
+STATS_STREAM_INTERVAL_SECONDS = float(os.environ.get('STATS_STREAM_INTERVAL_SECONDS', '5'))
+STATS_STREAM_MIN_INTERVAL_SECONDS = float(os.environ.get('STATS_STREAM_MIN_INTERVAL_SECONDS', '1'))
+STATS_STREAM_CHANGE_STREAM = os.environ.get('STATS_STREAM_CHANGE_STREAM', 'true').lower() in ('1', 'true', 'yes')
+STATS_STREAM_HEARTBEAT_SECONDS = float(os.environ.get('STATS_STREAM_HEARTBEAT_SECONDS', '15'))
+STATS_STREAM_MAX_CLIENTS = int(os.environ.get('STATS_STREAM_MAX_CLIENTS', '10000'))
+# Streams end after at most this long and the browser reconnects. uvicorn
+# waits for open connections before shutting down, so keep it below
+# SERVER_GRACEFUL_SHUTDOWN_SECONDS
+STATS_STREAM_MAX_AGE_SECONDS = float(os.environ.get('STATS_STREAM_MAX_AGE_SECONDS', '20'))
+
+# Health probes read results cached by background tasks: a Mongo ping every
+# interval (failing after the timeout) and an event-loop lag sampler
+HEALTH_CHECK_INTERVAL_SECONDS = float(os.environ.get('HEALTH_CHECK_INTERVAL_SECONDS', '5'))
+HEALTH_CHECK_TIMEOUT_SECONDS = float(os.environ.get('HEALTH_CHECK_TIMEOUT_SECONDS', '2'))
+LOOP_LAG_INTERVAL_SECONDS = float(os.environ.get('LOOP_LAG_INTERVAL_SECONDS', '0.5'))
+
+# Log requests slower than this with a per-component time breakdown (0 = off)
+SLOW_REQUEST_MS = float(os.environ.get('SLOW_REQUEST_MS', '0'))
+
+# Production launcher (manage.py serve)
+SERVER_HOST = os.environ.get('SERVER_HOST', '0.0.0.0')
+SERVER_PORT = int(os.environ.get('SERVER_PORT', '8001'))
+WEB_CONCURRENCY = int(os.environ.get('WEB_CONCURRENCY', str(os.cpu_count() or 1)))
+# Longer than typical load balancer idle timeouts so upstream connections are reused
+SERVER_KEEP_ALIVE_SECONDS = int(os.environ.get('SERVER_KEEP_ALIVE_SECONDS', '75'))
+SERVER_BACKLOG = int(os.environ.get('SERVER_BACKLOG', '2048'))
+SERVER_GRACEFUL_SHUTDOWN_SECONDS = int(os.environ.get('SERVER_GRACEFUL_SHUTDOWN_SECONDS', '30'))
+
+# Auth rate limits as "<requests>/<seconds>"; 'memory' is per worker,
+# 'mongo' shares counters between workers
+RATE_LIMIT_BACKEND = os.environ.get('RATE_LIMIT_BACKEND', 'memory')
+RATE_LIMIT_SIGNIN_IP = os.environ.get('RATE_LIMIT_SIGNIN_IP', '30/60')
+RATE_LIMIT_SIGNIN_EMAIL = os.environ.get('RATE_LIMIT_SIGNIN_EMAIL', '10/60')
+RATE_LIMIT_SIGNUP_IP = os.environ.get('RATE_LIMIT_SIGNUP_IP', '10/60')
+
+# Write-behind batching of signup inserts and login audit events. A batch is
+# written when full or after its flush delay (0 = as soon as the previous
+# batch is done); producers wait while max pending items are buffered
+WRITE_BEHIND_BATCH_SIZE = int(os.environ.get('WRITE_BEHIND_BATCH_SIZE', '100'))
+WRITE_BEHIND_MAX_PENDING = int(os.environ.get('WRITE_BEHIND_MAX_PENDING', '10000'))
+SIGNUP_FLUSH_MS = float(os.environ.get('SIGNUP_FLUSH_MS', '0'))
+LOGIN_AUDIT_FLUSH_MS = float(os.environ.get('LOGIN_AUDIT_FLUSH_MS', '1000'))
+WRITE_BEHIND_DRAIN_TIMEOUT_SECONDS = float(os.environ.get('WRITE_BEHIND_DRAIN_TIMEOUT_SECONDS', '10'))
+
+# Bulk user import: rows per insert_many batch, and processes hashing them
+BULK_IMPORT_BATCH_SIZE = int(os.environ.get('BULK_IMPORT_BATCH_SIZE', '1000'))
+BULK_IMPORT_WORKERS = int(os.environ.get('BULK_IMPORT_WORKERS', str(os.cpu_count() or 1)))
+# Storage timeout for each import batch, in place of DB_OPERATION_TIMEOUT_MS:
+# a large insert_many is slow by its size, and must not trip the breaker
+BULK_IMPORT_DB_TIMEOUT_MS = int(os.environ.get('BULK_IMPORT_DB_TIMEOUT_MS', '30000'))
+# Comma-separated emails of the accounts allowed to use /api/users/import;
+# empty disables the endpoint (manage.py import-users still works)
+BULK_IMPORT_ADMINS = frozenset(
+    email.strip().lower() for email in os.environ.get('BULK_IMPORT_ADMINS', '').split(',') if email.strip()
+)
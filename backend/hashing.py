@@ -0,0 +1,235 @@
+"""Password hashing off the event loop, on a bounded worker pool.
+
+passlib is imported and the hash context built on first use; ``start()``
+does it at startup, so neither module import nor the first signin pays.
+"""
+import asyncio
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+import config
+import metrics
+import resilience
+
+def build_context(scheme: str = config.PASSWORD_SCHEME, bcrypt_rounds: int = config.BCRYPT_ROUNDS,
+                  argon2_time_cost: int = config.ARGON2_TIME_COST,
+                  argon2_memory_cost: int = config.ARGON2_MEMORY_COST_KIB,
+                  argon2_parallelism: int = config.ARGON2_PARALLELISM):
+    """passlib CryptContext hashing with ``scheme`` at exactly the configured cost.
+
+    Pinning min == max cost makes ``needs_update`` flag any hash made at a
+    different cost (or with the other scheme), for rehash-on-login.
+    """
+    from passlib.context import CryptContext
+
+    if scheme not in ("bcrypt", "argon2"):
+        raise ValueError(f"Unknown password scheme: {scheme!r}")
+    schemes = [scheme] + [s for s in ("bcrypt", "argon2") if s != scheme]
+    settings = {
+        "bcrypt__default_rounds": bcrypt_rounds,
+        "bcrypt__min_rounds": bcrypt_rounds,
+        "bcrypt__max_rounds": bcrypt_rounds,
+    }
+    if scheme == "argon2":
+        settings.update({
+            "argon2__time_cost": argon2_time_cost,
+            # time_cost is argon2's "rounds"; needs_update only compares it when pinned
+            "argon2__min_rounds": argon2_time_cost,
+            "argon2__max_rounds": argon2_time_cost,
+            "argon2__memory_cost": argon2_memory_cost,
+            "argon2__parallelism": argon2_parallelism,
+        })
+    else:
+        # argon2-cffi is optional; only verify argon2 hashes if it's installed
+        try:
+            import argon2  # noqa: F401
+        except ImportError:
+            schemes.remove("argon2")
+    return CryptContext(schemes=schemes, default=scheme, deprecated="auto", **settings)
+
+
+_context = None
+
+
+def get_context():
+    """The process-wide hash context, built on first use."""
+    global _context
+    if _context is None:
+        _context = build_context()
+    return _context
+
+
+def warm_up():
+    """Build the context and load its hash backends now.
+
+    passlib picks and self-tests a backend on the first hash (~35 ms for
+    bcrypt); also used as the process pool's worker initializer.
+    """
+    context = get_context()
+    for scheme in context.schemes():
+        handler = context.handler(scheme)
+        if hasattr(handler, "get_backend"):
+            handler.get_backend()
+
+
+def hash_password(password: str) -> str:
+    return get_context().hash(password)
+
+
+def verify_password(plain_password: str, hashed_password: str) -> bool:
+    return get_context().verify(plain_password, hashed_password)
+
+
+def verify_and_update(plain_password: str, hashed_password: str):
+    """``(valid, new_hash)``; new_hash is set when the stored hash is outdated."""
+    return get_context().verify_and_update(plain_password, hashed_password)
+
+
+# Worker entry points; module level so a process pool can pickle them.
+# Each returns the time spent hashing alongside the result.
+def _timed(func, *args):
+    start = time.perf_counter()
+    result = func(*args)
+    return result, time.perf_counter() - start
+
+
+def _hash_job(password):
+    return _timed(hash_password, password)
+
+
+def _verify_job(plain_password, hashed_password):
+    return _timed(verify_password, plain_password, hashed_password)
+
+
+def _verify_and_update_job(plain_password, hashed_password):
+    return _timed(verify_and_update, plain_password, hashed_password)
+
+
+class HashQueueFull(Exception):
+    """Raised when every worker is busy and the wait queue is full."""
+
+
+class HashExecutor:
+    """Runs bcrypt on a dedicated pool with a bounded wait queue.
+
+    At most ``workers + max_queue`` jobs are admitted at once; beyond that
+    callers get :class:`HashQueueFull` immediately instead of queueing.
+    """
+
+    def __init__(self, kind: str = "thread", workers: int = 1, max_queue: int = 64):
+        if kind not in ("thread", "process"):
+            raise ValueError(f"Unknown hash executor kind: {kind!r}")
+        self.kind = kind
+        self.workers = workers
+        self.max_queue = max_queue
+        self._pool = None
+        self.pending = 0
+        self.rejected = 0
+        self.completed = 0
+        self.hash_seconds_total = 0.0
+        self.hash_seconds_max = 0.0
+        self.wait_seconds_total = 0.0
+
+    def start(self):
+        if self.kind == "process":
+            self._pool = ProcessPoolExecutor(max_workers=self.workers, initializer=warm_up)
+        else:
+            warm_up()
+            self._pool = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="hash")
+
+    def shutdown(self):
+        if self._pool is not None:
+            self._pool.shutdown(wait=True)
+        self._pool = None
+
+    @property
+    def queue_depth(self) -> int:
+        return max(0, self.pending - self.workers)
+
+    async def _submit(self, operation, job, *args):
+        if self.pending >= self.workers + self.max_queue:
+            self.rejected += 1
+            raise HashQueueFull()
+        self.pending += 1
+        submitted = time.perf_counter()
+        try:
+            loop = asyncio.get_running_loop()
+            # Hashing is not database time; keep it off the request's DB deadline
+            with resilience.paused_deadline():
+                result, seconds = await loop.run_in_executor(self._pool, job, *args)
+        finally:
+            self.pending -= 1
+        elapsed = time.perf_counter() - submitted
+        wait = max(0.0, elapsed - seconds)
+        self.completed += 1
+        self.hash_seconds_total += seconds
+        self.hash_seconds_max = max(self.hash_seconds_max, seconds)
+        self.wait_seconds_total += wait
+        metrics.HASH_LATENCY.observe(seconds, operation=operation)
+        metrics.HASH_QUEUE_WAIT.observe(wait)
+        metrics.add_time("hash", elapsed)
+        return result
+
+    async def hash(self, password: str) -> str:
+        return await self._submit("hash", _hash_job, password)
+
+    async def verify(self, plain_password: str, hashed_password: str) -> bool:
+        return await self._submit("verify", _verify_job, plain_password, hashed_password)
+
+    async def verify_and_update(self, plain_password: str, hashed_password: str):
+        return await self._submit("verify", _verify_and_update_job, plain_password, hashed_password)
+
+    def stats(self) -> dict:
+        completed = self.completed or 1
+        return {
+            "executor": self.kind,
+            "workers": self.workers,
+            "max_queue": self.max_queue,
+            "in_flight": self.pending,
+            "queue_depth": self.queue_depth,
+            "completed": self.completed,
+            "rejected": self.rejected,
+            "hash_latency_avg_ms": self.hash_seconds_total / completed * 1000,
+            "hash_latency_max_ms": self.hash_seconds_max * 1000,
+            "queue_wait_avg_ms": self.wait_seconds_total / completed * 1000,
+        }
+
+
+_executor = None
+
+
+def start(kind: str = config.HASH_EXECUTOR, workers: int = config.HASH_WORKERS,
+          max_queue: int = config.HASH_MAX_QUEUE) -> HashExecutor:
+    global _executor
+    _executor = HashExecutor(kind, workers, max_queue)
+    _executor.start()
+    return _executor
+
+
+def shutdown():
+    global _executor
+    if _executor is not None:
+        _executor.shutdown()
+    _executor = None
+
+
+def _executor_samples():
+    if _executor is None:
+        return None
+    return [
+        ({"state": "queued"}, _executor.queue_depth),
+        ({"state": "in_flight"}, _executor.pending),
+    ]
+
+
+metrics.REGISTRY.register(metrics.CallbackMetric(
+    "password_hash_jobs", "Hashing jobs waiting for or running on a worker", _executor_samples))
+metrics.REGISTRY.register(metrics.CallbackMetric(
+    "password_hash_rejected_total", "Hashing jobs rejected because the queue was full",
+    lambda: _executor.rejected if _executor is not None else None, type="counter"))
+
+
+def get_hasher() -> HashExecutor:
+    if _executor is None:
+        raise RuntimeError("Hash executor is not running; hashing.start() must run at startup")
+    return _executor
@@ -0,0 +1,138 @@
+"""Liveness and readiness answered from state kept by background tasks.
+
+Probes never wait on Mongo: one task pings it every interval, bounded by a
+timeout, and caches the outcome; another samples event-loop lag. Readiness
+fails when the last ping failed or is too old to trust.
+"""
+import asyncio
+import time
+from collections import deque
+from datetime import datetime
+
+import config
+import metrics
+from metrics import MONGO_POOL_CHECKED_OUT, MONGO_POOL_CONNECTIONS, MONGO_POOL_WAITING
+
+MONGO_UP = metrics.REGISTRY.register(metrics.Gauge(
+    "mongo_up", "1 if the last background ping of MongoDB succeeded"))
+EVENT_LOOP_LAG = metrics.REGISTRY.register(metrics.Gauge(
+    "event_loop_lag_seconds", "How late the last event-loop lag probe woke up"))
+
+
+class HealthMonitor:
+    def __init__(self, store, interval: float = config.HEALTH_CHECK_INTERVAL_SECONDS,
+                 timeout: float = config.HEALTH_CHECK_TIMEOUT_SECONDS,
+                 lag_interval: float = config.LOOP_LAG_INTERVAL_SECONDS, clock=time.monotonic):
+        self.store = store
+        self.interval = interval
+        self.timeout = timeout
+        self.lag_interval = lag_interval
+        self._clock = clock
+        self._tasks = []
+        self.db_ok = False
+        self.db_error = None
+        self.db_latency = None
+        self.checked_at = None
+        self.checked_at_wall = None
+        self.loop_lag = 0.0
+        # Last minute of lag samples, for the recent worst case
+        self._lags = deque(maxlen=max(1, int(60 / lag_interval)))
+
+    async def start(self):
+        # Know the DB state before the first probe arrives
+        await self.check_db()
+        self._tasks = [
+            asyncio.create_task(self._every(self.interval, self.check_db)),
+            asyncio.create_task(self._sample_lag()),
+        ]
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    async def check_db(self):
+        started = self._clock()
+        try:
+            await asyncio.wait_for(self.store.ping(), self.timeout)
+            self.db_ok, self.db_error = True, None
+        except asyncio.TimeoutError:
+            self.db_ok, self.db_error = False, f"ping timed out after {self.timeout}s"
+        except Exception as e:
+            self.db_ok, self.db_error = False, str(e)
+        self.db_latency = self._clock() - started
+        self.checked_at = self._clock()
+        self.checked_at_wall = datetime.utcnow()
+        MONGO_UP.set(1 if self.db_ok else 0)
+
+    async def _every(self, seconds: float, job):
+        while True:
+            await asyncio.sleep(seconds)
+            await job()
+
+    async def _sample_lag(self):
+        while True:
+            started = self._clock()
+            await asyncio.sleep(self.lag_interval)
+            self.loop_lag = max(0.0, self._clock() - started - self.lag_interval)
+            self._lags.append(self.loop_lag)
+            EVENT_LOOP_LAG.set(self.loop_lag)
+
+    @property
+    def db_stale(self) -> bool:
+        # A stuck checker must not keep reporting an old success
+        return self.checked_at is None or self._clock() - self.checked_at > 2 * self.interval + self.timeout
+
+    @property
+    def ready(self) -> bool:
+        return self.db_ok and not self.db_stale
+
+    def database(self) -> dict:
+        return {
+            "status": "connected" if self.db_ok else "disconnected",
+            "stale": self.db_stale,
+            "error": self.db_error,
+            "ping_ms": self.db_latency * 1000 if self.db_latency is not None else None,
+            "checked_at": self.checked_at_wall.isoformat() if self.checked_at_wall else None,
+        }
+
+    def event_loop(self) -> dict:
+        return {
+            "lag_ms": self.loop_lag * 1000,
+            "max_lag_ms_1m": max(self._lags, default=0.0) * 1000,
+        }
+
+    @staticmethod
+    def pool() -> dict:
+        checked_out = MONGO_POOL_CHECKED_OUT.get()
+        return {
+            "connections": MONGO_POOL_CONNECTIONS.get(),
+            "checked_out": checked_out,
+            "waiting": MONGO_POOL_WAITING.get(),
+            "max_size": config.MONGO_MAX_POOL_SIZE,
+            "saturation": checked_out / config.MONGO_MAX_POOL_SIZE if config.MONGO_MAX_POOL_SIZE else 0.0,
+        }
+
+
+_monitor = None
+
+
+async def start(store) -> HealthMonitor:
+    global _monitor
+    _monitor = HealthMonitor(store)
+    await _monitor.start()
+    return _monitor
+
+
+async def shutdown():
+    global _monitor
+    if _monitor is not None:
+        await _monitor.stop()
+    _monitor = None
+
+
+def get_health_monitor() -> HealthMonitor:
+    if _monitor is None:
+        raise RuntimeError("Health monitor is not running; health.start() must run at startup")
+    return _monitor
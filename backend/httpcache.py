@@ -0,0 +1,66 @@
+"""Conditional GET: strong ETags, ``If-None-Match`` -> 304 and Cache-Control.
+
+Each :class:`ConditionalGet` counts revalidations per route; a request
+answered with 304 Not Modified is a hit and shows up in ``cache_hits_total``.
+"""
+import hashlib
+
+from fastapi import Request, Response, status
+from fastapi.responses import ORJSONResponse
+
+import metrics
+
+
+def make_etag(*parts) -> str:
+    """Strong ETag for a representation identified by ``parts``."""
+    digest = hashlib.sha256("|".join(map(str, parts)).encode()).hexdigest()
+    return f'"{digest[:32]}"'
+
+
+def body_etag(body: bytes) -> str:
+    return f'"{hashlib.sha256(body).hexdigest()[:32]}"'
+
+
+def etag_matches(if_none_match, etag: str) -> bool:
+    # If-None-Match uses the weak comparison: W/"x" matches "x"
+    if not if_none_match:
+        return False
+    candidates = [candidate.strip() for candidate in if_none_match.split(",")]
+    return "*" in candidates or etag in (candidate.removeprefix("W/") for candidate in candidates)
+
+
+class ConditionalGet:
+    """ETag handling for one route, with its ``Cache-Control`` policy."""
+
+    def __init__(self, name: str, cache_control: str):
+        self.name = name
+        self.cache_control = cache_control
+        self.hits = 0
+        self.misses = 0
+        metrics.register_cache(f"http_{name}", lambda: self)
+
+    def headers(self, etag: str) -> dict:
+        return {"ETag": etag, "Cache-Control": self.cache_control}
+
+    def not_modified(self, request: Request, etag: str):
+        """A 304 response if the client already holds ``etag``, else None."""
+        if etag_matches(request.headers.get("if-none-match"), etag):
+            self.hits += 1
+            return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=self.headers(etag))
+        self.misses += 1
+        return None
+
+    def respond(self, request: Request, content, etag: str = None) -> Response:
+        """Encode ``content``; without a precomputed ``etag``, the body's digest is used."""
+        response = ORJSONResponse(content)
+        if etag is None:
+            etag = body_etag(response.body)
+            cached = self.not_modified(request, etag)
+            if cached is not None:
+                return cached
+        response.headers.update(self.headers(etag))
+        return response
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return {"hits": self.hits, "misses": self.misses, "hit_ratio": self.hits / total if total else 0.0}
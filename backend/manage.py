@@ -0,0 +1,261 @@
+"""Operational commands for the JobPortal API.
+
+Run from the backend directory, e.g.::
+
+    python manage.py serve --workers 4
+    python manage.py calibrate-hash --target-ms 250
+    python manage.py profile-startup --top 20
+    python manage.py import-users employers.csv
+    python manage.py export-users --output users.ndjson
+"""
+import asyncio
+import importlib.util
+import json
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from typing import Optional
+
+import typer
+
+import config
+
+cli = typer.Typer(help="JobPortal API management commands")
+
+
+@cli.callback()
+def manage():
+    """JobPortal API management commands."""
+
+
+def _available(module: str) -> bool:
+    return importlib.util.find_spec(module) is not None
+
+
+@cli.command()
+def serve(
+    host: str = typer.Option(config.SERVER_HOST),
+    port: int = typer.Option(config.SERVER_PORT),
+    workers: int = typer.Option(config.WEB_CONCURRENCY, help="Worker processes; defaults to the CPU count"),
+    keep_alive: int = typer.Option(config.SERVER_KEEP_ALIVE_SECONDS, help="Idle keep-alive timeout in seconds"),
+    backlog: int = typer.Option(config.SERVER_BACKLOG, help="Listen socket backlog"),
+    graceful_timeout: int = typer.Option(
+        config.SERVER_GRACEFUL_SHUTDOWN_SECONDS, help="Seconds to drain in-flight requests on SIGTERM"
+    ),
+):
+    """Run the API under uvicorn with one process per worker.
+
+    Each worker imports ``server:app`` itself and opens its own Mongo pool
+    and hashing executor in the lifespan. On SIGTERM, workers stop accepting
+    connections and drain in-flight requests before the lifespan closes.
+    """
+    import uvicorn
+
+    workers = max(1, workers)
+    # Split the cores between workers so their bcrypt pools don't oversubscribe
+    os.environ.setdefault("HASH_WORKERS", str(max(1, (os.cpu_count() or 1) // workers)))
+
+    uvicorn.run(
+        "server:app",
+        host=host,
+        port=port,
+        workers=workers,
+        loop="uvloop" if _available("uvloop") else "asyncio",
+        http="httptools" if _available("httptools") else "h11",
+        backlog=backlog,
+        timeout_keep_alive=keep_alive,
+        timeout_graceful_shutdown=graceful_timeout,
+        proxy_headers=True,
+    )
+
+
+def _check_format(fmt: str) -> str:
+    import bulk
+
+    if fmt not in bulk.FORMATS:
+        raise typer.BadParameter(f"format must be one of {', '.join(bulk.FORMATS)}")
+    return fmt
+
+
+@cli.command("calibrate-hash")
+def calibrate_hash(
+    target_ms: float = typer.Option(250.0, help="Desired time for one password verification"),
+    scheme: str = typer.Option(config.PASSWORD_SCHEME, help="bcrypt or argon2"),
+    samples: int = typer.Option(3, help="Verifications timed per setting (median is used)"),
+):
+    """Benchmark this host and pick the hash cost closest to --target-ms.
+
+    Prints verification latency and the throughput one core can sustain for
+    each setting, then the environment to apply. Existing hashes move to the
+    new cost as users sign in.
+    """
+    import statistics
+    import time
+
+    import hashing
+
+    if scheme == "bcrypt":
+        settings = [("BCRYPT_ROUNDS", rounds, {"bcrypt_rounds": rounds}) for rounds in range(8, 18)]
+    elif scheme == "argon2":
+        settings = [
+            ("ARGON2_TIME_COST", cost, {"argon2_time_cost": cost, "scheme": "argon2"})
+            for cost in range(1, 21)
+        ]
+    else:
+        raise typer.BadParameter("scheme must be bcrypt or argon2")
+
+    chosen = None
+    typer.echo(f"{'setting':<22}{'verify ms':>12}{'hashes/s/core':>16}")
+    for name, value, kwargs in settings:
+        context = hashing.build_context(**kwargs)
+        hashed = context.hash("calibration-password")
+        timings = []
+        for _ in range(samples):
+            start = time.perf_counter()
+            context.verify("calibration-password", hashed)
+            timings.append(time.perf_counter() - start)
+        seconds = statistics.median(timings)
+        typer.echo(f"{name}={value:<{21 - len(name)}}{seconds * 1000:>12.1f}{1 / seconds:>16.1f}")
+        if seconds * 1000 <= target_ms or chosen is None:
+            chosen = (name, value, seconds)
+        if seconds * 1000 > target_ms:
+            break
+
+    name, value, seconds = chosen
+    typer.echo(f"\nPASSWORD_SCHEME={scheme}")
+    typer.echo(f"{name}={value}")
+    typer.echo(
+        f"# ~{seconds * 1000:.0f} ms per signin, ~{1 / seconds:.1f} signins/s per core, "
+        f"~{(os.cpu_count() or 1) / seconds:.1f}/s on this host"
+    )
+
+
+@cli.command("profile-startup")
+def profile_startup(
+    top: int = typer.Option(15, help="Modules to list by self time"),
+    engine: str = typer.Option("memory", help="Storage engine the lifespan opens"),
+    path: str = typer.Option("/api/stats", help="First request served after startup"),
+):
+    """Where a cold worker spends its startup: imports, lifespan, first request.
+
+    Imports are traced with ``python -X importtime`` in a fresh interpreter
+    and grouped by top-level package; the tracing inflates them slightly.
+    """
+    import startup
+
+    timings = startup.measure(path, engine, importtime=True)
+    imports = timings["imports"]
+
+    typer.echo(f"GET {path} -> {timings['status']}\n")
+    typer.echo(f"{'phase':<22}{'ms':>10}")
+    for phase, label in startup.PHASES:
+        typer.echo(f"{label:<22}{timings[phase]:>10.1f}")
+
+    packages = {}
+    for row in imports:
+        package = row["module"].split(".")[0]
+        packages[package] = packages.get(package, 0.0) + row["self_ms"]
+    total = sum(packages.values())
+    typer.echo(f"\n{'package':<32}{'ms':>10}{'share':>8}")
+    for package, ms in sorted(packages.items(), key=lambda item: -item[1])[:top]:
+        typer.echo(f"{package:<32}{ms:>10.1f}{ms / total:>8.0%}")
+
+    typer.echo(f"\n{'module':<48}{'self ms':>10}{'cumul ms':>10}")
+    for row in sorted(imports, key=lambda row: -row["self_ms"])[:top]:
+        typer.echo(f"{row['module']:<48}{row['self_ms']:>10.1f}{row['cumulative_ms']:>10.1f}")
+
+
+@cli.command("rebuild-stats")
+def rebuild_stats():
+    """Recount users into the STATS_MODE=counters document.
+
+    Overwrites the counters, so signups counted while it runs are lost: run
+    it while no worker is taking signups, e.g. after switching STATS_MODE
+    to counters.
+    """
+    import storage
+
+    async def main():
+        store = storage.connect()
+        try:
+            return await store.rebuild_user_counts()
+        finally:
+            storage.close()
+
+    counts = asyncio.run(main())
+    typer.echo(", ".join(f"{user_type}={count}" for user_type, count in sorted(counts.items())) or "no users")
+
+
+@cli.command("import-users")
+def import_users(
+    path: str = typer.Argument(..., help="CSV (with header) or NDJSON file; '-' for stdin"),
+    format: Optional[str] = typer.Option(None, help="csv or ndjson; inferred from the file extension"),
+    batch_size: int = typer.Option(config.BULK_IMPORT_BATCH_SIZE, help="Rows per insert_many"),
+    workers: int = typer.Option(config.BULK_IMPORT_WORKERS, help="Processes hashing passwords"),
+):
+    """Stream-import users, hashing passwords on a process pool."""
+    import bulk
+    import stats
+    import storage
+
+    fmt = _check_format(format or ("csv" if path.endswith(".csv") else "ndjson"))
+
+    async def lines(f):
+        for line in f:
+            yield line.rstrip("\r\n")
+
+    async def main():
+        store = storage.connect()
+        try:
+            await store.ensure_indexes()
+            stats_service = stats.StatsService(store, config.STATS_MODE)
+            with ProcessPoolExecutor(max_workers=workers) as executor:
+                f = sys.stdin if path == "-" else open(path, newline="")
+                try:
+                    rows = bulk.iter_rows(lines(f), fmt)
+                    return await bulk.import_users(
+                        store, rows, executor, workers, batch_size, stats_service=stats_service
+                    )
+                finally:
+                    if f is not sys.stdin:
+                        f.close()
+        finally:
+            storage.close()
+
+    report = asyncio.run(main())
+    for failure in report.failed:
+        typer.echo(json.dumps(failure), err=True)
+    typer.echo(f"imported {report.imported}, failed {len(report.failed)}")
+    if report.failed:
+        raise typer.Exit(code=1)
+
+
+@cli.command("export-users")
+def export_users(
+    output: str = typer.Option("-", help="Destination file; '-' for stdout"),
+    format: str = typer.Option("ndjson", help="csv or ndjson"),
+    user_type: Optional[str] = typer.Option(None),
+):
+    """Stream users out of the collection without loading them all."""
+    import bulk
+    import storage
+
+    fmt = _check_format(format)
+
+    async def main(f):
+        storage.connect()
+        try:
+            async for chunk in bulk.export_users(storage.get_user_store(), fmt, user_type=user_type):
+                f.write(chunk)
+        finally:
+            storage.close()
+
+    if output == "-":
+        asyncio.run(main(sys.stdout))
+    else:
+        with open(output, "w", newline="") as f:
+            asyncio.run(main(f))
+
+
+if __name__ == "__main__":
+    cli()
@@ -0,0 +1,288 @@
+"""Prometheus-style metrics and per-request timing breakdowns.
+
+Metrics are kept in-process and rendered in the Prometheus text exposition
+format by ``/metrics``. Components report their time with :func:`timed` (or
+:func:`add_time`), which feeds both a histogram and the breakdown of the
+request currently being served, used by the slow-request log.
+"""
+import bisect
+import contextvars
+import logging
+import threading
+import time
+from contextlib import contextmanager
+
+import config
+
+logger = logging.getLogger("jobportal.slow_requests")
+
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def _format_labels(labels: dict) -> str:
+    if not labels:
+        return ""
+    pairs = ",".join(
+        '{}="{}"'.format(k, str(v).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n"))
+        for k, v in labels.items()
+    )
+    return "{" + pairs + "}"
+
+
+class _Metric:
+    type = "untyped"
+
+    def __init__(self, name: str, help: str, labelnames=()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        self._values = {}
+
+    def _key(self, labels: dict) -> tuple:
+        return tuple(labels.get(name, "") for name in self.labelnames)
+
+    def header(self):
+        yield f"# HELP {self.name} {self.help}"
+        yield f"# TYPE {self.name} {self.type}"
+
+    def samples(self):
+        with self._lock:
+            items = list(self._values.items())
+        for key, value in items:
+            yield self.name, dict(zip(self.labelnames, key)), value
+
+
+class Counter(_Metric):
+    type = "counter"
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+
+class Gauge(_Metric):
+    type = "gauge"
+
+    def set(self, value: float, **labels):
+        with self._lock:
+            self._values[self._key(labels)] = value
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def dec(self, amount: float = 1, **labels):
+        self.inc(-amount, **labels)
+
+    def get(self, **labels) -> float:
+        with self._lock:
+            return self._values.get(self._key(labels), 0)
+
+
+class Histogram(_Metric):
+    type = "histogram"
+
+    def __init__(self, name: str, help: str, labelnames=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, help, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                # per-bucket (non-cumulative) counts, then +Inf, sum
+                state = self._values[key] = [[0] * (len(self.buckets) + 1), 0.0]
+            state[0][bisect.bisect_left(self.buckets, value)] += 1
+            state[1] += value
+
+    def samples(self):
+        with self._lock:
+            items = [(key, list(counts), total) for key, (counts, total) in self._values.items()]
+        for key, counts, total in items:
+            labels = dict(zip(self.labelnames, key))
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                le = "+Inf" if bound == float("inf") else repr(bound)
+                yield f"{self.name}_bucket", {**labels, "le": le}, cumulative
+            yield f"{self.name}_sum", labels, total
+            yield f"{self.name}_count", labels, cumulative
+
+
+class CallbackMetric(_Metric):
+    """Metric whose samples are read from ``function`` at scrape time.
+
+    ``function`` returns a number, or an iterable of ``(labels, value)``.
+    """
+
+    def __init__(self, name: str, help: str, function, type: str = "gauge"):
+        super().__init__(name, help)
+        self.function = function
+        self.type = type
+
+    def samples(self):
+        result = self.function()
+        if result is None:
+            return
+        if isinstance(result, (int, float)):
+            yield self.name, {}, result
+            return
+        for labels, value in result:
+            yield self.name, labels, value
+
+
+class Registry:
+    def __init__(self):
+        self._metrics = {}
+
+    def register(self, metric):
+        self._metrics[metric.name] = metric
+        return metric
+
+    def render(self) -> str:
+        lines = []
+        for metric in self._metrics.values():
+            lines.extend(metric.header())
+            for name, labels, value in metric.samples():
+                lines.append(f"{name}{_format_labels(labels)} {value}")
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+HTTP_REQUESTS = REGISTRY.register(Counter(
+    "http_requests_total", "HTTP requests served", ("method", "route", "status")))
+HTTP_LATENCY = REGISTRY.register(Histogram(
+    "http_request_duration_seconds", "HTTP request latency", ("method", "route")))
+HTTP_IN_FLIGHT = REGISTRY.register(Gauge(
+    "http_requests_in_flight", "HTTP requests currently being served"))
+MONGO_LATENCY = REGISTRY.register(Histogram(
+    "mongo_command_duration_seconds", "MongoDB command latency", ("command",)))
+MONGO_FAILURES = REGISTRY.register(Counter(
+    "mongo_command_failures_total", "Failed MongoDB commands", ("command",)))
+MONGO_POOL_CONNECTIONS = REGISTRY.register(Gauge(
+    "mongo_pool_connections", "Open connections in the MongoDB pool"))
+MONGO_POOL_CHECKED_OUT = REGISTRY.register(Gauge(
+    "mongo_pool_checked_out", "Pooled MongoDB connections in use"))
+MONGO_POOL_WAITING = REGISTRY.register(Gauge(
+    "mongo_pool_waiting", "Operations waiting to check out a MongoDB connection"))
+MONGO_POOL_CHECKOUT_FAILURES = REGISTRY.register(Counter(
+    "mongo_pool_checkout_failures_total", "Failed connection checkouts, e.g. wait queue timeouts", ("reason",)))
+HASH_LATENCY = REGISTRY.register(Histogram(
+    "password_hash_duration_seconds", "bcrypt time per operation, excluding queue wait", ("operation",)))
+HASH_QUEUE_WAIT = REGISTRY.register(Histogram(
+    "password_hash_queue_wait_seconds", "Time a hashing job waited for a worker"))
+JWT_LATENCY = REGISTRY.register(Histogram(
+    "jwt_duration_seconds", "JWT encode/decode time", ("operation",),
+    buckets=(0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01)))
+
+
+# Caches reporting hits/misses: name -> callable returning the cache or None
+_caches = {}
+
+
+def register_cache(name: str, get_cache):
+    _caches[name] = get_cache
+
+
+def _cache_samples(attribute):
+    def samples():
+        for name, get_cache in list(_caches.items()):
+            cache = get_cache()
+            if cache is not None:
+                yield {"cache": name}, getattr(cache, attribute)
+    return samples
+
+
+REGISTRY.register(CallbackMetric(
+    "cache_hits_total", "Cache lookups served from the cache", _cache_samples("hits"), type="counter"))
+REGISTRY.register(CallbackMetric(
+    "cache_misses_total", "Cache lookups that fell through", _cache_samples("misses"), type="counter"))
+
+
+# Per-request time breakdown: component -> [seconds, calls]
+_breakdown = contextvars.ContextVar("request_breakdown", default=None)
+
+
+def add_time(component: str, seconds: float):
+    breakdown = _breakdown.get()
+    if breakdown is not None:
+        entry = breakdown.setdefault(component, [0.0, 0])
+        entry[0] += seconds
+        entry[1] += 1
+
+
+@contextmanager
+def timed(component: str, histogram: Histogram = None, **labels):
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        seconds = time.perf_counter() - start
+        if histogram is not None:
+            histogram.observe(seconds, **labels)
+        add_time(component, seconds)
+
+
+def _format_breakdown(breakdown: dict, total: float) -> str:
+    parts = []
+    accounted = 0.0
+    for component, (seconds, calls) in sorted(breakdown.items()):
+        accounted += seconds
+        parts.append(f"{component}={seconds * 1000:.1f}ms/{calls}")
+    parts.append(f"other={max(0.0, total - accounted) * 1000:.1f}ms")
+    return " ".join(parts)
+
+
+class MetricsMiddleware:
+    """ASGI middleware recording per-route latency and in-flight requests."""
+
+    def __init__(self, app, slow_request_ms: float = config.SLOW_REQUEST_MS):
+        self.app = app
+        self.slow_request_ms = slow_request_ms
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status_code = 500
+        event_stream = False
+
+        async def send_wrapper(message):
+            nonlocal status_code, event_stream
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                event_stream = (b"content-type", b"text/event-stream") in (
+                    (name.lower(), value.split(b";")[0]) for name, value in message.get("headers", ())
+                )
+            await send(message)
+
+        breakdown = {}
+        token = _breakdown.set(breakdown)
+        HTTP_IN_FLIGHT.inc()
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            elapsed = time.perf_counter() - start
+            HTTP_IN_FLIGHT.dec()
+            _breakdown.reset(token)
+            # Label by route template, never the raw path, to bound cardinality
+            route = scope.get("route")
+            route = getattr(route, "path", "unmatched")
+            method = scope["method"]
+            HTTP_REQUESTS.inc(method=method, route=route, status=status_code)
+            # An event stream lasts as long as its client stays connected; not a latency
+            if not event_stream:
+                HTTP_LATENCY.observe(elapsed, method=method, route=route)
+                if self.slow_request_ms and elapsed * 1000 >= self.slow_request_ms:
+                    logger.warning(
+                        "slow request %s %s %d %.1fms: %s",
+                        method, scope["path"], status_code, elapsed * 1000,
+                        _format_breakdown(breakdown, elapsed),
+                    )
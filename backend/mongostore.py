@@ -0,0 +1,348 @@
+"""The MongoDB storage engine, built on Motor.
+
+Kept apart from :mod:`storage` so that motor and pymongo (and dnspython,
+which pymongo pulls in) are imported only when ``STORAGE_ENGINE=mongo``.
+The driver's command and pool events feed the Mongo metrics in
+:mod:`metrics`.
+"""
+import logging
+import re
+from datetime import datetime
+
+from pymongo import ASCENDING, DESCENDING, UpdateOne, monitoring
+from pymongo.errors import BulkWriteError, ConnectionFailure, DuplicateKeyError, ExecutionTimeout
+
+import search
+from metrics import (
+    MONGO_FAILURES, MONGO_LATENCY, MONGO_POOL_CHECKED_OUT, MONGO_POOL_CHECKOUT_FAILURES,
+    MONGO_POOL_CONNECTIONS, MONGO_POOL_WAITING, add_time,
+)
+from storage import (
+    LIST_PROJECTION, PUBLIC_PROJECTION, DuplicateEmailError, IndexMigrationError, UserStore,
+)
+
+logger = logging.getLogger("jobportal.mongo")
+
+# Keyset order for paginated listings; (created_at, id) is unique per user
+LIST_SORT = [("created_at", ASCENDING), ("id", ASCENDING)]
+
+# (name, key, unique) for every index the users collection must have
+USER_INDEXES = [
+    ("email_unique", [("email", ASCENDING)], True),
+    ("id_unique", [("id", ASCENDING)], True),
+    ("user_type", [("user_type", ASCENDING)], False),
+    ("created_at_id", LIST_SORT, False),
+    ("user_type_created_at_id", [("user_type", ASCENDING)] + LIST_SORT, False),
+    ("search_keys", [("search_keys", ASCENDING)], False),
+]
+
+# search_keys are derived in Python (search.search_keys) for old users too, so
+# backfilled keys match new users' exactly; written this many per bulk_write
+SEARCH_KEYS_BACKFILL_BATCH = 1000
+
+# Version 1 was a server-side backfill that split names on " " only and
+# lowercased ASCII only; users it may have keyed differently are redone once
+SEARCH_KEYS_VERSION_ID = "search_keys_version"
+SEARCH_KEYS_VERSION = 2
+SEARCH_KEYS_REPAIR = [{"name": {"$regex": "[^ -~]"}}, {"email": {"$regex": "[^ -~]"}}]
+
+# Document in the side ``stats`` collection holding materialized user counts
+USER_COUNTS_ID = "user_counts"
+
+# Document in ``stats`` whose version is bumped whenever users are added
+USERS_VERSION_ID = "users_version"
+
+# Change-stream events that can change user counts; only the resume token is kept
+USER_CHANGES = [
+    {"$match": {"operationType": {"$in": ["insert", "replace", "delete"]}}},
+    {"$project": {"_id": 1}},
+]
+
+
+def _is_duplicate_email(details: dict, message: str) -> bool:
+    # keyPattern is only reported by MongoDB 4.2+; fall back to the index name
+    return details.get("code", 11000) == 11000 and (
+        "email" in details.get("keyPattern", {})
+        or "email" in details.get("keyValue", {})
+        or "email_unique" in message
+    )
+
+
+class MongoUserStore(UserStore):
+    """Async data-access layer over the ``users`` collection."""
+
+    # Covers AutoReconnect, NetworkTimeout and server selection/pool timeouts
+    transient_errors = (ConnectionFailure, ExecutionTimeout)
+
+    def __init__(self, client, collection, stats_collection=None, login_events=None):
+        self.client = client
+        self.collection = collection
+        self.stats_collection = stats_collection
+        self.login_events = login_events
+
+    @property
+    def database(self):
+        return self.collection.database
+
+    async def ping(self):
+        await self.client.admin.command('ismaster')
+
+    async def find_by_email(self, email: str):
+        return await self.collection.find_one({"email": email})
+
+    async def find_by_id(self, user_id: str):
+        return await self.collection.find_one({"id": user_id}, PUBLIC_PROJECTION)
+
+    async def ensure_indexes(self):
+        """Create the users indexes and verify they exist; fail fast otherwise."""
+        for name, keys, unique in USER_INDEXES:
+            try:
+                await self.collection.create_index(keys, name=name, unique=unique)
+            except DuplicateKeyError as e:
+                raise IndexMigrationError(
+                    f"Cannot build unique index {name!r}: duplicate values exist ({e.details})"
+                ) from e
+        existing = await self.collection.index_information()
+        missing = [name for name, _, _ in USER_INDEXES if name not in existing]
+        if missing:
+            raise IndexMigrationError(f"Missing indexes on users: {missing}")
+        if self.login_events is not None:
+            await self.login_events.create_index(
+                [("user_id", ASCENDING), ("at", DESCENDING)], name="user_id_at")
+        # Users created before search existed have no keys yet
+        query = {"search_keys": {"$exists": False}}
+        outdated = False
+        if self.stats_collection is not None:
+            marker = await self.stats_collection.find_one({"_id": SEARCH_KEYS_VERSION_ID}) or {}
+            outdated = marker.get("version", 1) < SEARCH_KEYS_VERSION
+            if outdated:
+                query = {"$or": [query] + SEARCH_KEYS_REPAIR}
+        await self._backfill_search_keys(query)
+        if outdated:
+            await self.stats_collection.update_one(
+                {"_id": SEARCH_KEYS_VERSION_ID}, {"$set": {"version": SEARCH_KEYS_VERSION}}, upsert=True)
+
+    async def _backfill_search_keys(self, query: dict):
+        batch = []
+        async for user in self.collection.find(query, {"_id": 1, "name": 1, "email": 1}):
+            keys = search.search_keys(user["name"], user["email"])
+            batch.append(UpdateOne({"_id": user["_id"]}, {"$set": {"search_keys": keys}}))
+            if len(batch) >= SEARCH_KEYS_BACKFILL_BATCH:
+                await self.collection.bulk_write(batch, ordered=False)
+                batch = []
+        if batch:
+            await self.collection.bulk_write(batch, ordered=False)
+
+    async def insert(self, user: dict):
+        user.setdefault("search_keys", search.search_keys(user["name"], user["email"]))
+        try:
+            await self.collection.insert_one(user)
+        except DuplicateKeyError as e:
+            # keyPattern is only reported by MongoDB 4.2+; fall back to the index name
+            if _is_duplicate_email(e.details or {}, str(e)):
+                raise DuplicateEmailError(user["email"]) from e
+            raise
+        await self._bump_users_version(1)
+
+    async def update_password(self, user_id: str, hashed_password: str):
+        await self.collection.update_one(
+            {"id": user_id},
+            {"$set": {"password": hashed_password, "updated_at": datetime.utcnow()}},
+        )
+
+    async def record_logins(self, events: list) -> dict:
+        # $max keeps the newest timestamp when batches land out of order
+        await self.collection.bulk_write(
+            [UpdateOne({"id": event["user_id"]}, {"$max": {"last_login_at": event["at"]}}) for event in events],
+            ordered=False,
+        )
+        await self.login_events.insert_many([dict(event) for event in events], ordered=False)
+        return {}
+
+    async def insert_many(self, users: list) -> dict:
+        """Unordered bulk insert; returns ``{index: DuplicateEmailError or message}`` for failed rows."""
+        for user in users:
+            user.setdefault("search_keys", search.search_keys(user["name"], user["email"]))
+        failed = {}
+        try:
+            await self.collection.insert_many(users, ordered=False)
+        except BulkWriteError as e:
+            for error in e.details.get("writeErrors", []):
+                index = error["index"]
+                if _is_duplicate_email(error, error.get("errmsg", "")):
+                    failed[index] = DuplicateEmailError(users[index]["email"])
+                else:
+                    failed[index] = error.get("errmsg", "write failed")
+        if len(failed) < len(users):
+            await self._bump_users_version(len(users) - len(failed))
+        return failed
+
+    async def _bump_users_version(self, amount: int):
+        # Best effort: the users are already committed, and failing here
+        # would fail their inserts. A missed bump only leaves cached
+        # listings' ETags stale until the next signup
+        try:
+            await self.stats_collection.update_one(
+                {"_id": USERS_VERSION_ID}, {"$inc": {"version": amount}}, upsert=True
+            )
+        except Exception as e:
+            logger.warning("users version not bumped for %d new users: %s", amount, e)
+
+    async def read_users_version(self) -> int:
+        """Changes whenever users are added; used to validate cached listings."""
+        doc = await self.stats_collection.find_one({"_id": USERS_VERSION_ID})
+        return doc["version"] if doc else 0
+
+    async def watch(self):
+        """Change stream on ``users``; needs a replica set or sharded cluster."""
+        async with self.collection.watch(USER_CHANGES) as stream:
+            # try_next opens the stream (raising on a standalone server); any
+            # change it returns is covered by the refresh the first yield causes
+            await stream.try_next()
+            yield
+            async for _ in stream:
+                yield
+
+    def find_page(self, user_type=None, created_after=None, created_before=None,
+                  after=None, limit=None, batch_size=500):
+        """Cursor over users in (created_at, id) order, resuming after ``after``.
+
+        ``after`` is the ``(created_at, id)`` of the last row already seen.
+        """
+        query = self._page_query(user_type, created_after, created_before, after)
+        return self._page(query, limit, batch_size)
+
+    def search(self, query: str, user_type=None, after=None, limit=None, batch_size=500):
+        """Like :meth:`find_page`, for users matching a prefix ``query``.
+
+        Anchored, case-sensitive regexes on the lowercased ``search_keys``
+        become index range scans.
+        """
+        conditions = [
+            {"search_keys": {"$regex": "^" + re.escape(term)}} for term in search.query_terms(query)
+        ]
+        conditions.append(self._page_query(user_type, None, None, after))
+        return self._page({"$and": conditions}, limit, batch_size)
+
+    @staticmethod
+    def _page_query(user_type, created_after, created_before, after) -> dict:
+        query = {}
+        if user_type is not None:
+            query["user_type"] = user_type
+        created_range = {}
+        if created_after is not None:
+            created_range["$gte"] = created_after
+        if created_before is not None:
+            created_range["$lt"] = created_before
+        if created_range:
+            query["created_at"] = created_range
+        if after is not None:
+            last_created_at, last_id = after
+            query["$or"] = [
+                {"created_at": {"$gt": last_created_at}},
+                {"created_at": last_created_at, "id": {"$gt": last_id}},
+            ]
+        return query
+
+    def _page(self, query: dict, limit, batch_size):
+        cursor = self.collection.find(query, LIST_PROJECTION).sort(LIST_SORT).batch_size(batch_size)
+        if limit is not None:
+            cursor = cursor.limit(limit)
+        return cursor
+
+    async def count_by_user_type(self) -> dict:
+        """Users per user_type in a single ``$group`` pass."""
+        pipeline = [{"$group": {"_id": "$user_type", "count": {"$sum": 1}}}]
+        counts = {}
+        async for row in self.collection.aggregate(pipeline):
+            counts[row["_id"]] = row["count"]
+        return counts
+
+    async def rebuild_user_counts(self) -> dict:
+        counts = await self.count_by_user_type()
+        await self.stats_collection.replace_one(
+            {"_id": USER_COUNTS_ID}, {"_id": USER_COUNTS_ID, **counts}, upsert=True
+        )
+        return counts
+
+    async def ensure_user_counts(self) -> bool:
+        if await self.stats_collection.find_one({"_id": USER_COUNTS_ID}, {"_id": 1}) is not None:
+            return False
+        counts = await self.count_by_user_type()
+        try:
+            # insert, not replace: counters that exist already are live
+            await self.stats_collection.insert_one({"_id": USER_COUNTS_ID, **counts})
+        except DuplicateKeyError:
+            # Another worker built them first
+            return False
+        return True
+
+    async def increment_user_count(self, user_type: str, amount: int = 1):
+        # No upsert: a partial document would stop ensure_user_counts building them
+        await self.stats_collection.update_one({"_id": USER_COUNTS_ID}, {"$inc": {user_type: amount}})
+
+    async def read_user_counts(self) -> dict:
+        doc = await self.stats_collection.find_one({"_id": USER_COUNTS_ID}) or {}
+        doc.pop("_id", None)
+        return doc
+
+
+class MongoCommandListener(monitoring.CommandListener):
+    """Times every command the driver sends.
+
+    Motor runs the driver in worker threads but copies the caller's context,
+    so the time is also attributed to the request that issued the command.
+    """
+
+    def started(self, event):
+        pass
+
+    def succeeded(self, event):
+        seconds = event.duration_micros / 1e6
+        MONGO_LATENCY.observe(seconds, command=event.command_name)
+        add_time("db", seconds)
+
+    def failed(self, event):
+        seconds = event.duration_micros / 1e6
+        MONGO_LATENCY.observe(seconds, command=event.command_name)
+        MONGO_FAILURES.inc(command=event.command_name)
+        add_time("db", seconds)
+
+
+class MongoPoolListener(monitoring.ConnectionPoolListener):
+    """Tracks pool occupancy; checked-out versus maxPoolSize is saturation."""
+
+    def pool_created(self, event):
+        pass
+
+    def pool_ready(self, event):
+        pass
+
+    def pool_cleared(self, event):
+        pass
+
+    def pool_closed(self, event):
+        pass
+
+    def connection_created(self, event):
+        MONGO_POOL_CONNECTIONS.inc()
+
+    def connection_ready(self, event):
+        pass
+
+    def connection_closed(self, event):
+        MONGO_POOL_CONNECTIONS.dec()
+
+    def connection_check_out_started(self, event):
+        MONGO_POOL_WAITING.inc()
+
+    def connection_check_out_failed(self, event):
+        MONGO_POOL_WAITING.dec()
+        MONGO_POOL_CHECKOUT_FAILURES.inc(reason=event.reason)
+
+    def connection_checked_out(self, event):
+        MONGO_POOL_WAITING.dec()
+        MONGO_POOL_CHECKED_OUT.inc()
+
+    def connection_checked_in(self, event):
+        MONGO_POOL_CHECKED_OUT.dec()
@@ -0,0 +1,191 @@
+"""Rate limiting for the unauthenticated, bcrypt-heavy auth endpoints.
+
+Two backends implement ``hit(key, limit, period) -> retry_after``:
+
+* :class:`MemoryBackend` - token buckets in process memory; exact, but each
+  worker process enforces its own limits.
+* :class:`SlidingWindowBackend` - sliding-window counters kept in a
+  :class:`SharedStore`, so every worker sees the same counts.
+"""
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta
+
+import config
+import metrics
+
+RATE_LIMIT_REJECTIONS = metrics.REGISTRY.register(metrics.Counter(
+    "rate_limit_rejections_total", "Requests rejected by a rate limit rule", ("rule",)))
+
+
+def parse_rule(spec: str):
+    """``"20/60"`` -> 20 requests per 60 seconds."""
+    limit, period = spec.split("/", 1)
+    return int(limit), float(period)
+
+
+class RateLimitExceeded(Exception):
+    def __init__(self, rule: str, retry_after: float):
+        super().__init__(f"Rate limit {rule!r} exceeded")
+        self.rule = rule
+        self.retry_after = retry_after
+
+
+class MemoryBackend:
+    """Token bucket per key; refills ``limit`` tokens every ``period`` seconds."""
+
+    def __init__(self, max_keys: int = 100_000, clock=time.monotonic):
+        self.max_keys = max_keys
+        self._clock = clock
+        self._buckets = OrderedDict()
+
+    async def hit(self, key: str, limit: int, period: float) -> float:
+        now = self._clock()
+        rate = limit / period
+        tokens, updated_at = self._buckets.get(key, (limit, now))
+        tokens = min(limit, tokens + (now - updated_at) * rate)
+        if tokens >= 1:
+            tokens -= 1
+            retry_after = 0.0
+        else:
+            retry_after = (1 - tokens) / rate
+        self._buckets[key] = (tokens, now)
+        self._buckets.move_to_end(key)
+        while len(self._buckets) > self.max_keys:
+            self._buckets.popitem(last=False)
+        return retry_after
+
+
+class SharedStore:
+    """Interface of a store shared by all workers (Redis-style counters).
+
+    ``incr`` must be atomic across processes and create missing keys at 0.
+    """
+
+    async def incr(self, key: str, ttl: float) -> int:
+        raise NotImplementedError
+
+    async def get(self, key: str) -> int:
+        raise NotImplementedError
+
+
+class MemorySharedStore(SharedStore):
+    """Local stand-in for a shared store, for single-host tests and benchmarks."""
+
+    def __init__(self, clock=time.monotonic):
+        self._clock = clock
+        self._counters = {}
+
+    async def incr(self, key, ttl):
+        now = self._clock()
+        count, expires_at = self._counters.get(key, (0, now + ttl))
+        if expires_at <= now:
+            count, expires_at = 0, now + ttl
+        self._counters[key] = (count + 1, expires_at)
+        if len(self._counters) > 100_000:
+            self._counters = {k: v for k, v in self._counters.items() if v[1] > now}
+        return count + 1
+
+    async def get(self, key):
+        count, expires_at = self._counters.get(key, (0, 0.0))
+        return count if expires_at > self._clock() else 0
+
+
+class MongoSharedStore(SharedStore):
+    """Counters in a Mongo collection, expired by a TTL index.
+
+    Calls go through ``run`` (the user store's :meth:`storage.UserStore.run`)
+    for its timeouts and circuit breaker.
+    """
+
+    def __init__(self, collection, run):
+        self.collection = collection
+        self._run = run
+
+    async def ensure_indexes(self):
+        await self.collection.create_index("expires_at", expireAfterSeconds=0)
+
+    async def incr(self, key, ttl):
+        from pymongo import ReturnDocument
+
+        doc = await self._run(
+            self.collection.find_one_and_update,
+            {"_id": key},
+            {"$inc": {"count": 1}, "$setOnInsert": {"expires_at": datetime.utcnow() + timedelta(seconds=ttl)}},
+            upsert=True,
+            return_document=ReturnDocument.AFTER,
+        )
+        return doc["count"]
+
+    async def get(self, key):
+        doc = await self._run(self.collection.find_one, {"_id": key})
+        return doc["count"] if doc else 0
+
+
+class SlidingWindowBackend:
+    """Sliding-window limit approximated from two fixed-window counters."""
+
+    def __init__(self, store: SharedStore, clock=time.time):
+        self.store = store
+        self._clock = clock
+
+    async def hit(self, key: str, limit: int, period: float) -> float:
+        now = self._clock()
+        window = int(now // period)
+        elapsed = now - window * period
+        current = await self.store.incr(f"{key}:{window}", ttl=2 * period)
+        previous = await self.store.get(f"{key}:{window - 1}")
+        estimated = previous * (1 - elapsed / period) + current
+        if estimated <= limit:
+            return 0.0
+        return period - elapsed
+
+
+class RateLimiter:
+    """Named rules applied to keys such as a client IP or an email."""
+
+    def __init__(self, backend, rules: dict):
+        self.backend = backend
+        self.rules = rules
+
+    async def check(self, rule: str, key: str):
+        limit, period = self.rules[rule]
+        retry_after = await self.backend.hit(f"{rule}:{key}", limit, period)
+        if retry_after > 0:
+            RATE_LIMIT_REJECTIONS.inc(rule=rule)
+            raise RateLimitExceeded(rule, retry_after)
+
+
+DEFAULT_RULES = {
+    "signin_ip": parse_rule(config.RATE_LIMIT_SIGNIN_IP),
+    "signin_email": parse_rule(config.RATE_LIMIT_SIGNIN_EMAIL),
+    "signup_ip": parse_rule(config.RATE_LIMIT_SIGNUP_IP),
+}
+
+_limiter = None
+
+
+async def start(store, backend: str = config.RATE_LIMIT_BACKEND, rules: dict = None) -> RateLimiter:
+    """Build the limiter; the 'mongo' backend shares counters across workers."""
+    global _limiter
+    if backend == "memory":
+        limiter_backend = MemoryBackend()
+    elif backend == "mongo":
+        shared = MongoSharedStore(store.database.rate_limits, store.run)
+        await shared.ensure_indexes()
+        limiter_backend = SlidingWindowBackend(shared)
+    else:
+        raise ValueError(f"Unknown rate limit backend: {backend!r}")
+    _limiter = RateLimiter(limiter_backend, rules or DEFAULT_RULES)
+    return _limiter
+
+
+def shutdown():
+    global _limiter
+    _limiter = None
+
+
+def get_rate_limiter() -> RateLimiter:
+    if _limiter is None:
+        raise RuntimeError("Rate limiter is not running; ratelimit.start() must run at startup")
+    return _limiter
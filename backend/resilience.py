@@ -0,0 +1,273 @@
+"""Bounded storage calls: per-call timeouts, request deadlines and a circuit breaker.
+
+:class:`GuardedUserStore` wraps the storage engine so that no request waits
+on the database for longer than its budget. Each call gets
+``DB_OPERATION_TIMEOUT_MS``, capped by what is left of the request's
+``DB_REQUEST_DEADLINE_MS`` (set by :class:`DeadlineMiddleware`; time spent
+hashing passwords is not counted). Timeouts and connection errors trip a
+:class:`CircuitBreaker`; while it is open, calls raise
+:class:`storage.DatabaseUnavailable` at once, which the API answers with
+503 and ``Retry-After``, instead of queueing behind a sick database.
+Sessions and the shared rate-limit counters reach their collections through
+:meth:`storage.UserStore.run`, so they share the timeouts and the breaker.
+
+An abandoned driver call keeps its pool connection until the driver gives
+up too, so ``MONGO_SOCKET_TIMEOUT_MS`` bounds how long a stall can hold the
+pool.
+"""
+import asyncio
+import contextvars
+import logging
+import time
+from contextlib import contextmanager
+
+import config
+import metrics
+from storage import DatabaseUnavailable, UserStoreWrapper
+
+logger = logging.getLogger("jobportal.resilience")
+
+CLOSED, HALF_OPEN, OPEN = "closed", "half_open", "open"
+_STATE_VALUES = {CLOSED: 0, HALF_OPEN: 1, OPEN: 2}
+
+CIRCUIT_STATE = metrics.REGISTRY.register(metrics.Gauge(
+    "db_circuit_state", "Database circuit breaker state (0 closed, 1 half-open, 2 open)", ("circuit",)))
+CIRCUIT_OPENED = metrics.REGISTRY.register(metrics.Counter(
+    "db_circuit_opened_total", "Times the database circuit breaker opened", ("circuit",)))
+CIRCUIT_REJECTED = metrics.REGISTRY.register(metrics.Counter(
+    "db_circuit_rejected_total", "Storage calls failed fast by an open circuit", ("circuit",)))
+DB_TIMEOUTS = metrics.REGISTRY.register(metrics.Counter(
+    "db_call_timeouts_total", "Storage calls abandoned at their timeout or the request deadline", ("reason",)))
+
+# Monotonic time by which the current request must be done with the database
+_deadline = contextvars.ContextVar("db_deadline", default=None)
+
+# Per-call timeout replacing GuardedUserStore.timeout, set by call_timeout()
+_call_timeout = contextvars.ContextVar("db_call_timeout", default=None)
+
+
+def remaining() -> float:
+    """Seconds left before the current request's deadline, or None if it has none."""
+    deadline = _deadline.get()
+    return None if deadline is None else deadline - time.monotonic()
+
+
+@contextmanager
+def no_deadline():
+    """Lift the request deadline: for long uploads into the DB, and for work
+    that must not fail the request once its main write is committed."""
+    token = _deadline.set(None)
+    try:
+        yield
+    finally:
+        _deadline.reset(token)
+
+
+@contextmanager
+def paused_deadline():
+    """Push the request deadline back by the time spent in the block.
+
+    For waits that are not the database's, such as the password-hashing
+    queue, so a slow hash does not fail the storage calls that follow it.
+    """
+    started = time.monotonic()
+    try:
+        yield
+    finally:
+        deadline = _deadline.get()
+        if deadline is not None:
+            _deadline.set(deadline + time.monotonic() - started)
+
+
+@contextmanager
+def call_timeout(seconds: float):
+    """Give each storage call in the block ``seconds`` rather than the
+    store's timeout: for bulk writes, slow by their size rather than
+    because the database is unwell."""
+    token = _call_timeout.set(seconds)
+    try:
+        yield
+    finally:
+        _call_timeout.reset(token)
+
+
+class DeadlineMiddleware:
+    """ASGI middleware giving each HTTP request a ``budget`` in seconds.
+
+    The clock starts with the request and is wall time, except for blocks
+    run under :func:`paused_deadline`. Storage calls made after the deadline
+    fail at once; calls made before it are cut off when it passes.
+    """
+
+    def __init__(self, app, budget: float = config.DB_REQUEST_DEADLINE_MS / 1000):
+        self.app = app
+        self.budget = budget
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        token = _deadline.set(time.monotonic() + self.budget)
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            _deadline.reset(token)
+
+
+class CircuitBreaker:
+    """Opens after ``threshold`` consecutive failures, rejecting calls for
+    ``reset_timeout`` seconds; then lets one trial call through (half-open)
+    and closes again if it succeeds.
+    """
+
+    def __init__(self, name: str, threshold: int = config.DB_BREAKER_FAILURES,
+                 reset_timeout: float = config.DB_BREAKER_RESET_SECONDS, clock=time.monotonic):
+        self.name = name
+        self.threshold = threshold
+        self.reset_timeout = reset_timeout
+        self._clock = clock
+        self.state = CLOSED
+        self.failures = 0
+        self.opened = 0
+        self.rejected = 0
+        self._opened_at = None
+        self._trial = False
+        CIRCUIT_STATE.set(0, circuit=name)
+
+    def _set_state(self, state: str):
+        if state != self.state:
+            logger.warning("%s circuit %s -> %s", self.name, self.state, state)
+            self.state = state
+            CIRCUIT_STATE.set(_STATE_VALUES[state], circuit=self.name)
+
+    def retry_after(self) -> float:
+        if self.state != OPEN:
+            return self.reset_timeout
+        return max(0.0, self._opened_at + self.reset_timeout - self._clock())
+
+    def before_call(self):
+        """Raise DatabaseUnavailable unless a call may go ahead now."""
+        if self.state == OPEN and self._clock() - self._opened_at >= self.reset_timeout:
+            self._set_state(HALF_OPEN)
+        if self.state == CLOSED:
+            return
+        if self.state == HALF_OPEN and not self._trial:
+            self._trial = True
+            return
+        self.rejected += 1
+        CIRCUIT_REJECTED.inc(circuit=self.name)
+        raise DatabaseUnavailable(f"{self.name} circuit is {self.state}", self.retry_after())
+
+    def success(self):
+        self.failures = 0
+        self._trial = False
+        self._set_state(CLOSED)
+
+    def failure(self):
+        self.failures += 1
+        self._trial = False
+        if self.state == HALF_OPEN or self.failures >= self.threshold:
+            if self.state != OPEN:
+                self.opened += 1
+                CIRCUIT_OPENED.inc(circuit=self.name)
+            self._opened_at = self._clock()
+            self._set_state(OPEN)
+
+    def abandon(self):
+        """The call ended without telling us about the database (cancelled)."""
+        self._trial = False
+
+    def stats(self) -> dict:
+        return {
+            "state": self.state,
+            "consecutive_failures": self.failures,
+            "opened": self.opened,
+            "rejected": self.rejected,
+        }
+
+
+class _GuardedCursor:
+    # Only the first fetch is timed: a timeout per document would cost a
+    # task per row when streaming, and later batches are bounded by the
+    # driver's socket timeout
+    def __init__(self, store, cursor):
+        self._store = store
+        self._cursor = cursor
+
+    async def to_list(self, length=None):
+        return await self._store._call(self._cursor.to_list, length)
+
+    def __aiter__(self):
+        return self._iterate()
+
+    async def _iterate(self):
+        rows = self._cursor.__aiter__()
+        try:
+            yield await self._store._call(rows.__anext__)
+        except StopAsyncIteration:
+            return
+        try:
+            async for row in rows:
+                yield row
+        except self._store.transient_errors as e:
+            self._store.breaker.failure()
+            raise DatabaseUnavailable(f"database read failed: {e}", self._store.breaker.retry_after()) from e
+
+
+class GuardedUserStore(UserStoreWrapper):
+    """Storage calls bounded by a timeout and the request deadline, behind a breaker."""
+
+    def __init__(self, inner, timeout: float = config.DB_OPERATION_TIMEOUT_MS / 1000,
+                 breaker: CircuitBreaker = None):
+        super().__init__(inner)
+        self.timeout = timeout
+        self.breaker = breaker or CircuitBreaker("users")
+
+    async def _call(self, function, *args, **kwargs):
+        limit = _call_timeout.get() or self.timeout
+        left = remaining()
+        timeout = limit if left is None else min(limit, left)
+        if timeout <= 0:
+            DB_TIMEOUTS.inc(reason="deadline")
+            raise DatabaseUnavailable("request deadline exceeded")
+        self.breaker.before_call()
+        try:
+            result = await asyncio.wait_for(function(*args, **kwargs), timeout)
+        except asyncio.TimeoutError:
+            if timeout < limit:
+                # The request ran out of time; the database may be fine
+                DB_TIMEOUTS.inc(reason="deadline")
+                self.breaker.abandon()
+                raise DatabaseUnavailable("request deadline exceeded") from None
+            DB_TIMEOUTS.inc(reason="timeout")
+            self.breaker.failure()
+            raise DatabaseUnavailable(
+                f"database call timed out after {timeout:.3g}s", self.breaker.retry_after()) from None
+        except asyncio.CancelledError:
+            self.breaker.abandon()
+            raise
+        except self.transient_errors as e:
+            self.breaker.failure()
+            raise DatabaseUnavailable(f"database unavailable: {e}", self.breaker.retry_after()) from e
+        except Exception:
+            # The database answered; the operation itself was rejected
+            self.breaker.success()
+            raise
+        self.breaker.success()
+        return result
+
+    def _cursor(self, cursor):
+        return _GuardedCursor(self, cursor)
+
+    # Startup migrations may legitimately take longer than a request's budget
+    async def ensure_indexes(self):
+        return await self.inner.ensure_indexes()
+
+    async def rebuild_user_counts(self):
+        return await self.inner.rebuild_user_counts()
+
+    async def ensure_user_counts(self):
+        return await self.inner.ensure_user_counts()
+
+    def stats(self) -> dict:
+        return {"timeout_ms": self.timeout * 1000, "circuit": self.breaker.stats()}
@@ -0,0 +1,76 @@
+"""Prefix search over user names and emails.
+
+Every user is indexed under the lowercased words of their name and their
+lowercased email. A query is split on whitespace; each term must be a prefix
+of one of the user's keys, so ``"jo sm"`` finds "John Smith" and ``"john@"``
+finds john@example.com. Mongo stores the keys in ``search_keys`` behind a
+multikey index; :class:`PrefixIndex` is the in-process equivalent.
+"""
+import sys
+from array import array
+from bisect import bisect_left
+
+
+def search_keys(name: str, email: str) -> list:
+    # Name words repeat across users; interning keeps one copy of each
+    keys = [sys.intern(word) for word in name.lower().split()]
+    return list(dict.fromkeys(keys + [email.lower()]))
+
+
+def query_terms(query: str) -> list:
+    return query.lower().split()
+
+
+def matches(terms, keys) -> bool:
+    return all(any(key.startswith(term) for key in keys) for term in terms)
+
+
+class PrefixIndex:
+    """Sorted keys with a parallel array of row numbers.
+
+    The keys sharing a prefix form one contiguous run, found by bisection,
+    so a lookup costs O(log n + matches). Row numbers index ``ids`` and are
+    stored in a C array rather than as Python ints.
+    """
+
+    def __init__(self):
+        self._keys = []
+        self._rows = array("L")
+        self.ids = []
+
+    def __len__(self):
+        return len(self.ids)
+
+    def add(self, doc_id: str, keys):
+        row = len(self.ids)
+        self.ids.append(doc_id)
+        for key in keys:
+            position = bisect_left(self._keys, key)
+            self._keys.insert(position, key)
+            self._rows.insert(position, row)
+
+    def add_many(self, docs):
+        """Index ``(doc_id, keys)`` pairs with one sort instead of an insert each."""
+        pairs = list(zip(self._keys, self._rows))
+        for doc_id, keys in docs:
+            row = len(self.ids)
+            self.ids.append(doc_id)
+            pairs.extend((key, row) for key in keys)
+        pairs.sort()
+        self._keys = [key for key, _ in pairs]
+        self._rows = array("L", (row for _, row in pairs))
+
+    def _run(self, prefix: str):
+        # Keys starting with prefix sort between prefix and its successor
+        successor = prefix[:-1] + chr(ord(prefix[-1]) + 1)
+        return bisect_left(self._keys, prefix), bisect_left(self._keys, successor)
+
+    def count(self, prefix: str) -> int:
+        """Keys starting with ``prefix``; an upper bound on matching documents."""
+        start, end = self._run(prefix)
+        return end - start
+
+    def lookup(self, prefix: str) -> list:
+        """Ids of documents with a key starting with ``prefix``, each once."""
+        start, end = self._run(prefix)
+        return [self.ids[row] for row in dict.fromkeys(self._rows[start:end])]
@@ -1,22 +1,83 @@
-from fastapi import FastAPI, HTTPException, Depends, status 
+from fastapi import FastAPI, HTTPException, Depends, Query, Request, status 
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, ORJSONResponse, PlainTextResponse, StreamingResponse
 from pydantic import BaseModel, EmailStr
-from pymongo import MongoClient
-from passlib.context import CryptContext
-from jose import JWTError, jwt
-from datetime import datetime, timedelta
-import os
+import orjson
+from contextlib import asynccontextmanager
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timedelta, timezone
+import base64
+import logging
+import math
 import uuid
-from typing import Optional
+from typing import List, Literal, Optional
 
-# Environment variables
-MONGO_URL = os.environ.get('MONGO_URL', 'mongodb://localhost:27017/')
-SECRET_KEY = os.environ.get('SECRET_KEY', 'your-secret-key-change-this-in-production')
-ALGORITHM = "HS256"
-ACCESS_TOKEN_EXPIRE_MINUTES = 30
+import bulk
+import hashing
+import health
+import metrics
+import ratelimit
+import resilience
+import sessions
+import stats
+import statsstream
+import storage
+import writebehind
+from cache import TTLCache
+from config import (
+    ACCESS_TOKEN_EXPIRE_MINUTES, HASH_RETRY_AFTER_SECONDS,
+    PRINCIPAL_CACHE_SIZE, PRINCIPAL_CACHE_TTL_SECONDS, AUTH_STATELESS,
+    DEFAULT_USERS_PAGE_SIZE, MAX_USERS_PAGE_SIZE, SEARCH_MIN_TERM_LENGTH, BULK_IMPORT_WORKERS, BULK_IMPORT_ADMINS,
+    STATS_CACHE_TTL_SECONDS, STATS_STREAM_INTERVAL_SECONDS,
+)
+from hashing import HashExecutor, HashQueueFull, get_hasher
+from health import HealthMonitor, get_health_monitor
+from httpcache import ConditionalGet, make_etag
+from metrics import MetricsMiddleware
+from ratelimit import RateLimiter, RateLimitExceeded, get_rate_limiter
+from resilience import DeadlineMiddleware, GuardedUserStore
+from sessions import InvalidRefreshToken, SessionService, get_session_service
+from singleflight import SingleFlight
+from stats import USER_TYPES, StatsService, get_stats_service
+from statsstream import StatsBroadcaster, get_stats_broadcaster
+from tokens import TokenError, get_token_service
+from storage import DatabaseUnavailable, DuplicateEmailError, UserStore, get_user_store
+from writebehind import WriteBehind, get_write_behind
+
+logger = logging.getLogger("jobportal.api")
 
-app = FastAPI(title="JobPortal API", version="1.0.0")
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Database connection pool is created per worker process, on its event loop
+    store = storage.connect()
+    await store.ensure_indexes()
+    stats_service = await stats.start(store)
+    await ratelimit.start(store)
+    await sessions.start(store)
+    await writebehind.start(store)
+    hashing.start()
+    bulk.start()
+    await health.start(store)
+    await statsstream.start(stats_service, store)
+    yield
+    await statsstream.shutdown()
+    await health.shutdown()
+    hashing.shutdown()
+    bulk.shutdown()
+    # Requests have finished; write out anything still buffered
+    await writebehind.shutdown()
+    sessions.shutdown()
+    ratelimit.shutdown()
+    stats.shutdown()
+    storage.close()
+
+app = FastAPI(
+    title="JobPortal API",
+    version="1.0.0",
+    lifespan=lifespan,
+    default_response_class=ORJSONResponse,
+)
 
 # CORS middleware
 app.add_middleware(
@@ -27,17 +88,43 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Database connection
-client = MongoClient(MONGO_URL)
-db = client.jobportal
-users_collection = db.users
+# Per-route latency, in-flight requests and the opt-in slow-request log
+app.add_middleware(MetricsMiddleware)
 
-# Password hashing
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+# Caps the time each request may spend waiting on the database
+app.add_middleware(DeadlineMiddleware)
 
 # JWT Authentication
 security = HTTPBearer()
 
+# Authenticated users by id, so get_current_user skips Mongo on repeat requests
+principal_cache = TTLCache(maxsize=PRINCIPAL_CACHE_SIZE, ttl=PRINCIPAL_CACHE_TTL_SECONDS)
+metrics.register_cache("principal", lambda: principal_cache)
+
+# Cache misses for the same user, or version reads, arriving together share one query
+principal_flight = SingleFlight("principal")
+# Raw user documents for token refresh; a separate group, as principal
+# lookups share User models rather than documents
+user_doc_flight = SingleFlight("user_doc")
+users_version_flight = SingleFlight("users_version")
+
+# Conditional GET per read route; 304s count as hits in cache_hits_total
+profile_etags = ConditionalGet("profile", "private, no-cache")
+users_etags = ConditionalGet("users", "private, no-cache")
+search_etags = ConditionalGet("users_search", "private, no-cache")
+# Stats are public and already cached for the TTL, so proxies may share them
+stats_etags = ConditionalGet("stats", f"public, max-age={int(STATS_CACHE_TTL_SECONDS)}")
+
+CREDENTIALS_HEADERS = {"WWW-Authenticate": "Bearer"}
+
+def credentials_exception() -> HTTPException:
+    # A fresh instance per raise: a shared one would keep every traceback alive
+    return HTTPException(
+        status_code=status.HTTP_401_UNAUTHORIZED,
+        detail="Could not validate credentials",
+        headers=CREDENTIALS_HEADERS,
+    )
+
 # Pydantic models
 class UserSignUp(BaseModel):
     name: str
@@ -49,11 +136,6 @@ class UserSignIn(BaseModel):
     email: EmailStr
     password: str
 
-class Token(BaseModel):
-    access_token: str
-    token_type: str
-    user: dict
-
 class User(BaseModel):
     id: str
     name: str
@@ -61,12 +143,38 @@ class User(BaseModel):
     user_type: str
     created_at: datetime
 
+class Token(BaseModel):
+    access_token: str
+    token_type: str
+    user: User
+    refresh_token: Optional[str] = None
+
+class RefreshRequest(BaseModel):
+    refresh_token: str
+
+class UserPage(BaseModel):
+    users: List[User]
+    total: int
+    next_cursor: Optional[str] = None
+
+class PlatformStats(BaseModel):
+    total_users: int
+    hirers: int
+    applicants: int
+    freelancers: int
+
 # Utility functions
-def hash_password(password: str) -> str:
-    return pwd_context.hash(password)
+def public_user(user: dict) -> User:
+    # Documents come from our own collection, so skip re-validating them
+    return User.model_construct(**{field: user[field] for field in User.model_fields})
+
+def typed_response(model: BaseModel) -> ORJSONResponse:
+    """Dump an already-typed model once and encode it with orjson.
 
-def verify_password(plain_password: str, hashed_password: str) -> bool:
-    return pwd_context.verify(plain_password, hashed_password)
+    Returning a Response makes FastAPI skip its response_model validation
+    and jsonable_encoder passes; response_model still documents the schema.
+    """
+    return ORJSONResponse(model.model_dump())
 
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     to_encode = data.copy()
@@ -75,66 +183,209 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     else:
         expire = datetime.utcnow() + timedelta(minutes=15)
     to_encode.update({"exp": expire})
-    encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
+    encoded_jwt = get_token_service().encode(to_encode)
     return encoded_jwt
 
-async def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(security)):
-    credentials_exception = HTTPException(
-        status_code=status.HTTP_401_UNAUTHORIZED,
-        detail="Could not validate credentials",
-        headers={"WWW-Authenticate": "Bearer"},
+def token_claims(user: dict) -> dict:
+    """Claims for an access token; in stateless mode they carry the whole principal."""
+    claims = {"sub": user["id"]}
+    if AUTH_STATELESS:
+        claims.update({
+            "name": user["name"],
+            "email": user["email"],
+            "user_type": user["user_type"],
+            "created_at": user["created_at"].isoformat(),
+        })
+    return claims
+
+def issue_tokens(user: dict, refresh_token: Optional[str]) -> ORJSONResponse:
+    access_token_expires = timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
+    access_token = create_access_token(
+        data=token_claims(user), expires_delta=access_token_expires
     )
+    return typed_response(Token.model_construct(
+        access_token=access_token,
+        token_type="bearer",
+        user=public_user(user),
+        refresh_token=refresh_token
+    ))
+
+def encode_cursor(user: dict) -> str:
+    raw = f"{user['created_at'].isoformat()}|{user['id']}"
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+def decode_cursor(cursor: str):
+    try:
+        created_at, user_id = base64.urlsafe_b64decode(cursor.encode()).decode().split("|", 1)
+        return datetime.fromisoformat(created_at), user_id
+    except ValueError:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid cursor")
+
+def utc_naive(value: Optional[datetime]) -> Optional[datetime]:
+    # Users' timestamps are stored as naive UTC; comparing them with an
+    # aware filter raises on the memory engine, so normalise filters first
+    if value is None or value.tzinfo is None:
+        return value
+    return value.astimezone(timezone.utc).replace(tzinfo=None)
+
+async def stream_ndjson(cursor):
+    # One line per user, straight off the DB cursor; nothing is buffered
+    async for user in cursor:
+        yield orjson.dumps(user) + b"\n"
+
+def client_ip(request: Request) -> str:
+    # uvicorn resolves X-Forwarded-For from trusted proxies into request.client
+    return request.client.host if request.client else "unknown"
+
+def invalidate_principal(user_id: str):
+    """Drop a cached principal; call after any write to that user."""
+    principal_cache.invalidate(user_id)
+
+async def load_principal(store: UserStore, user_id: str) -> Optional[User]:
+    # Runs once per coalesced group and fills the cache before waiters resume,
+    # unless a write to the user was invalidated during the lookup
+    with principal_cache.filling(user_id) as fill:
+        user = await store.find_by_id(user_id)
+        if user is None:
+            return None
+        principal = public_user(user)
+        fill(principal)
+    return principal
+
+async def get_current_user(
+    credentials: HTTPAuthorizationCredentials = Depends(security),
+    store: UserStore = Depends(get_user_store),
+):
     try:
-        payload = jwt.decode(credentials.credentials, SECRET_KEY, algorithms=[ALGORITHM])
+        payload = get_token_service().decode(credentials.credentials)
         user_id: str = payload.get("sub")
         if user_id is None:
-            raise credentials_exception
-    except JWTError:
-        raise credentials_exception
-    
-    user = users_collection.find_one({"id": user_id})
-    if user is None:
-        raise credentials_exception
-    
-    # Convert MongoDB document to User model
-    user_dict = {
-        "id": user["id"],
-        "name": user["name"],
-        "email": user["email"],
-        "user_type": user["user_type"],
-        "created_at": user["created_at"]
-    }
-    return User(**user_dict)
+            raise credentials_exception()
+    except TokenError:
+        raise credentials_exception()
+
+    if AUTH_STATELESS and "user_type" in payload:
+        return User(
+            id=user_id,
+            name=payload["name"],
+            email=payload["email"],
+            user_type=payload["user_type"],
+            created_at=datetime.fromisoformat(payload["created_at"]),
+        )
+
+    cached = principal_cache.get(user_id)
+    if cached is not None:
+        return cached
+
+    principal = await principal_flight.do(user_id, load_principal, store, user_id)
+    if principal is None:
+        raise credentials_exception()
+    return principal
+
+@app.exception_handler(HashQueueFull)
+async def hash_queue_full_handler(request, exc: HashQueueFull):
+    # Shed load fast instead of letting bcrypt latency pile up
+    return JSONResponse(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        content={"detail": "Server is busy, please retry shortly"},
+        headers={"Retry-After": str(HASH_RETRY_AFTER_SECONDS)},
+    )
+
+@app.exception_handler(RateLimitExceeded)
+async def rate_limit_handler(request, exc: RateLimitExceeded):
+    return JSONResponse(
+        status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+        content={"detail": "Too many requests, please retry later"},
+        headers={"Retry-After": str(math.ceil(exc.retry_after))},
+    )
+
+@app.exception_handler(DatabaseUnavailable)
+async def database_unavailable_handler(request, exc: DatabaseUnavailable):
+    # Fail fast while the database is slow or down rather than queue behind it
+    return JSONResponse(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        content={"detail": "Database unavailable, please retry shortly"},
+        headers={"Retry-After": str(max(1, math.ceil(exc.retry_after)))},
+    )
 
 # API Endpoints
 @app.get("/")
 async def root():
     return {"message": "JobPortal API is running"}
 
+@app.get("/metrics", response_class=PlainTextResponse)
+async def get_metrics():
+    """Prometheus text exposition of the process metrics"""
+    return PlainTextResponse(metrics.REGISTRY.render(), media_type="text/plain; version=0.0.4")
+
 @app.get("/api/health")
-async def health_check():
-    try:
-        # Test database connection
-        client.admin.command('ismaster')
-        return {
-            "status": "healthy",
-            "database": "connected",
-            "timestamp": datetime.utcnow().isoformat()
-        }
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Database connection failed: {str(e)}")
+async def health_check(
+    monitor: HealthMonitor = Depends(get_health_monitor),
+    store: UserStore = Depends(get_user_store),
+):
+    """Full report; the database state is the background check's cached result."""
+    if not monitor.db_ok:
+        raise HTTPException(status_code=500, detail=f"Database connection failed: {monitor.db_error}")
+    return {
+        "status": "healthy",
+        "database": "connected",
+        "database_check": monitor.database(),
+        "pool": monitor.pool(),
+        "event_loop": monitor.event_loop(),
+        "hashing": get_hasher().stats(),
+        "principal_cache": principal_cache.stats(),
+        "conditional_get": {
+            etags.name: etags.stats() for etags in (profile_etags, users_etags, search_etags, stats_etags)
+        },
+        "write_behind": get_write_behind().stats(),
+        "stats_stream": get_stats_broadcaster().stats(),
+        "storage_guard": store.stats() if isinstance(store, GuardedUserStore) else None,
+        "coalescing": {
+            flight.name: flight.stats()
+            for flight in (principal_flight, user_doc_flight, users_version_flight, get_stats_service().flight)
+        },
+        "timestamp": datetime.utcnow().isoformat()
+    }
+
+@app.get("/api/health/live")
+async def liveness(monitor: HealthMonitor = Depends(get_health_monitor)):
+    """The process is serving requests; never depends on Mongo."""
+    return {"status": "alive", "event_loop": monitor.event_loop()}
+
+@app.get("/api/health/ready")
+async def readiness(monitor: HealthMonitor = Depends(get_health_monitor)):
+    """503 while the last background DB check failed or is stale."""
+    hashing_stats = get_hasher().stats()
+    return ORJSONResponse(
+        {
+            "status": "ready" if monitor.ready else "not_ready",
+            "database": monitor.database(),
+            "pool": monitor.pool(),
+            "event_loop": monitor.event_loop(),
+            "hashing": {
+                "queue_depth": hashing_stats["queue_depth"],
+                "in_flight": hashing_stats["in_flight"],
+                "capacity": hashing_stats["workers"] + hashing_stats["max_queue"],
+            },
+        },
+        status_code=status.HTTP_200_OK if monitor.ready else status.HTTP_503_SERVICE_UNAVAILABLE,
+    )
 
 @app.post("/api/signup", response_model=Token)
-async def sign_up(user_data: UserSignUp):
-    # Check if user already exists
-    if users_collection.find_one({"email": user_data.email}):
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail="Email already registered"
-        )
-    
+async def sign_up(
+    user_data: UserSignUp,
+    request: Request,
+    hasher: HashExecutor = Depends(get_hasher),
+    stats_service: StatsService = Depends(get_stats_service),
+    limiter: RateLimiter = Depends(get_rate_limiter),
+    session_service: SessionService = Depends(get_session_service),
+    writer: WriteBehind = Depends(get_write_behind),
+):
+    # Throttle before any hashing or DB work
+    await limiter.check("signup_ip", client_ip(request))
+
     # Validate user type
-    if user_data.user_type not in ['hirer', 'applicant', 'freelancer']:
+    if user_data.user_type not in USER_TYPES:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Invalid user type. Must be 'hirer', 'applicant', or 'freelancer'"
@@ -142,7 +393,7 @@ async def sign_up(user_data: UserSignUp):
     
     # Create new user
     user_id = str(uuid.uuid4())
-    hashed_password = hash_password(user_data.password)
+    hashed_password = await hasher.hash(user_data.password)
     
     new_user = {
         "id": user_id,
@@ -155,117 +406,275 @@ async def sign_up(user_data: UserSignUp):
     }
     
     try:
-        users_collection.insert_one(new_user)
+        # Batched with concurrent signups; the unique email index still
+        # rejects duplicates atomically, and we wait for our row's outcome
+        await writer.insert_user(new_user)
+    except DuplicateEmailError:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Email already registered"
+        )
+    except DatabaseUnavailable:
+        raise
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Failed to create user: {str(e)}"
         )
-    
-    # Create access token
-    access_token_expires = timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
-    access_token = create_access_token(
-        data={"sub": user_id}, expires_delta=access_token_expires
-    )
-    
-    user_response = {
-        "id": user_id,
-        "name": user_data.name,
-        "email": user_data.email,
-        "user_type": user_data.user_type,
-        "created_at": new_user["created_at"]
-    }
-    
-    return Token(
-        access_token=access_token,
-        token_type="bearer",
-        user=user_response
-    )
+
+    # The user is committed: from here on, never answer 503 and invite a
+    # retry that would hit "Email already registered"
+    with resilience.no_deadline():
+        try:
+            # No-op unless STATS_MODE=counters, where it is an atomic $inc
+            await stats_service.record_signup(user_data.user_type)
+        except DatabaseUnavailable as e:
+            # The counters are one short until manage.py rebuild-stats
+            logger.warning("signup of %s not counted in stats: %s", user_id, e)
+
+        # Create access and refresh tokens. Without a refresh token the
+        # client signs in again once the access token expires
+        refresh_token = None
+        try:
+            refresh_token = await session_service.create(user_id)
+        except DatabaseUnavailable as e:
+            logger.warning("no refresh token issued at signup of %s: %s", user_id, e)
+    return issue_tokens(new_user, refresh_token)
 
 @app.post("/api/signin", response_model=Token)
-async def sign_in(user_credentials: UserSignIn):
+async def sign_in(
+    user_credentials: UserSignIn,
+    request: Request,
+    store: UserStore = Depends(get_user_store),
+    hasher: HashExecutor = Depends(get_hasher),
+    limiter: RateLimiter = Depends(get_rate_limiter),
+    session_service: SessionService = Depends(get_session_service),
+    writer: WriteBehind = Depends(get_write_behind),
+):
+    # Throttle before any hashing or DB work
+    await limiter.check("signin_ip", client_ip(request))
+    await limiter.check("signin_email", user_credentials.email.lower())
+
     # Find user by email
-    user = users_collection.find_one({"email": user_credentials.email})
+    user = await store.find_by_email(user_credentials.email)
     
-    if not user or not verify_password(user_credentials.password, user["password"]):
+    valid, new_hash = (
+        await hasher.verify_and_update(user_credentials.password, user["password"])
+        if user else (False, None)
+    )
+    if not valid:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect email or password",
             headers={"WWW-Authenticate": "Bearer"},
         )
+
+    # Stored hash predates the current scheme/cost: upgrade it now. Best
+    # effort: the password is already verified, and the next login retries
+    if new_hash:
+        try:
+            await store.update_password(user["id"], new_hash)
+            invalidate_principal(user["id"])
+        except DatabaseUnavailable as e:
+            logger.warning("password rehash for %s skipped: %s", user["id"], e)
+
+    # Audit trail and last_login_at are written behind, in batches
+    await writer.record_login({
+        "user_id": user["id"],
+        "at": datetime.utcnow(),
+        "ip": client_ip(request),
+        "user_agent": request.headers.get("user-agent"),
+    })
     
-    
-    access_token_expires = timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
-    access_token = create_access_token(
-        data={"sub": user["id"]}, expires_delta=access_token_expires
-    )
-    
-    user_response = {
-        "id": user["id"],
-        "name": user["name"],
-        "email": user["email"],
-        "user_type": user["user_type"],
-        "created_at": user["created_at"]
-    }
-    
-    return Token(
-        access_token=access_token,
-        token_type="bearer",
-        user=user_response
-    )
+    refresh_token = await session_service.create(user["id"])
+    return issue_tokens(user, refresh_token)
+
+@app.post("/api/token/refresh", response_model=Token)
+async def refresh_access_token(
+    body: RefreshRequest,
+    store: UserStore = Depends(get_user_store),
+    session_service: SessionService = Depends(get_session_service),
+):
+    """Exchange a refresh token for new access and refresh tokens.
+
+    No password hashing: one session rotation and one indexed user lookup.
+    """
+    try:
+        user_id, refresh_token = await session_service.rotate(body.refresh_token)
+    except InvalidRefreshToken:
+        raise credentials_exception()
+    user = await user_doc_flight.do(user_id, store.find_by_id, user_id)
+    if user is None:
+        raise credentials_exception()
+    return issue_tokens(user, refresh_token)
+
+@app.post("/api/logout")
+async def logout(
+    body: RefreshRequest,
+    session_service: SessionService = Depends(get_session_service),
+):
+    """Revoke the refresh token and every token rotated from it"""
+    await session_service.revoke(body.refresh_token)
+    return {"message": "Logged out"}
 
 @app.get("/api/profile", response_model=User)
-async def get_profile(current_user: User = Depends(get_current_user)):
-    return current_user
+async def get_profile(request: Request, current_user: User = Depends(get_current_user)):
+    # The principal may come from a stateless token, so tag the body itself
+    return profile_etags.respond(request, current_user.model_dump())
+
+@app.get("/api/users", response_model=UserPage)
+async def get_users(
+    request: Request,
+    current_user: User = Depends(get_current_user),
+    store: UserStore = Depends(get_user_store),
+    limit: Optional[int] = Query(None, ge=1, le=MAX_USERS_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    user_type: Optional[str] = None,
+    created_after: Optional[datetime] = None,
+    created_before: Optional[datetime] = None,
+    format: Literal["json", "ndjson"] = "json",
+):
+    """List users (for admin purposes or testing), oldest first.
+
+    Pages are keyed on (created_at, id): pass back ``next_cursor`` to get the
+    following page. ``format=ndjson`` streams every matching user instead,
+    unless ``limit`` is given. JSON pages carry an ETag that changes whenever
+    users are added; a matching ``If-None-Match`` gets 304 without a query.
+    """
+    after = decode_cursor(cursor) if cursor else None
+    created_after, created_before = utc_naive(created_after), utc_naive(created_before)
+    if format == "ndjson":
+        rows = store.find_page(user_type, created_after, created_before, after, limit)
+        return StreamingResponse(stream_ndjson(rows), media_type="application/x-ndjson")
 
-@app.get("/api/users")
-async def get_users(current_user: User = Depends(get_current_user)):
-    """Get all users (for admin purposes or testing)"""
     try:
-        users = list(users_collection.find({}, {"password": 0}))  # Exclude passwords
-        # Convert ObjectId to string and format response
-        formatted_users = []
-        for user in users:
-            user_dict = {
-                "id": user["id"],
-                "name": user["name"],
-                "email": user["email"],
-                "user_type": user["user_type"],
-                "created_at": user["created_at"]
-            }
-            formatted_users.append(user_dict)
-        
-        return {
-            "users": formatted_users,
-            "total": len(formatted_users)
-        }
+        # Read the version first: a signup racing the query only makes the tag stale
+        etag = make_etag("users", await users_version_flight.do("users", store.read_users_version))
+        cached = users_etags.not_modified(request, etag)
+        if cached is not None:
+            return cached
+        limit = limit or DEFAULT_USERS_PAGE_SIZE
+        # Fetch one extra row to learn whether another page exists
+        rows = store.find_page(user_type, created_after, created_before, after, limit + 1)
+        users = await rows.to_list(length=limit + 1)
+        next_cursor = encode_cursor(users[limit - 1]) if len(users) > limit else None
+        users = users[:limit]
+
+        # Rows already have exactly the UserPage fields; encode them as-is
+        return users_etags.respond(request, {
+            "users": users,
+            "total": len(users),
+            "next_cursor": next_cursor
+        }, etag)
+    except DatabaseUnavailable:
+        raise
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Failed to fetch users: {str(e)}"
         )
 
-@app.get("/api/stats")
-async def get_platform_stats():
+@app.get("/api/users/search", response_model=UserPage)
+async def search_users(
+    request: Request,
+    q: str = Query(..., min_length=1, max_length=100),
+    user_type: Optional[str] = None,
+    limit: Optional[int] = Query(None, ge=1, le=MAX_USERS_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    current_user: User = Depends(get_current_user),
+    store: UserStore = Depends(get_user_store),
+):
+    """Users whose name words or email start with each word of ``q``.
+
+    Matching is case-insensitive; ``q=jo sm`` finds "John Smith". Each word
+    needs ``SEARCH_MIN_TERM_LENGTH`` characters. Results are paged like
+    ``/api/users``, oldest first.
+    """
+    terms = q.split()
+    if not terms:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Empty search query")
+    if min(map(len, terms)) < SEARCH_MIN_TERM_LENGTH:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Search terms need at least {SEARCH_MIN_TERM_LENGTH} characters",
+        )
+    after = decode_cursor(cursor) if cursor else None
+    etag = make_etag("users_search", await users_version_flight.do("users", store.read_users_version))
+    cached = search_etags.not_modified(request, etag)
+    if cached is not None:
+        return cached
+    limit = limit or DEFAULT_USERS_PAGE_SIZE
+    rows = store.search(q, user_type, after, limit + 1)
+    users = await rows.to_list(length=limit + 1)
+    next_cursor = encode_cursor(users[limit - 1]) if len(users) > limit else None
+    users = users[:limit]
+    return search_etags.respond(request, {"users": users, "total": len(users), "next_cursor": next_cursor}, etag)
+
+@app.post("/api/users/import")
+async def bulk_import_users(
+    request: Request,
+    format: Literal["csv", "ndjson"] = "ndjson",
+    current_user: User = Depends(get_current_user),
+    store: UserStore = Depends(get_user_store),
+    stats_service: StatsService = Depends(get_stats_service),
+    executor: ProcessPoolExecutor = Depends(bulk.get_import_executor),
+):
+    """Import users streamed in the request body as CSV (with header) or NDJSON.
+
+    Rows that fail validation or hit an existing email are reported by row
+    number; all other rows are imported. Only accounts listed in
+    ``BULK_IMPORT_ADMINS`` may import.
+    """
+    # Creates accounts without the signup rate limits, so admins only
+    if current_user.email.lower() not in BULK_IMPORT_ADMINS:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Bulk import is restricted to administrators"
+        )
+    rows = bulk.iter_rows(bulk.iter_lines(request.stream()), format)
+    # Lasts as long as the upload; each batch still has BULK_IMPORT_DB_TIMEOUT_MS
+    with resilience.no_deadline():
+        report = await bulk.import_users(
+            store, rows, executor, BULK_IMPORT_WORKERS, stats_service=stats_service
+        )
+    return report.as_dict()
+
+@app.get("/api/stats", response_model=PlatformStats)
+async def get_platform_stats(request: Request, stats_service: StatsService = Depends(get_stats_service)):
     """Get platform statistics"""
     try:
-        total_users = users_collection.count_documents({})
-        hirers = users_collection.count_documents({"user_type": "hirer"})
-        applicants = users_collection.count_documents({"user_type": "applicant"})
-        freelancers = users_collection.count_documents({"user_type": "freelancer"})
-        
-        return {
-            "total_users": total_users,
-            "hirers": hirers,
-            "applicants": applicants,
-            "freelancers": freelancers
-        }
+        # Tagged by content: the cached value can lag the users version
+        return stats_etags.respond(request, await stats_service.get())
+    except DatabaseUnavailable:
+        raise
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Failed to fetch stats: {str(e)}"
         )
 
+@app.get("/api/stats/stream")
+async def stream_platform_stats(broadcaster: StatsBroadcaster = Depends(get_stats_broadcaster)):
+    """Platform statistics as server-sent ``stats`` events, pushed when they change.
+
+    All clients share one background aggregator, so streams add no queries.
+    A keepalive comment is sent while nothing changes.
+    """
+    if broadcaster.full:
+        broadcaster.reject()
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Too many stats streams on this worker",
+            headers={"Retry-After": str(int(STATS_STREAM_INTERVAL_SECONDS))},
+        )
+    return StreamingResponse(
+        broadcaster.events(),
+        media_type="text/event-stream",
+        # No caching, and no buffering by nginx-style proxies
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
 if __name__ == "__main__":
-    import uvicorn
-    uvicorn.run(app, host="0.0.0.0", port=8001)
+    # Same as `python manage.py serve`: one worker per core, tuned uvicorn settings
+    from manage import cli
+    cli(["serve"])
@@ -0,0 +1,172 @@
+"""Refresh-token sessions: rotating, revocable, expired by a TTL index.
+
+Refresh tokens are opaque random strings; only their SHA-256 digest is
+stored. Each refresh spends the presented token and issues a new one in the
+same family. Presenting an already-spent token means it leaked, so the whole
+family is revoked, unless it was spent within the reuse grace window: tabs
+that refresh at the same moment send the same token, and each gets a new
+one in the family.
+"""
+import hashlib
+import secrets
+import uuid
+from datetime import datetime, timedelta
+
+import config
+
+
+class InvalidRefreshToken(Exception):
+    """Unknown, expired, revoked or reused refresh token."""
+
+
+def _digest(token: str) -> str:
+    return hashlib.sha256(token.encode()).hexdigest()
+
+
+def _new_token() -> str:
+    return secrets.token_urlsafe(32)
+
+
+class MongoSessionStore:
+    """Sessions in a Mongo collection; pymongo is only imported once one is used.
+
+    Calls go through ``run`` (the user store's :meth:`storage.UserStore.run`),
+    so they get the same timeouts and circuit breaker as user queries.
+    """
+
+    def __init__(self, collection, run):
+        self.collection = collection
+        self._run = run
+
+    async def ensure_indexes(self):
+        from pymongo import ASCENDING
+
+        await self.collection.create_index("expires_at", name="expires_at_ttl", expireAfterSeconds=0)
+        await self.collection.create_index([("user_id", ASCENDING)], name="user_id")
+        await self.collection.create_index([("family_id", ASCENDING)], name="family_id")
+
+    async def insert(self, session: dict):
+        await self._run(self.collection.insert_one, session)
+
+    async def spend(self, token_hash: str, now: datetime):
+        """Atomically mark a live session as used; returns it, or None."""
+        from pymongo import ReturnDocument
+
+        return await self._run(
+            self.collection.find_one_and_update,
+            {"_id": token_hash, "revoked": False, "expires_at": {"$gt": now}},
+            {"$set": {"revoked": True, "rotated_at": now}},
+            return_document=ReturnDocument.BEFORE,
+        )
+
+    async def find(self, token_hash: str):
+        return await self._run(self.collection.find_one, {"_id": token_hash})
+
+    async def revoke(self, query: dict):
+        await self._run(self.collection.update_many, query,
+                        {"$set": {"revoked": True, "revoked_at": datetime.utcnow()}})
+
+
+class MemorySessionStore:
+    """In-process session store for runs without Mongo (benchmarks)."""
+
+    def __init__(self):
+        self.sessions = {}
+
+    async def ensure_indexes(self):
+        pass
+
+    async def insert(self, session):
+        self.sessions[session["_id"]] = dict(session)
+
+    async def spend(self, token_hash, now):
+        session = self.sessions.get(token_hash)
+        if session is None or session["revoked"] or session["expires_at"] <= now:
+            return None
+        before = dict(session)
+        session.update(revoked=True, rotated_at=now)
+        return before
+
+    async def find(self, token_hash):
+        return self.sessions.get(token_hash)
+
+    async def revoke(self, query):
+        for session in self.sessions.values():
+            if all(session.get(k) == v for k, v in query.items()):
+                session.update(revoked=True, revoked_at=datetime.utcnow())
+
+
+class SessionService:
+    def __init__(self, store, lifetime: timedelta,
+                 reuse_grace: timedelta = timedelta(seconds=config.REFRESH_REUSE_GRACE_SECONDS)):
+        self.store = store
+        self.lifetime = lifetime
+        self.reuse_grace = reuse_grace
+
+    async def _issue(self, user_id: str, family_id: str, now: datetime) -> str:
+        token = _new_token()
+        await self.store.insert({
+            "_id": _digest(token),
+            "user_id": user_id,
+            "family_id": family_id,
+            "revoked": False,
+            "created_at": now,
+            "expires_at": now + self.lifetime,
+        })
+        return token
+
+    async def create(self, user_id: str) -> str:
+        """Start a new session family at signin/signup."""
+        return await self._issue(user_id, str(uuid.uuid4()), datetime.utcnow())
+
+    async def rotate(self, token: str):
+        """Spend ``token`` and return ``(user_id, new_refresh_token)``."""
+        now = datetime.utcnow()
+        token_hash = _digest(token)
+        session = await self.store.spend(token_hash, now)
+        if session is None:
+            known = await self.store.find(token_hash)
+            if known is not None and known.get("rotated_at") is not None:
+                # Spent moments ago by a concurrent refresh, and the family
+                # not revoked since: issue another token in the family
+                if (known.get("revoked_at") is None and known["expires_at"] > now
+                        and now - known["rotated_at"] <= self.reuse_grace):
+                    return known["user_id"], await self._issue(known["user_id"], known["family_id"], now)
+                # A spent token came back: assume theft and kill the family
+                await self.store.revoke({"family_id": known["family_id"]})
+            raise InvalidRefreshToken()
+        new_token = await self._issue(session["user_id"], session["family_id"], now)
+        return session["user_id"], new_token
+
+    async def revoke(self, token: str):
+        session = await self.store.find(_digest(token))
+        if session is not None:
+            await self.store.revoke({"family_id": session["family_id"]})
+
+    async def revoke_user(self, user_id: str):
+        await self.store.revoke({"user_id": user_id})
+
+
+_service = None
+
+
+async def start(user_store, lifetime: timedelta = timedelta(days=config.REFRESH_TOKEN_EXPIRE_DAYS)) -> SessionService:
+    """Sessions live next to the users in ``database.sessions``, or in
+    memory when the user store has no database."""
+    global _service
+    database = user_store.database
+    store = MongoSessionStore(database.sessions, user_store.run) if database is not None else MemorySessionStore()
+    await store.ensure_indexes()
+    _service = SessionService(store, lifetime)
+    return _service
+
+
+def shutdown():
+    global _service
+    _service = None
+
+
+def get_session_service() -> SessionService:
+    if _service is None:
+        raise RuntimeError("Session service is not running; sessions.start() must run at startup")
+    return _service
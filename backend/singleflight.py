@@ -0,0 +1,73 @@
+"""Request coalescing: concurrent identical lookups share one in-flight call.
+
+The first caller for a key (the leader) starts the call; callers arriving
+while it runs await the same result instead of issuing their own query.
+Nothing is cached once the call completes. The shared call runs without
+the leader's request deadline, so followers are not cut off by it; storage
+calls still have their own timeout.
+"""
+import asyncio
+
+import config
+import metrics
+import resilience
+
+SINGLEFLIGHT_CALLS = metrics.REGISTRY.register(metrics.Counter(
+    "singleflight_calls_total",
+    "Coalesced lookups by group; result is 'executed' (leader) or 'coalesced' (shared)",
+    ("group", "result")))
+
+
+class SingleFlight:
+    """One group of coalesced calls, e.g. principal lookups by user id.
+
+    With ``enabled`` off every call runs on its own, for comparisons.
+    """
+
+    def __init__(self, name: str, enabled: bool = config.COALESCE_READS):
+        self.name = name
+        self.enabled = enabled
+        self._inflight = {}
+        self.executed = 0
+        self.coalesced = 0
+
+    async def do(self, key, function, *args):
+        """``await function(*args)``, shared with concurrent callers of ``key``."""
+        if not self.enabled:
+            self._count("executed")
+            return await function(*args)
+        future = self._inflight.get(key)
+        if future is None:
+            self._count("executed")
+            # The task copies the current context; don't let it carry the leader's deadline
+            with resilience.no_deadline():
+                future = asyncio.ensure_future(function(*args))
+            self._inflight[key] = future
+            future.add_done_callback(lambda done: self._forget(key, done))
+        else:
+            self._count("coalesced")
+        # shield: one cancelled caller must not cancel the shared call
+        return await asyncio.shield(future)
+
+    def _forget(self, key, future):
+        if self._inflight.get(key) is future:
+            del self._inflight[key]
+        if not future.cancelled():
+            # Mark the error retrieved even if every caller went away
+            future.exception()
+
+    def _count(self, result: str):
+        if result == "executed":
+            self.executed += 1
+        else:
+            self.coalesced += 1
+        SINGLEFLIGHT_CALLS.inc(group=self.name, result=result)
+
+    def stats(self) -> dict:
+        total = self.executed + self.coalesced
+        return {
+            "executed": self.executed,
+            "coalesced": self.coalesced,
+            "in_flight": len(self._inflight),
+            "coalescing_ratio": self.coalesced / total if total else 0.0,
+        }
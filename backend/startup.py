@@ -0,0 +1,115 @@
+"""Cold-start measurement: import, lifespan startup and first request.
+
+Each measurement runs in a fresh interpreter, started as ``python
+startup.py``, so nothing is already imported or warmed up. The child reports
+three phases: importing ``server``, running the lifespan startup, and
+serving one request in process. Used by ``manage.py profile-startup`` and
+``bench.py cold-start``.
+"""
+import json
+import os
+import sys
+import time
+
+# (key in measure()'s result, label)
+PHASES = (
+    ("import_ms", "import server"),
+    ("lifespan_ms", "lifespan startup"),
+    ("first_request_ms", "first request"),
+    ("spawn_ms", "process to response"),
+)
+
+
+def parse_importtime(text: str) -> list:
+    """Rows of ``python -X importtime`` output as dicts, in import order.
+
+    ``self_ms`` excludes nested imports, ``cumulative_ms`` includes them and
+    ``depth`` is the nesting level (0 for imports made by the program itself).
+    """
+    rows = []
+    for line in text.splitlines():
+        if not line.startswith("import time:") or "imported package" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        rows.append({
+            "module": name.strip(),
+            "depth": (len(name) - len(name.lstrip()) - 1) // 2,
+            "self_ms": int(self_us) / 1000,
+            "cumulative_ms": int(cumulative_us) / 1000,
+        })
+    return rows
+
+
+def subtree(rows: list, module: str) -> list:
+    """The rows imported on behalf of top-level ``module``, ending with its own."""
+    for end, row in enumerate(rows):
+        if row["module"] == module and row["depth"] == 0:
+            start = end
+            while start > 0 and rows[start - 1]["depth"] > 0:
+                start -= 1
+            return rows[start:end + 1]
+    return []
+
+
+def measure(path: str = "/api/stats", engine: str = "memory", importtime: bool = False) -> dict:
+    """Cold-start one interpreter and return its phase timings in ms.
+
+    ``spawn_ms`` runs from launching the process to the first response and
+    includes interpreter startup. With ``importtime`` the per-module rows are
+    included under ``imports`` (only those made by ``import server``); the
+    tracing itself adds some overhead.
+    """
+    import subprocess
+
+    command = [sys.executable]
+    if importtime:
+        command += ["-X", "importtime"]
+    command += [os.path.abspath(__file__), path]
+    launched = time.time()
+    result = subprocess.run(
+        command, capture_output=True, text=True, cwd=os.path.dirname(os.path.abspath(__file__)),
+        env={**os.environ, "STORAGE_ENGINE": engine},
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f"startup probe failed:\n{result.stderr[-2000:]}")
+    timings = json.loads(result.stdout.strip().splitlines()[-1])
+    timings["spawn_ms"] = (timings.pop("responded_at") - launched) * 1000
+    if importtime:
+        timings["imports"] = subtree(parse_importtime(result.stderr), "server")
+    return timings
+
+
+def _probe(path: str):
+    started = time.perf_counter()
+    import server
+    imported = time.perf_counter()
+
+    # Only needed to drive the app; imported after the timed import
+    import asyncio
+
+    import httpx
+
+    async def main():
+        app = server.app
+        lifespan_started = time.perf_counter()
+        async with app.router.lifespan_context(app):
+            ready = time.perf_counter()
+            transport = httpx.ASGITransport(app=app)
+            async with httpx.AsyncClient(transport=transport, base_url="http://startup") as client:
+                requested = time.perf_counter()
+                response = await client.get(path)
+                responded = time.perf_counter()
+                responded_at = time.time()
+        return {
+            "import_ms": (imported - started) * 1000,
+            "lifespan_ms": (ready - lifespan_started) * 1000,
+            "first_request_ms": (responded - requested) * 1000,
+            "status": response.status_code,
+            "responded_at": responded_at,
+        }
+
+    print(json.dumps(asyncio.run(main())))
+
+
+if __name__ == "__main__":
+    _probe(sys.argv[1] if len(sys.argv) > 1 else "/api/stats")
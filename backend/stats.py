@@ -0,0 +1,87 @@
+"""Platform statistics for /api/stats, cached with single-flight refresh."""
+import time
+
+import config
+from singleflight import SingleFlight
+
+USER_TYPES = ("hirer", "applicant", "freelancer")
+
+
+def format_stats(counts: dict) -> dict:
+    return {
+        "total_users": sum(counts.values()),
+        "hirers": counts.get("hirer", 0),
+        "applicants": counts.get("applicant", 0),
+        "freelancers": counts.get("freelancer", 0),
+    }
+
+
+class StatsService:
+    """Serves platform stats from a TTL cache.
+
+    When the cache is stale, only the first caller runs a query; concurrent
+    callers await the same in-flight refresh instead of stampeding Mongo.
+    """
+
+    def __init__(self, store, mode: str = "aggregate", ttl: float = 5.0, clock=time.monotonic):
+        if mode not in ("aggregate", "counters"):
+            raise ValueError(f"Unknown stats mode: {mode!r}")
+        self.store = store
+        self.mode = mode
+        self.ttl = ttl
+        self._clock = clock
+        self._value = None
+        self._expires_at = 0.0
+        self.flight = SingleFlight("stats")
+        self.refreshes = 0
+
+    async def start(self):
+        if self.mode == "counters":
+            # Only when missing: every worker starts here, and recounting
+            # over live counters would drop the signups other workers
+            # count meanwhile. manage.py rebuild-stats repairs drift
+            await self.store.ensure_user_counts()
+
+    async def _refresh(self) -> dict:
+        if self.mode == "counters":
+            counts = await self.store.read_user_counts()
+        else:
+            counts = await self.store.count_by_user_type()
+        self.refreshes += 1
+        self._value = format_stats(counts)
+        self._expires_at = self._clock() + self.ttl
+        return self._value
+
+    async def get(self) -> dict:
+        if self._value is not None and self._clock() < self._expires_at:
+            return self._value
+        return await self.refresh()
+
+    async def refresh(self) -> dict:
+        """Query now, ignoring the TTL; shared with concurrent refreshes."""
+        return await self.flight.do("stats", self._refresh)
+
+    async def record_signup(self, user_type: str, count: int = 1):
+        if self.mode == "counters" and count:
+            await self.store.increment_user_count(user_type, count)
+
+
+_service = None
+
+
+async def start(store, mode: str = config.STATS_MODE, ttl: float = config.STATS_CACHE_TTL_SECONDS) -> StatsService:
+    global _service
+    _service = StatsService(store, mode, ttl)
+    await _service.start()
+    return _service
+
+
+def shutdown():
+    global _service
+    _service = None
+
+
+def get_stats_service() -> StatsService:
+    if _service is None:
+        raise RuntimeError("Stats service is not running; stats.start() must run at startup")
+    return _service
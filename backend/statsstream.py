@@ -0,0 +1,250 @@
+"""Live platform stats for ``/api/stats/stream`` as server-sent events.
+
+One :class:`StatsBroadcaster` per worker refreshes the stats and fans each
+new snapshot out to every connected client, so the query cost is the same
+for one dashboard or thousands. It refreshes when the store's change feed
+reports new users (debounced by ``min_interval``) and falls back to every
+``interval`` when the engine cannot watch, e.g. a standalone mongod. It
+sleeps while nobody is connected.
+
+Each client has a one-slot mailbox: a client too slow to take a snapshot
+before the next one gets only the newer one.
+
+Streams end after ``max_age`` (less up to a quarter, to spread the
+reconnects) and the EventSource reconnects. uvicorn only shuts a worker
+down once its connections have closed, so this bounds how long a deploy
+waits on open streams.
+"""
+import asyncio
+import logging
+import random
+import time
+
+import orjson
+
+import config
+import metrics
+
+logger = logging.getLogger("jobportal.stats_stream")
+
+STREAM_CLIENTS = metrics.REGISTRY.register(metrics.Gauge(
+    "stats_stream_clients", "Clients connected to /api/stats/stream"))
+STREAM_CONNECTIONS = metrics.REGISTRY.register(metrics.Counter(
+    "stats_stream_connections_total", "Stream connections by result (accepted, rejected)", ("result",)))
+STREAM_REFRESHES = metrics.REGISTRY.register(metrics.Counter(
+    "stats_stream_refreshes_total", "Aggregator refreshes by trigger (interval, change)", ("trigger",)))
+STREAM_FANOUT = metrics.REGISTRY.register(metrics.Histogram(
+    "stats_stream_fanout_seconds", "Time to hand one snapshot to every connected client",
+    buckets=(0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1)))
+STREAM_DELIVERY = metrics.REGISTRY.register(metrics.Histogram(
+    "stats_stream_delivery_seconds", "From publishing a snapshot to writing it to one client"))
+STREAM_SUPERSEDED = metrics.REGISTRY.register(metrics.Counter(
+    "stats_stream_superseded_total", "Snapshots replaced by a newer one before a slow client took them"))
+
+# Seconds before trying to reopen a change stream that failed
+WATCH_RETRY_SECONDS = 60.0
+
+# How long an EventSource waits before reconnecting a dropped stream
+RECONNECT_MS = 3000
+
+# How often the housekeeping task ends expired streams and sends keepalives
+TICK_SECONDS = 1.0
+
+# SSE comment that keeps proxies from closing an idle connection
+KEEPALIVE = (b": keepalive\n\n", None)
+
+
+def _offer(mailbox: asyncio.Queue, item):
+    if mailbox.full():
+        if mailbox.get_nowait() is None:
+            # The stream is ending; nothing may replace its end marker
+            mailbox.put_nowait(None)
+            return
+        STREAM_SUPERSEDED.inc()
+    mailbox.put_nowait(item)
+
+
+class StatsBroadcaster:
+    def __init__(self, stats_service, store, interval: float = config.STATS_STREAM_INTERVAL_SECONDS,
+                 min_interval: float = config.STATS_STREAM_MIN_INTERVAL_SECONDS,
+                 heartbeat: float = config.STATS_STREAM_HEARTBEAT_SECONDS,
+                 max_clients: int = config.STATS_STREAM_MAX_CLIENTS,
+                 change_stream: bool = config.STATS_STREAM_CHANGE_STREAM,
+                 max_age: float = config.STATS_STREAM_MAX_AGE_SECONDS):
+        self.stats_service = stats_service
+        self.store = store
+        self.interval = interval
+        self.min_interval = min_interval
+        self.heartbeat = heartbeat
+        self.max_clients = max_clients
+        self.change_stream = change_stream
+        self.max_age = max_age
+        self.mode = "interval"
+        self.published = 0
+        self.expired = 0
+        # mailbox -> monotonic time its stream ends
+        self._mailboxes = {}
+        self._active = asyncio.Event()
+        self._dirty = asyncio.Event()
+        self._event = None
+        self._payload = None
+        self._tasks = []
+
+    async def start(self):
+        self._tasks = [asyncio.create_task(self._run()), asyncio.create_task(self._housekeeping())]
+        if self.change_stream:
+            self._tasks.append(asyncio.create_task(self._watch()))
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        # Ends the in-process streams; uvicorn closes the connections
+        for mailbox in self._mailboxes:
+            _offer(mailbox, None)
+
+    @property
+    def full(self) -> bool:
+        return len(self._mailboxes) >= self.max_clients
+
+    async def _watch(self):
+        while True:
+            try:
+                async for _ in self.store.watch():
+                    if self.mode != "change_stream":
+                        logger.info("refreshing stats on user changes")
+                        self.mode = "change_stream"
+                    self._dirty.set()
+            except NotImplementedError:
+                return
+            except Exception as e:
+                logger.warning("change stream unavailable, refreshing stats every %.0fs: %s", self.interval, e)
+            self.mode = "interval"
+            self._dirty.set()
+            await asyncio.sleep(WATCH_RETRY_SECONDS)
+
+    async def _run(self):
+        trigger = "interval"
+        while True:
+            await self._active.wait()
+            # Changes from here on need another refresh
+            self._dirty.clear()
+            try:
+                self._publish(await self.stats_service.refresh())
+                STREAM_REFRESHES.inc(trigger=trigger)
+            except Exception as e:
+                logger.warning("stats refresh failed: %s", e)
+            trigger = await self._next_refresh()
+
+    async def _next_refresh(self) -> str:
+        # A change stream makes polling unnecessary; otherwise poll
+        timeout = None if self.mode == "change_stream" else self.interval
+        try:
+            await asyncio.wait_for(self._dirty.wait(), timeout)
+        except asyncio.TimeoutError:
+            return "interval"
+        # Let a burst of signups settle into one refresh
+        await asyncio.sleep(self.min_interval)
+        return "change"
+
+    async def _housekeeping(self):
+        # One timer for all clients rather than a timeout on every client's wait
+        next_keepalive = time.monotonic() + self.heartbeat
+        while True:
+            await asyncio.sleep(TICK_SECONDS)
+            now = time.monotonic()
+            keepalive = now >= next_keepalive
+            if keepalive:
+                next_keepalive = now + self.heartbeat
+            for mailbox, expires_at in self._mailboxes.items():
+                if expires_at <= now:
+                    # Ends the stream; the client reconnects after RECONNECT_MS
+                    _offer(mailbox, None)
+                    self._mailboxes[mailbox] = float("inf")
+                    self.expired += 1
+                elif keepalive and mailbox.empty():
+                    mailbox.put_nowait(KEEPALIVE)
+
+    def _publish(self, payload: dict):
+        if payload == self._payload and self._event is not None:
+            return
+        self.published += 1
+        self._payload = payload
+        self._event = b"id: %d\nevent: stats\ndata: %s\n\n" % (self.published, orjson.dumps(payload))
+        started = time.perf_counter()
+        item = (self._event, started)
+        for mailbox in self._mailboxes:
+            _offer(mailbox, item)
+        STREAM_FANOUT.observe(time.perf_counter() - started)
+
+    def _subscribe(self) -> asyncio.Queue:
+        mailbox = asyncio.Queue(maxsize=1)
+        self._mailboxes[mailbox] = time.monotonic() + self.max_age * (1 - 0.25 * random.random())
+        STREAM_CLIENTS.inc()
+        STREAM_CONNECTIONS.inc(result="accepted")
+        self._active.set()
+        if self._event is not None:
+            mailbox.put_nowait((self._event, time.perf_counter()))
+        else:
+            # Woken from idle: refresh now rather than at the next tick
+            self._dirty.set()
+        return mailbox
+
+    def _unsubscribe(self, mailbox: asyncio.Queue):
+        self._mailboxes.pop(mailbox, None)
+        STREAM_CLIENTS.dec()
+        if not self._mailboxes:
+            # Idle: stop querying, and don't serve the next client an old snapshot
+            self._active.clear()
+            self._event = None
+
+    def reject(self):
+        STREAM_CONNECTIONS.inc(result="rejected")
+
+    async def events(self):
+        """SSE frames for one client: the latest snapshot, then every new one."""
+        mailbox = self._subscribe()
+        try:
+            yield b"retry: %d\n\n" % RECONNECT_MS
+            while True:
+                item = await mailbox.get()
+                if item is None:
+                    return
+                frame, published = item
+                yield frame
+                if published is not None:
+                    STREAM_DELIVERY.observe(time.perf_counter() - published)
+        finally:
+            self._unsubscribe(mailbox)
+
+    def stats(self) -> dict:
+        return {
+            "clients": len(self._mailboxes),
+            "mode": self.mode,
+            "published": self.published,
+            "expired": self.expired,
+        }
+
+
+_broadcaster = None
+
+
+async def start(stats_service, store) -> StatsBroadcaster:
+    global _broadcaster
+    _broadcaster = StatsBroadcaster(stats_service, store)
+    await _broadcaster.start()
+    return _broadcaster
+
+
+async def shutdown():
+    global _broadcaster
+    if _broadcaster is not None:
+        await _broadcaster.stop()
+    _broadcaster = None
+
+
+def get_stats_broadcaster() -> StatsBroadcaster:
+    if _broadcaster is None:
+        raise RuntimeError("Stats stream is not running; statsstream.start() must run at startup")
+    return _broadcaster
@@ -0,0 +1,463 @@
+"""User storage for the JobPortal API behind one interface, two engines.
+
+``mongo`` is non-blocking MongoDB access built on Motor (see
+:mod:`mongostore`, imported only when selected). ``memory`` keeps users in
+process, so the API can run (tests, benchmarks, CI) without a database.
+``STORAGE_ENGINE`` selects the engine at startup.
+"""
+import asyncio
+import heapq
+from bisect import bisect_left, bisect_right, insort
+from datetime import datetime
+
+import config
+import search
+from search import PrefixIndex
+
+# Fields returned to callers that must never see the password hash
+PUBLIC_PROJECTION = {"_id": 0, "password": 0, "search_keys": 0}
+
+# Exactly the fields listed by /api/users
+LIST_PROJECTION = {"_id": 0, "id": 1, "name": 1, "email": 1, "user_type": 1, "created_at": 1}
+
+
+class DuplicateEmailError(Exception):
+    """Raised by ``insert`` when the email is already registered."""
+
+
+class IndexMigrationError(RuntimeError):
+    """Raised at startup when a required index cannot be built."""
+
+
+class DatabaseUnavailable(Exception):
+    """The database is unreachable, too slow, or cut off by the circuit breaker."""
+
+    def __init__(self, reason: str, retry_after: float = 1.0):
+        super().__init__(reason)
+        self.retry_after = retry_after
+
+
+class UserStore:
+    """Interface of a user storage engine.
+
+    ``find_page`` and ``search`` return cursors supporting ``async for`` and
+    ``to_list(length)``. ``database`` is the Mongo database that other
+    services keep their collections in, or None for engines without one, in
+    which case those services fall back to in-process stores.
+    ``transient_errors`` are the engine's exceptions meaning the database
+    could not answer, as opposed to rejecting the operation.
+    """
+
+    database = None
+    transient_errors = ()
+
+    async def run(self, function, *args, **kwargs):
+        """Await ``function(*args, **kwargs)``, a call on another collection
+        in ``database``, with whatever guards the store's own calls get."""
+        return await function(*args, **kwargs)
+
+    async def ping(self):
+        raise NotImplementedError
+
+    async def ensure_indexes(self):
+        raise NotImplementedError
+
+    async def find_by_email(self, email: str):
+        """The full document, password hash included, or None."""
+        raise NotImplementedError
+
+    async def find_by_id(self, user_id: str):
+        """The document without the password hash, or None."""
+        raise NotImplementedError
+
+    async def insert(self, user: dict):
+        """Raises :class:`DuplicateEmailError` if the email is taken."""
+        raise NotImplementedError
+
+    async def insert_many(self, users: list) -> dict:
+        raise NotImplementedError
+
+    async def update_password(self, user_id: str, hashed_password: str):
+        raise NotImplementedError
+
+    async def record_logins(self, events: list) -> dict:
+        """Append login events and advance each user's ``last_login_at``."""
+        raise NotImplementedError
+
+    def find_page(self, user_type=None, created_after=None, created_before=None,
+                  after=None, limit=None, batch_size=500):
+        raise NotImplementedError
+
+    def search(self, query: str, user_type=None, after=None, limit=None, batch_size=500):
+        raise NotImplementedError
+
+    async def count_by_user_type(self) -> dict:
+        raise NotImplementedError
+
+    async def rebuild_user_counts(self) -> dict:
+        """Recount the materialized counters, overwriting them."""
+        raise NotImplementedError
+
+    async def ensure_user_counts(self) -> bool:
+        """Build the counters from the users unless they exist; True if built."""
+        raise NotImplementedError
+
+    async def increment_user_count(self, user_type: str, amount: int = 1):
+        """A no-op until the counters exist: building them counts every user."""
+        raise NotImplementedError
+
+    async def read_user_counts(self) -> dict:
+        raise NotImplementedError
+
+    async def read_users_version(self) -> int:
+        raise NotImplementedError
+
+    def watch(self):
+        """Async iterator notified when users are added or removed.
+
+        Yields once as soon as it is open, since changes may have been
+        missed before, then once per change. Raises NotImplementedError,
+        or the driver's error, when the engine cannot watch.
+        """
+        raise NotImplementedError
+
+
+class UserStoreWrapper(UserStore):
+    """Passes every call to ``inner`` through :meth:`_call`, and every cursor
+    it returns through :meth:`_cursor`; base for stores that add behaviour
+    around an engine. Other attributes are read from ``inner``.
+    """
+
+    def __init__(self, inner: UserStore):
+        self.inner = inner
+
+    def __getattr__(self, name):
+        return getattr(self.inner, name)
+
+    @property
+    def database(self):
+        return self.inner.database
+
+    @property
+    def transient_errors(self):
+        return self.inner.transient_errors
+
+    async def _call(self, function, *args, **kwargs):
+        return await function(*args, **kwargs)
+
+    def _cursor(self, cursor):
+        return cursor
+
+    async def run(self, function, *args, **kwargs):
+        return await self._call(self.inner.run, function, *args, **kwargs)
+
+    async def ping(self):
+        return await self._call(self.inner.ping)
+
+    async def ensure_indexes(self):
+        return await self._call(self.inner.ensure_indexes)
+
+    async def find_by_email(self, email):
+        return await self._call(self.inner.find_by_email, email)
+
+    async def find_by_id(self, user_id):
+        return await self._call(self.inner.find_by_id, user_id)
+
+    async def insert(self, user):
+        return await self._call(self.inner.insert, user)
+
+    async def insert_many(self, users):
+        return await self._call(self.inner.insert_many, users)
+
+    async def update_password(self, user_id, hashed_password):
+        return await self._call(self.inner.update_password, user_id, hashed_password)
+
+    async def record_logins(self, events):
+        return await self._call(self.inner.record_logins, events)
+
+    def find_page(self, *args, **kwargs):
+        return self._cursor(self.inner.find_page(*args, **kwargs))
+
+    def search(self, *args, **kwargs):
+        return self._cursor(self.inner.search(*args, **kwargs))
+
+    async def count_by_user_type(self):
+        return await self._call(self.inner.count_by_user_type)
+
+    async def rebuild_user_counts(self):
+        return await self._call(self.inner.rebuild_user_counts)
+
+    async def ensure_user_counts(self):
+        return await self._call(self.inner.ensure_user_counts)
+
+    async def increment_user_count(self, user_type, amount=1):
+        return await self._call(self.inner.increment_user_count, user_type, amount)
+
+    async def read_user_counts(self):
+        return await self._call(self.inner.read_user_counts)
+
+    async def read_users_version(self):
+        return await self._call(self.inner.read_users_version)
+
+    def watch(self):
+        # Long-lived by design; not subject to per-call behaviour
+        return self.inner.watch()
+
+
+class _MemoryCursor:
+    """Just enough of a Motor cursor for the API: async iteration and to_list."""
+
+    def __init__(self, rows):
+        self._rows = rows
+
+    async def _iterate(self):
+        for row in self._rows:
+            yield row
+
+    def __aiter__(self):
+        return self._iterate()
+
+    async def to_list(self, length=None):
+        return self._rows[:length] if length is not None else list(self._rows)
+
+
+def _list_fields(user: dict) -> dict:
+    return {k: user[k] for k in LIST_PROJECTION if k != "_id"}
+
+
+class MemoryUserStore(UserStore):
+    """In-process engine; data lives as long as the process.
+
+    Users are hashed by id and by email, counted per user_type as they are
+    inserted, kept in (created_at, id) order for keyset pages and indexed
+    for prefix search. Meant for one event loop; not thread-safe.
+    """
+
+    def __init__(self):
+        self.by_id = {}
+        self.by_email = {}
+        self.type_counts = {}
+        # What STATS_MODE=counters reads, like the Mongo stats document
+        self.materialized_counts = None
+        self.order = []
+        self.version = 0
+        self.login_events = []
+        self.search_index = PrefixIndex()
+        self._changed = None
+
+    async def ping(self):
+        pass
+
+    async def ensure_indexes(self):
+        pass
+
+    async def find_by_email(self, email):
+        return self.by_email.get(email)
+
+    async def find_by_id(self, user_id):
+        user = self.by_id.get(user_id)
+        return {k: v for k, v in user.items() if k not in PUBLIC_PROJECTION} if user else None
+
+    def _add(self, user: dict):
+        user.setdefault("search_keys", search.search_keys(user["name"], user["email"]))
+        # id and email share one dict, so updates through either are seen by both
+        self.by_id[user["id"]] = self.by_email[user["email"]] = dict(user)
+        self.type_counts[user["user_type"]] = self.type_counts.get(user["user_type"], 0) + 1
+        self.version += 1
+        if self._changed is not None:
+            self._changed.set()
+            self._changed = None
+
+    async def insert(self, user):
+        if user["email"] in self.by_email:
+            raise DuplicateEmailError(user["email"])
+        self._add(user)
+        key = (user["created_at"], user["id"])
+        if not self.order or key > self.order[-1]:
+            self.order.append(key)
+        else:
+            insort(self.order, key)
+        self.search_index.add(user["id"], user["search_keys"])
+
+    async def insert_many(self, users):
+        failed = {}
+        for index, user in enumerate(users):
+            try:
+                await self.insert(user)
+            except DuplicateEmailError as e:
+                failed[index] = e
+        return failed
+
+    def load(self, users):
+        """Bulk-load users without duplicate checks, sorting the indexes once."""
+        for user in users:
+            self._add(user)
+            self.order.append((user["created_at"], user["id"]))
+        self.order.sort()
+        self.search_index.add_many((user["id"], user["search_keys"]) for user in users)
+
+    async def update_password(self, user_id, hashed_password):
+        self.by_id[user_id].update(password=hashed_password, updated_at=datetime.utcnow())
+
+    async def record_logins(self, events):
+        for event in events:
+            user = self.by_id.get(event["user_id"])
+            if user is not None:
+                user["last_login_at"] = max(user.get("last_login_at", event["at"]), event["at"])
+            self.login_events.append(dict(event))
+        return {}
+
+    def find_page(self, user_type=None, created_after=None, created_before=None,
+                  after=None, limit=None, batch_size=500):
+        start = 0
+        if created_after is not None:
+            start = bisect_left(self.order, (created_after,))
+        if after is not None:
+            start = max(start, bisect_right(self.order, after))
+        rows = []
+        for position in range(start, len(self.order)):
+            if limit is not None and len(rows) >= limit:
+                break
+            created_at, user_id = self.order[position]
+            if created_before is not None and created_at >= created_before:
+                break
+            user = self.by_id[user_id]
+            if user_type is None or user["user_type"] == user_type:
+                rows.append(_list_fields(user))
+        return _MemoryCursor(rows)
+
+    def search(self, query, user_type=None, after=None, limit=None, batch_size=500):
+        terms = sorted(search.query_terms(query), key=self.search_index.count)
+        candidates = self.search_index.count(terms[0])
+        if limit is not None and candidates * candidates > limit * len(self.order):
+            # A prefix this common fills a page within about limit * n /
+            # candidates users in page order, fewer than it has matches to sort
+            start = bisect_right(self.order, after) if after is not None else 0
+            rows = []
+            for position in range(start, len(self.order)):
+                if len(rows) >= limit:
+                    break
+                user = self.by_id[self.order[position][1]]
+                if user_type is not None and user["user_type"] != user_type:
+                    continue
+                if search.matches(terms, user["search_keys"]):
+                    rows.append(_list_fields(user))
+            return _MemoryCursor(rows)
+        # Scan the shortest run of keys and filter on the other terms
+        found = (self.by_id[user_id] for user_id in self.search_index.lookup(terms[0]))
+        rows = [
+            user for user in found
+            if (user_type is None or user["user_type"] == user_type)
+            and (after is None or (user["created_at"], user["id"]) > after)
+            and search.matches(terms[1:], user["search_keys"])
+        ]
+        key = lambda user: (user["created_at"], user["id"])
+        rows = heapq.nsmallest(limit, rows, key=key) if limit is not None else sorted(rows, key=key)
+        return _MemoryCursor([_list_fields(user) for user in rows])
+
+    async def count_by_user_type(self):
+        return dict(self.type_counts)
+
+    async def rebuild_user_counts(self):
+        self.materialized_counts = dict(self.type_counts)
+        return dict(self.materialized_counts)
+
+    async def ensure_user_counts(self):
+        if self.materialized_counts is not None:
+            return False
+        await self.rebuild_user_counts()
+        return True
+
+    async def increment_user_count(self, user_type, amount=1):
+        if self.materialized_counts is not None:
+            self.materialized_counts[user_type] = self.materialized_counts.get(user_type, 0) + amount
+
+    async def read_user_counts(self):
+        return dict(self.materialized_counts or {})
+
+    async def read_users_version(self):
+        return self.version
+
+    async def watch(self):
+        yield
+        while True:
+            # One event per round of changes, shared by every watcher
+            if self._changed is None:
+                self._changed = asyncio.Event()
+            await self._changed.wait()
+            yield
+
+
+ENGINES = ("mongo", "memory")
+
+_client = None
+_store = None
+
+
+def connect(url: str = None, engine: str = None, **pool_options) -> UserStore:
+    """Open the configured storage engine for this process.
+
+    For Mongo this creates the per-process Motor client and its connection
+    pool; it is called from the FastAPI lifespan so each worker process owns
+    its own pool, created on the event loop that will use it. ``url`` and
+    ``engine`` default to the config read at call time, so launchers such
+    as the benchmarks can choose them.
+
+    Mongo calls go through a :class:`resilience.GuardedUserStore` (timeouts
+    and a circuit breaker). With ``CHAOS_ENABLED`` the engine is wrapped in
+    a :class:`chaos.ChaosUserStore` first, and guarded whatever the engine.
+    """
+    global _client
+    engine = engine or config.STORAGE_ENGINE
+    if engine not in ENGINES:
+        raise ValueError(f"Unknown storage engine: {engine!r}")
+    if engine == "memory":
+        store = MemoryUserStore()
+    else:
+        from motor.motor_asyncio import AsyncIOMotorClient
+        from mongostore import MongoCommandListener, MongoPoolListener, MongoUserStore
+
+        options = {
+            "maxPoolSize": config.MONGO_MAX_POOL_SIZE,
+            "minPoolSize": config.MONGO_MIN_POOL_SIZE,
+            "maxIdleTimeMS": config.MONGO_MAX_IDLE_TIME_MS,
+            "waitQueueTimeoutMS": config.MONGO_WAIT_QUEUE_TIMEOUT_MS,
+            "serverSelectionTimeoutMS": config.MONGO_SERVER_SELECTION_TIMEOUT_MS,
+            "connectTimeoutMS": config.MONGO_CONNECT_TIMEOUT_MS,
+            "socketTimeoutMS": config.MONGO_SOCKET_TIMEOUT_MS,
+            "event_listeners": [MongoCommandListener(), MongoPoolListener()],
+        }
+        options.update(pool_options)
+        _client = AsyncIOMotorClient(url or config.MONGO_URL, **options)
+        db = _client[config.MONGO_DB_NAME]
+        store = MongoUserStore(_client, db.users, db.stats, db.login_events)
+    if config.CHAOS_ENABLED:
+        from chaos import ChaosUserStore
+
+        store = ChaosUserStore(store)
+    if engine == "mongo" or config.CHAOS_ENABLED:
+        from resilience import GuardedUserStore
+
+        store = GuardedUserStore(store)
+    return install(store)
+
+
+def install(store: UserStore) -> UserStore:
+    """Serve a pre-built ``store``, e.g. a seeded MemoryUserStore in tests."""
+    global _store
+    _store = store
+    return store
+
+
+def close():
+    global _client, _store
+    if _client is not None:
+        _client.close()
+    _client = None
+    _store = None
+
+
+def get_user_store() -> UserStore:
+    if _store is None:
+        raise RuntimeError("Database is not connected; storage.connect() must run at startup")
+    return _store
@@ -0,0 +1,112 @@
+"""JWT encoding and verification behind a pluggable codec.
+
+``pyjwt`` (PyJWT, with ``cryptography`` for asymmetric algorithms) is the
+default; ``jose`` keeps the previous python-jose implementation available.
+Verified tokens are cached by their SHA-256 digest until they expire, so a
+client re-sending the same token skips signature verification.
+"""
+import hashlib
+import time
+
+import config
+import metrics
+from cache import TTLCache
+from metrics import JWT_LATENCY
+
+
+class TokenError(Exception):
+    """The token is malformed, has a bad signature or has expired."""
+
+
+class PyJWTCodec:
+    name = "pyjwt"
+
+    def __init__(self, secret: str, algorithm: str):
+        import jwt
+
+        self._jwt = jwt
+        self.secret = secret
+        self.algorithm = algorithm
+
+    def encode(self, claims: dict) -> str:
+        return self._jwt.encode(claims, self.secret, algorithm=self.algorithm)
+
+    def decode(self, token: str) -> dict:
+        try:
+            return self._jwt.decode(token, self.secret, algorithms=[self.algorithm])
+        except self._jwt.PyJWTError as e:
+            raise TokenError(str(e)) from e
+
+
+class JoseCodec:
+    name = "jose"
+
+    def __init__(self, secret: str, algorithm: str):
+        from jose import JWTError, jwt
+
+        self._jwt = jwt
+        self._error = JWTError
+        self.secret = secret
+        self.algorithm = algorithm
+
+    def encode(self, claims: dict) -> str:
+        return self._jwt.encode(claims, self.secret, algorithm=self.algorithm)
+
+    def decode(self, token: str) -> dict:
+        try:
+            return self._jwt.decode(token, self.secret, algorithms=[self.algorithm])
+        except self._error as e:
+            raise TokenError(str(e)) from e
+
+
+CODECS = {codec.name: codec for codec in (PyJWTCodec, JoseCodec)}
+
+
+class TokenService:
+    def __init__(self, codec, cache: TTLCache = None, clock=time.time):
+        self.codec = codec
+        self.cache = cache
+        self._clock = clock
+
+    def encode(self, claims: dict) -> str:
+        with metrics.timed("jwt", JWT_LATENCY, operation="encode"):
+            return self.codec.encode(claims)
+
+    def decode(self, token: str) -> dict:
+        key = None
+        if self.cache is not None:
+            key = hashlib.sha256(token.encode()).digest()
+            payload = self.cache.get(key)
+            # exp is re-checked: the cache clock is monotonic, exp is wall time
+            if payload is not None and payload.get("exp", float("inf")) > self._clock():
+                return payload
+        with metrics.timed("jwt", JWT_LATENCY, operation="decode"):
+            payload = self.codec.decode(token)
+        if key is not None:
+            ttl = self.cache.ttl
+            if "exp" in payload:
+                ttl = min(ttl, payload["exp"] - self._clock())
+            self.cache.set(key, payload, ttl=ttl)
+        return payload
+
+
+def build_token_service(backend: str = config.JWT_BACKEND, cache_size: int = config.TOKEN_CACHE_SIZE,
+                        cache_ttl: float = config.TOKEN_CACHE_TTL_SECONDS) -> TokenService:
+    if backend not in CODECS:
+        raise ValueError(f"Unknown JWT backend: {backend!r}")
+    codec = CODECS[backend](config.SECRET_KEY, config.ALGORITHM)
+    cache = TTLCache(maxsize=cache_size, ttl=cache_ttl) if cache_size > 0 else None
+    return TokenService(codec, cache)
+
+
+_service = None
+
+
+def get_token_service() -> TokenService:
+    global _service
+    if _service is None:
+        _service = build_token_service()
+    return _service
+
+
+metrics.register_cache("token", lambda: _service.cache if _service is not None else None)
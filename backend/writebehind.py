@@ -0,0 +1,192 @@
+"""Write-behind batching of user inserts and login audit events.
+
+Producers hand writes to a :class:`BatchQueue`; one flusher task per queue
+writes them in batches. A batch goes out when it is full, or ``max_delay``
+after its first item; with ``max_delay=0`` the queue group-commits, writing
+whatever accumulated while the previous batch was in flight. At most
+``max_pending`` items are buffered: beyond that, producers wait, which
+pushes back on callers when the database falls behind. Closing drains the
+queue.
+"""
+import asyncio
+import logging
+import time
+
+import config
+import metrics
+
+logger = logging.getLogger("jobportal.write_behind")
+
+WRITE_BEHIND_ITEMS = metrics.REGISTRY.register(metrics.Counter(
+    "write_behind_items_total", "Items written through a write-behind queue", ("queue",)))
+WRITE_BEHIND_BATCH_SIZE = metrics.REGISTRY.register(metrics.Histogram(
+    "write_behind_batch_size", "Items per batch write", ("queue",),
+    buckets=(1, 2, 5, 10, 25, 50, 100, 250, 500, 1000)))
+WRITE_BEHIND_FLUSH = metrics.REGISTRY.register(metrics.Histogram(
+    "write_behind_flush_seconds", "Time to write one batch", ("queue",)))
+WRITE_BEHIND_BACKPRESSURE = metrics.REGISTRY.register(metrics.Counter(
+    "write_behind_backpressure_total", "Producers that waited for room in a full queue", ("queue",)))
+WRITE_BEHIND_FAILURES = metrics.REGISTRY.register(metrics.Counter(
+    "write_behind_failures_total", "Batch writes that raised; fire-and-forget items are retried", ("queue",)))
+
+
+class WriteFailed(Exception):
+    """A batched item was rejected by the database."""
+
+
+class BatchQueue:
+    """Buffers items for ``write(items) -> {index: error}`` and flushes in batches."""
+
+    def __init__(self, name: str, write, batch_size: int, max_delay: float, max_pending: int,
+                 retry_delay: float = 1.0):
+        self.name = name
+        self.write = write
+        self.batch_size = batch_size
+        self.max_delay = max_delay
+        self.max_pending = max_pending
+        self.retry_delay = retry_delay
+        self._pending = []
+        self._space = asyncio.Semaphore(max_pending)
+        self._wakeup = asyncio.Event()
+        self._full = asyncio.Event()
+        self._closing = False
+        self._task = asyncio.create_task(self._run())
+
+    def __len__(self):
+        return len(self._pending)
+
+    async def put(self, item, wait: bool = False):
+        """Queue ``item``; with ``wait``, return once it is written (or raise)."""
+        if self._space.locked():
+            WRITE_BEHIND_BACKPRESSURE.inc(queue=self.name)
+        await self._space.acquire()
+        future = asyncio.get_running_loop().create_future() if wait else None
+        self._pending.append((item, future))
+        self._wakeup.set()
+        if len(self._pending) >= self.batch_size:
+            self._full.set()
+        if future is not None:
+            await future
+
+    async def _run(self):
+        while True:
+            await self._wakeup.wait()
+            if not self._pending:
+                if self._closing:
+                    return
+                self._wakeup.clear()
+                continue
+            if self.max_delay and len(self._pending) < self.batch_size and not self._closing:
+                try:
+                    await asyncio.wait_for(self._full.wait(), self.max_delay)
+                except asyncio.TimeoutError:
+                    pass
+            batch, self._pending = self._pending[:self.batch_size], self._pending[self.batch_size:]
+            if len(self._pending) < self.batch_size:
+                self._full.clear()
+            await self._flush(batch)
+
+    async def _flush(self, batch):
+        started = time.perf_counter()
+        try:
+            failed = await self.write([item for item, _ in batch])
+        except Exception as e:
+            WRITE_BEHIND_FAILURES.inc(queue=self.name)
+            # Waiting callers get the error; nobody is waiting for the rest, so keep them
+            retry = [(item, future) for item, future in batch if future is None]
+            for item, future in batch:
+                if future is None:
+                    continue
+                # A cancelled caller's future is already done; its slot is freed all the same
+                if not future.done():
+                    future.set_exception(e)
+                self._space.release()
+            if retry:
+                logger.warning("%s: batch of %d failed, retrying in %.1fs: %s",
+                               self.name, len(batch), self.retry_delay, e)
+                self._pending[:0] = retry
+                await asyncio.sleep(self.retry_delay)
+            return
+        WRITE_BEHIND_FLUSH.observe(time.perf_counter() - started, queue=self.name)
+        WRITE_BEHIND_BATCH_SIZE.observe(len(batch), queue=self.name)
+        WRITE_BEHIND_ITEMS.inc(len(batch), queue=self.name)
+        for index, (item, future) in enumerate(batch):
+            error = failed.get(index)
+            if error is not None and not isinstance(error, Exception):
+                error = WriteFailed(error)
+            if future is None:
+                if error is not None:
+                    logger.warning("%s: item dropped by the database: %s", self.name, error)
+            elif not future.done():
+                if error is None:
+                    future.set_result(None)
+                else:
+                    future.set_exception(error)
+            self._space.release()
+
+    async def close(self, timeout: float):
+        """Write everything still buffered, giving up after ``timeout`` seconds."""
+        self._closing = True
+        self._wakeup.set()
+        self._full.set()
+        try:
+            await asyncio.wait_for(asyncio.shield(self._task), timeout)
+        except asyncio.TimeoutError:
+            logger.error("%s: drain timed out, %d items not written", self.name, len(self._pending))
+            self._task.cancel()
+
+    def stats(self) -> dict:
+        return {"pending": len(self._pending), "max_pending": self.max_pending}
+
+
+class WriteBehind:
+    """The API's queues: user inserts (callers wait) and login events (they don't)."""
+
+    def __init__(self, store, batch_size: int = config.WRITE_BEHIND_BATCH_SIZE,
+                 max_pending: int = config.WRITE_BEHIND_MAX_PENDING,
+                 signup_delay: float = config.SIGNUP_FLUSH_MS / 1000.0,
+                 login_delay: float = config.LOGIN_AUDIT_FLUSH_MS / 1000.0):
+        self.users = BatchQueue("users", store.insert_many, batch_size, signup_delay, max_pending)
+        self.logins = BatchQueue("logins", store.record_logins, batch_size, login_delay, max_pending)
+
+    async def insert_user(self, user: dict):
+        """Insert ``user`` in the next batch; raises DuplicateEmailError like ``store.insert``."""
+        await self.users.put(user, wait=True)
+
+    async def record_login(self, event: dict):
+        """Queue a login event; waits only while the queue is full."""
+        await self.logins.put(event)
+
+    async def close(self, timeout: float):
+        await asyncio.gather(self.users.close(timeout), self.logins.close(timeout))
+
+    def stats(self) -> dict:
+        return {"users": self.users.stats(), "logins": self.logins.stats()}
+
+
+metrics.REGISTRY.register(metrics.CallbackMetric(
+    "write_behind_pending", "Items buffered in a write-behind queue",
+    lambda: [] if _writer is None else [
+        ({"queue": queue.name}, len(queue)) for queue in (_writer.users, _writer.logins)
+    ]))
+
+_writer = None
+
+
+async def start(store) -> WriteBehind:
+    global _writer
+    _writer = WriteBehind(store)
+    return _writer
+
+
+async def shutdown(timeout: float = config.WRITE_BEHIND_DRAIN_TIMEOUT_SECONDS):
+    global _writer
+    if _writer is not None:
+        await _writer.close(timeout)
+    _writer = None
+
+
+def get_write_behind() -> WriteBehind:
+    if _writer is None:
+        raise RuntimeError("Write-behind queues are not running; writebehind.start() must run at startup")
+    return _writer
@@ -1,3 +1,4 @@
+import os
 import requests
 import random
 import string
@@ -6,7 +7,10 @@ from datetime import datetime
 
 class JobPortalAPITest:
     def __init__(self):
-        self.base_url = "https://6f68fbd5-ce75-4ac3-a0c7-a15d5e146200.preview.emergentagent.com"
+        # Point at a local server (e.g. STORAGE_ENGINE=memory python manage.py serve) to run offline
+        self.base_url = os.environ.get(
+            "BACKEND_URL", "https://6f68fbd5-ce75-4ac3-a0c7-a15d5e146200.preview.emergentagent.com"
+        )
         self.token = None
         # Generate random test data
         self.random_suffix = ''.join(random.choices(string.ascii_lowercase + string.digits, k=8))
@@ -17,7 +17,40 @@ function App() {
     }
   }, []);
 
-  const fetchUserProfile = async (token) => {
+  const storeTokens = (data) => {
+    localStorage.setItem('token', data.access_token);
+    if (data.refresh_token) {
+      localStorage.setItem('refreshToken', data.refresh_token);
+    }
+  };
+
+  const clearTokens = () => {
+    localStorage.removeItem('token');
+    localStorage.removeItem('refreshToken');
+  };
+
+  // Trade the refresh token for a new access token instead of signing in again
+  const refreshAccessToken = async () => {
+    const refreshToken = localStorage.getItem('refreshToken');
+    if (!refreshToken) {
+      return null;
+    }
+    const response = await fetch(`${backendUrl}/api/token/refresh`, {
+      method: 'POST',
+      headers: {
+        'Content-Type': 'application/json',
+      },
+      body: JSON.stringify({ refresh_token: refreshToken }),
+    });
+    if (!response.ok) {
+      return null;
+    }
+    const data = await response.json();
+    storeTokens(data);
+    return data.access_token;
+  };
+
+  const fetchUserProfile = async (token, retried = false) => {
     try {
       const response = await fetch(`${backendUrl}/api/profile`, {
         headers: {
@@ -27,12 +60,19 @@ function App() {
       if (response.ok) {
         const user = await response.json();
         setCurrentUser(user);
+      } else if (response.status === 401 && !retried) {
+        const newToken = await refreshAccessToken();
+        if (newToken) {
+          await fetchUserProfile(newToken, true);
+        } else {
+          clearTokens();
+        }
       } else {
-        localStorage.removeItem('token');
+        clearTokens();
       }
     } catch (error) {
       console.error('Error fetching profile:', error);
-      localStorage.removeItem('token');
+      clearTokens();
     }
   };
 
@@ -54,7 +94,7 @@ function App() {
       const data = await response.json();
       
       if (response.ok) {
-        localStorage.setItem('token', data.access_token);
+        storeTokens(data);
         setCurrentUser(data.user);
         setShowSignIn(false);
         setShowSignUp(false);
@@ -68,7 +108,17 @@ function App() {
   };
 
   const handleLogout = () => {
-    localStorage.removeItem('token');
+    const refreshToken = localStorage.getItem('refreshToken');
+    if (refreshToken) {
+      fetch(`${backendUrl}/api/logout`, {
+        method: 'POST',
+        headers: {
+          'Content-Type': 'application/json',
+        },
+        body: JSON.stringify({ refresh_token: refreshToken }),
+      }).catch((error) => console.error('Logout error:', error));
+    }
+    clearTokens();
     setCurrentUser(null);
   };
 
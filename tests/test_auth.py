@@ -0,0 +1,118 @@
+import asyncio
+
+import server
+import sessions
+import storage
+
+from tests.conftest import auth, signup
+
+
+def test_signup_signin_and_profile(client):
+    created = signup(client)
+    assert created["user"]["email"] == "alice@example.com"
+    assert created["refresh_token"]
+
+    response = client.post("/api/signin", json={"email": "alice@example.com", "password": "pw-123456"})
+    assert response.status_code == 200
+    profile = client.get("/api/profile", headers=auth(response.json()))
+    assert profile.status_code == 200
+    assert profile.json()["name"] == "Alice Smith"
+    assert "password" not in profile.json()
+
+
+def test_duplicate_email_is_rejected(client):
+    signup(client)
+    response = client.post("/api/signup", json={
+        "name": "Other", "email": "alice@example.com", "password": "x", "user_type": "applicant",
+    })
+    assert response.status_code == 400
+    assert response.json()["detail"] == "Email already registered"
+
+
+def test_invalid_user_type_is_rejected(client):
+    response = client.post("/api/signup", json={
+        "name": "Bob", "email": "bob@example.com", "password": "x", "user_type": "boss",
+    })
+    assert response.status_code == 400
+
+
+def test_wrong_password_and_bad_token(client):
+    signup(client)
+    response = client.post("/api/signin", json={"email": "alice@example.com", "password": "nope"})
+    assert response.status_code == 401
+    response = client.get("/api/profile", headers={"Authorization": "Bearer junk"})
+    assert response.status_code == 401
+    assert response.headers["www-authenticate"] == "Bearer"
+
+
+def test_principal_written_during_its_lookup_is_not_cached(client):
+    created = signup(client)
+    user_id = created["user"]["id"]
+    store = storage.get_user_store()
+
+    class RacingStore:
+        async def find_by_id(self, user_id):
+            user = await store.find_by_id(user_id)
+            # The password changes while this lookup is in flight
+            server.invalidate_principal(user_id)
+            return user
+
+    server.principal_cache.clear()
+    principal = asyncio.run(server.load_principal(RacingStore(), user_id))
+    assert principal.id == user_id
+    assert server.principal_cache.get(user_id) is None
+
+
+def test_credentials_exception_is_not_shared():
+    # A shared instance would accumulate a traceback entry on every raise
+    first, second = server.credentials_exception(), server.credentials_exception()
+    assert first is not second
+    assert first.__traceback__ is None
+
+
+def test_refresh_rotates_and_logout_revokes(client):
+    created = signup(client)
+    response = client.post("/api/token/refresh", json={"refresh_token": created["refresh_token"]})
+    assert response.status_code == 200
+    rotated = response.json()
+    assert rotated["user"]["id"] == created["user"]["id"]
+    assert rotated["refresh_token"] != created["refresh_token"]
+
+    assert client.post("/api/logout", json={"refresh_token": rotated["refresh_token"]}).status_code == 200
+    response = client.post("/api/token/refresh", json={"refresh_token": rotated["refresh_token"]})
+    assert response.status_code == 401
+
+
+def test_concurrent_refresh_within_grace_keeps_the_session(client):
+    created = signup(client)
+    first = client.post("/api/token/refresh", json={"refresh_token": created["refresh_token"]})
+    # A second tab presenting the same token moments later
+    second = client.post("/api/token/refresh", json={"refresh_token": created["refresh_token"]})
+    assert first.status_code == second.status_code == 200
+    for response in (first, second):
+        token = response.json()["refresh_token"]
+        assert client.post("/api/token/refresh", json={"refresh_token": token}).status_code == 200
+
+
+def test_reuse_after_grace_revokes_the_family(client):
+    created = signup(client)
+    service = sessions.get_session_service()
+    service.reuse_grace = service.reuse_grace * 0
+    rotated = client.post("/api/token/refresh", json={"refresh_token": created["refresh_token"]}).json()
+
+    reused = client.post("/api/token/refresh", json={"refresh_token": created["refresh_token"]})
+    assert reused.status_code == 401
+    # The legitimate holder's newer token went with the family
+    response = client.post("/api/token/refresh", json={"refresh_token": rotated["refresh_token"]})
+    assert response.status_code == 401
+
+
+def test_signup_rate_limit(client):
+    limit, _ = server.get_rate_limiter().rules["signup_ip"]
+    for i in range(limit):
+        signup(client, email=f"user{i}@example.com")
+    response = client.post("/api/signup", json={
+        "name": "Late", "email": "late@example.com", "password": "x", "user_type": "hirer",
+    })
+    assert response.status_code == 429
+    assert int(response.headers["retry-after"]) >= 1
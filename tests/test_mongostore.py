@@ -0,0 +1,48 @@
+import asyncio
+from datetime import datetime
+
+import pytest
+
+
+def test_committed_inserts_survive_a_failed_version_bump():
+    mongomock_motor = pytest.importorskip("mongomock_motor")
+    from pymongo.errors import AutoReconnect
+
+    from mongostore import MongoUserStore
+
+    class FailingStats:
+        async def update_one(self, *args, **kwargs):
+            raise AutoReconnect("stats primary stepped down")
+
+    def user(i):
+        return {"id": str(i), "name": f"U{i}", "email": f"u{i}@example.com", "user_type": "hirer",
+                "created_at": datetime(2024, 1, 1, second=i)}
+
+    async def main():
+        db = mongomock_motor.AsyncMongoMockClient().jobportal
+        store = MongoUserStore(None, db.users, FailingStats())
+        await store.insert(user(0))
+        failed = await store.insert_many([user(1), user(2)])
+        return failed, await db.users.count_documents({})
+
+    assert asyncio.run(main()) == ({}, 3)
+
+
+def test_worker_starts_keep_live_user_counts():
+    mongomock_motor = pytest.importorskip("mongomock_motor")
+    from mongostore import MongoUserStore
+    from stats import StatsService
+
+    async def main():
+        db = mongomock_motor.AsyncMongoMockClient().jobportal
+        store = MongoUserStore(None, db.users, db.stats)
+        await store.insert({"id": "0", "name": "A", "email": "a@example.com", "user_type": "hirer",
+                            "created_at": datetime(2024, 1, 1)})
+        await StatsService(store, "counters").start()
+        # Another worker counts a signup; this one's row is not visible yet
+        await store.increment_user_count("applicant")
+        # Then the next worker of a rolling deploy starts
+        await StatsService(store, "counters").start()
+        return await store.read_user_counts()
+
+    assert asyncio.run(main()) == {"hirer": 1, "applicant": 1}
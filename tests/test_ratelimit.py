@@ -0,0 +1,63 @@
+import asyncio
+
+import pytest
+
+from ratelimit import MemoryBackend, MemorySharedStore, RateLimiter, RateLimitExceeded, SlidingWindowBackend, parse_rule
+from tests.conftest import FakeClock
+
+
+def test_parse_rule():
+    assert parse_rule("20/60") == (20, 60.0)
+
+
+def test_token_bucket_refills_over_time():
+    clock = FakeClock()
+    backend = MemoryBackend(clock=clock)
+
+    async def main():
+        assert [await backend.hit("k", 2, 10) for _ in range(2)] == [0.0, 0.0]
+        assert await backend.hit("k", 2, 10) == pytest.approx(5.0)
+        assert await backend.hit("other", 2, 10) == 0.0
+        clock.now = 5
+        return await backend.hit("k", 2, 10)
+
+    assert asyncio.run(main()) == 0.0
+
+
+def test_token_bucket_bounds_its_keys():
+    backend = MemoryBackend(max_keys=2)
+
+    async def main():
+        for key in "abc":
+            await backend.hit(key, 1, 60)
+
+    asyncio.run(main())
+    assert list(backend._buckets) == ["b", "c"]
+
+
+def test_sliding_window_counts_the_previous_window():
+    clock = FakeClock(100.0)
+    backend = SlidingWindowBackend(MemorySharedStore(clock=clock), clock=clock)
+
+    async def main():
+        assert [await backend.hit("k", 3, 10) for _ in range(3)] == [0.0, 0.0, 0.0]
+        assert await backend.hit("k", 3, 10) == pytest.approx(10.0)
+        # Halfway through the next window, half of the previous one still counts
+        clock.now = 115.0
+        return await backend.hit("k", 3, 10)
+
+    assert asyncio.run(main()) == 0.0
+
+
+def test_limiter_raises_with_retry_after():
+    limiter = RateLimiter(MemoryBackend(clock=FakeClock()), {"signin_email": (1, 60)})
+
+    async def main():
+        await limiter.check("signin_email", "a@example.com")
+        with pytest.raises(RateLimitExceeded) as raised:
+            await limiter.check("signin_email", "a@example.com")
+        return raised.value
+
+    exc = asyncio.run(main())
+    assert exc.rule == "signin_email"
+    assert exc.retry_after == pytest.approx(60)
@@ -0,0 +1,199 @@
+import asyncio
+import time
+
+import pytest
+
+import resilience
+import sessions
+import storage
+from chaos import ChaosUserStore, InjectedFault
+from resilience import CircuitBreaker, GuardedUserStore
+from storage import DatabaseUnavailable, DuplicateEmailError, MemoryUserStore
+from tests.conftest import FakeClock, auth, signup
+
+
+def test_breaker_opens_after_consecutive_failures_and_recovers():
+    clock = FakeClock()
+    breaker = CircuitBreaker("test", threshold=3, reset_timeout=5, clock=clock)
+    for _ in range(2):
+        breaker.before_call()
+        breaker.failure()
+    breaker.before_call()
+    breaker.success()
+    assert breaker.failures == 0
+
+    for _ in range(3):
+        breaker.before_call()
+        breaker.failure()
+    assert breaker.state == "open"
+    with pytest.raises(DatabaseUnavailable) as raised:
+        breaker.before_call()
+    assert raised.value.retry_after == 5
+
+    clock.now = 5
+    breaker.before_call()
+    assert breaker.state == "half_open"
+    # Only one trial call at a time
+    with pytest.raises(DatabaseUnavailable):
+        breaker.before_call()
+    breaker.success()
+    assert breaker.state == "closed"
+
+
+def test_failed_trial_reopens_the_breaker():
+    clock = FakeClock()
+    breaker = CircuitBreaker("test", threshold=1, reset_timeout=5, clock=clock)
+    breaker.before_call()
+    breaker.failure()
+    clock.now = 6
+    breaker.before_call()
+    breaker.failure()
+    assert breaker.state == "open"
+    assert breaker.opened == 2
+    with pytest.raises(DatabaseUnavailable):
+        breaker.before_call()
+
+
+def chaotic_store(**settings):
+    chaos = ChaosUserStore(MemoryUserStore(), latency=0, jitter=0, error_rate=0, stall_rate=0, seed=1)
+    chaos.configure(**settings)
+    return chaos, GuardedUserStore(chaos, timeout=0.05, breaker=CircuitBreaker("test", threshold=2, reset_timeout=60))
+
+
+def test_stalled_calls_time_out_then_fail_fast():
+    chaos, store = chaotic_store(stall_rate=1.0, stall_seconds=10)
+
+    async def main():
+        for _ in range(2):
+            started = time.perf_counter()
+            with pytest.raises(DatabaseUnavailable):
+                await store.find_by_email("a@example.com")
+            assert time.perf_counter() - started < 1
+        assert store.breaker.state == "open"
+        with pytest.raises(DatabaseUnavailable):
+            await store.read_users_version()
+
+    asyncio.run(main())
+
+
+def test_transient_errors_count_but_rejections_do_not():
+    chaos, store = chaotic_store()
+
+    async def main():
+        user = {"id": "1", "name": "A", "email": "a@example.com", "user_type": "hirer", "created_at": 0}
+        await store.insert(user)
+        for _ in range(3):
+            with pytest.raises(DuplicateEmailError):
+                await store.insert(dict(user))
+        assert store.breaker.state == "closed"
+
+        chaos.configure(error_rate=1.0)
+        for _ in range(2):
+            with pytest.raises(DatabaseUnavailable) as raised:
+                await store.find_by_email("a@example.com")
+            assert isinstance(raised.value.__cause__, InjectedFault)
+        assert store.breaker.state == "open"
+
+    asyncio.run(main())
+
+
+def test_request_deadline_caps_calls_without_blaming_the_database():
+    chaos, store = chaotic_store(latency=0.2)
+    store.timeout = 1.0
+
+    async def main():
+        token = resilience._deadline.set(time.monotonic() + 0.05)
+        try:
+            with pytest.raises(DatabaseUnavailable, match="deadline"):
+                await store.find_by_email("a@example.com")
+        finally:
+            resilience._deadline.reset(token)
+        assert store.breaker.failures == 0
+
+    asyncio.run(main())
+
+
+def test_paused_deadline_excludes_other_waits():
+    async def main():
+        token = resilience._deadline.set(time.monotonic() + 0.05)
+        try:
+            with resilience.paused_deadline():
+                await asyncio.sleep(0.1)
+            return resilience.remaining()
+        finally:
+            resilience._deadline.reset(token)
+
+    assert asyncio.run(main()) > 0.03
+
+
+def test_call_timeout_gives_slow_bulk_writes_longer():
+    chaos, store = chaotic_store(latency=0.1)
+
+    async def main():
+        with resilience.call_timeout(1.0):
+            assert await store.insert_many([{"id": "1", "name": "A", "email": "a@example.com",
+                                             "user_type": "hirer", "created_at": 0}]) == {}
+        assert store.breaker.failures == 0
+        with pytest.raises(DatabaseUnavailable, match="timed out"):
+            await store.find_by_email("a@example.com")
+
+    asyncio.run(main())
+
+
+def test_guarded_cursors():
+    chaos, store = chaotic_store()
+
+    async def main():
+        for i in range(3):
+            await store.insert({"id": str(i), "name": f"U{i}", "email": f"u{i}@example.com",
+                                "user_type": "hirer", "created_at": i})
+        listed = await store.find_page(limit=2).to_list(length=2)
+        streamed = [user async for user in store.find_page()]
+        chaos.configure(error_rate=1.0)
+        with pytest.raises(DatabaseUnavailable):
+            await store.search("u").to_list(length=10)
+        return listed, streamed
+
+    listed, streamed = asyncio.run(main())
+    assert [user["id"] for user in listed] == ["0", "1"]
+    assert [user["id"] for user in streamed] == ["0", "1", "2"]
+
+
+def test_other_collections_share_the_guard():
+    class StalledCollection:
+        async def find_one(self, query):
+            await asyncio.sleep(10)
+
+    chaos, store = chaotic_store()
+    session_store = sessions.MongoSessionStore(StalledCollection(), store.run)
+
+    async def main():
+        for _ in range(2):
+            started = time.perf_counter()
+            with pytest.raises(DatabaseUnavailable):
+                await session_store.find("digest")
+            assert time.perf_counter() - started < 1
+        # The users' breaker opened too: it is the same database
+        with pytest.raises(DatabaseUnavailable):
+            await store.find_by_email("a@example.com")
+
+    asyncio.run(main())
+
+
+def test_api_answers_503_while_the_database_is_down(client):
+    headers = auth(signup(client))
+    chaos = ChaosUserStore(storage.get_user_store(), latency=0, jitter=0, error_rate=1.0, stall_rate=0, seed=1)
+    storage.install(GuardedUserStore(chaos, timeout=0.5, breaker=CircuitBreaker("api", threshold=1)))
+    response = client.get("/api/users", headers=headers)
+    assert response.status_code == 503
+    assert int(response.headers["retry-after"]) >= 1
+
+
+def test_committed_signup_survives_a_failed_session_write(client, monkeypatch):
+    async def unavailable(user_id):
+        raise DatabaseUnavailable("database unavailable")
+
+    monkeypatch.setattr(sessions.get_session_service(), "create", unavailable)
+    created = signup(client)
+    assert created["refresh_token"] is None
+    assert client.get("/api/profile", headers=auth(created)).status_code == 200
@@ -0,0 +1,93 @@
+import asyncio
+from datetime import datetime, timedelta
+
+import pytest
+
+import search
+from cache import TTLCache
+from search import PrefixIndex
+from storage import MemoryUserStore
+
+
+def test_search_keys_normalise_like_queries():
+    assert search.search_keys("Zoë\tÉtoile  Smith", "Zoe@Example.com") == ["zoë", "étoile", "smith", "zoe@example.com"]
+    assert search.search_keys("Ann Ann", "ann@example.com") == ["ann", "ann@example.com"]
+    assert search.query_terms("  ÉTO  sm ") == ["éto", "sm"]
+
+
+def test_prefix_index_lookup():
+    index = PrefixIndex()
+    index.add("1", ["john", "smith", "john@example.com"])
+    index.add_many([("2", ["jane", "johnson"]), ("3", ["bob"])])
+    assert sorted(index.lookup("jo")) == ["1", "2"]
+    assert index.lookup("john@") == ["1"]
+    assert index.lookup("z") == []
+    assert index.count("j") == 4
+
+
+def test_memory_search_pages_common_prefixes_in_order():
+    store = MemoryUserStore()
+    store.load([{"id": str(i), "name": f"Jo{i} Smith" if i % 3 else f"Ann{i} Lee", "email": f"u{i}@example.com",
+                 "user_type": "hirer", "created_at": datetime(2024, 1, 1) + timedelta(seconds=i)}
+                for i in range(300)])
+
+    async def page(query, after=None):
+        return await store.search(query, after=after, limit=10).to_list(length=10)
+
+    async def main():
+        # "sm" matches two thirds of the users: common enough to walk in page order
+        first = await page("sm")
+        second = await page("sm", after=(first[-1]["created_at"], first[-1]["id"]))
+        # "ann1" is rarer and goes through the index
+        return first + second, await page("ann1 lee")
+
+    common, rare = asyncio.run(main())
+    assert [user["id"] for user in common] == [str(i) for i in range(300) if i % 3][:20]
+    assert [user["id"] for user in rare] == [str(i) for i in range(0, 300, 3) if str(i).startswith("1")][:10]
+
+
+def test_ttl_cache_expires_and_evicts():
+    now = [0.0]
+    cache = TTLCache(maxsize=2, ttl=10, clock=lambda: now[0])
+    cache.set("a", 1)
+    cache.set("b", 2)
+    assert cache.get("a") == 1
+    cache.set("c", 3)
+    # "b" was least recently used
+    assert cache.get("b") is None
+    now[0] = 11
+    assert cache.get("a") is None
+    assert cache.stats()["evictions"] == 1
+
+
+def test_ttl_cache_skips_fills_that_an_invalidation_overtook():
+    cache = TTLCache()
+    with cache.filling("a") as fill:
+        cache.invalidate("a")
+        fill("read before the write")
+    assert cache.get("a") is None
+    with cache.filling("a") as fill:
+        fill("fresh")
+    assert cache.get("a") == "fresh"
+    assert cache._fills == {}
+
+
+def test_mongo_backfill_matches_new_users():
+    mongomock_motor = pytest.importorskip("mongomock_motor")
+    from mongostore import MongoUserStore
+
+    async def main():
+        client = mongomock_motor.AsyncMongoMockClient()
+        db = client.jobportal
+        await db.users.insert_many([
+            {"id": "1", "name": "Zoë\tÉtoile", "email": "Zoe@example.com"},
+            # Keyed by the old server-side backfill, which lowercased ASCII only
+            {"id": "2", "name": "Émile Roy", "email": "emile@example.com", "search_keys": ["Émile", "roy"]},
+        ])
+        store = MongoUserStore(client, db.users, db.stats)
+        await store.ensure_indexes()
+        return {user["id"]: user["search_keys"] async for user in db.users.find({}, {"id": 1, "search_keys": 1})}
+
+    keys = asyncio.run(main())
+    assert keys["1"] == search.search_keys("Zoë\tÉtoile", "Zoe@example.com")
+    assert keys["2"] == search.search_keys("Émile Roy", "emile@example.com")
@@ -0,0 +1,118 @@
+import asyncio
+import time
+
+import httpx
+
+import resilience
+import server
+import storage
+from singleflight import SingleFlight
+
+
+def test_concurrent_calls_share_one_execution():
+    calls = []
+
+    async def load(key):
+        calls.append(key)
+        await asyncio.sleep(0.01)
+        return {"key": key}
+
+    async def main():
+        flight = SingleFlight("test", enabled=True)
+        results = await asyncio.gather(*(flight.do("a", load, "a") for _ in range(10)), flight.do("b", load, "b"))
+        return flight, results
+
+    flight, results = asyncio.run(main())
+    assert sorted(calls) == ["a", "b"]
+    assert all(result is results[0] for result in results[:10])
+    assert flight.stats()["coalesced"] == 9
+    assert flight.stats()["in_flight"] == 0
+
+
+def test_errors_reach_every_caller_and_are_not_cached():
+    attempts = 0
+
+    async def flaky():
+        nonlocal attempts
+        attempts += 1
+        await asyncio.sleep(0.01)
+        if attempts == 1:
+            raise ConnectionError("down")
+        return "ok"
+
+    async def main():
+        flight = SingleFlight("test", enabled=True)
+        first = await asyncio.gather(*(flight.do("k", flaky) for _ in range(3)), return_exceptions=True)
+        return first, await flight.do("k", flaky)
+
+    first, second = asyncio.run(main())
+    assert all(isinstance(result, ConnectionError) for result in first)
+    assert second == "ok"
+
+
+def test_cancelled_caller_does_not_cancel_the_shared_call():
+    async def slow():
+        await asyncio.sleep(0.02)
+        return 42
+
+    async def main():
+        flight = SingleFlight("test", enabled=True)
+        leader = asyncio.create_task(flight.do("k", slow))
+        await asyncio.sleep(0)
+        follower = asyncio.create_task(flight.do("k", slow))
+        await asyncio.sleep(0)
+        leader.cancel()
+        return await follower
+
+    assert asyncio.run(main()) == 42
+
+
+def test_shared_call_does_not_inherit_the_leaders_deadline():
+    seen = []
+
+    async def load():
+        seen.append(resilience.remaining())
+        return "ok"
+
+    async def main():
+        flight = SingleFlight("test", enabled=True)
+        token = resilience._deadline.set(time.monotonic() + 0.001)
+        try:
+            return await flight.do("k", load)
+        finally:
+            resilience._deadline.reset(token)
+
+    assert asyncio.run(main()) == "ok"
+    assert seen == [None]
+
+
+def test_profile_and_refresh_overlapping_get_their_own_types():
+    # Both look a user up by id while the lookup is slow; neither may get the other's result
+    async def main():
+        app = server.app
+        server.principal_cache.clear()
+        async with app.router.lifespan_context(app):
+            transport = httpx.ASGITransport(app=app)
+            async with httpx.AsyncClient(transport=transport, base_url="http://test") as http:
+                created = (await http.post("/api/signup", json={
+                    "name": "Slow Lookup", "email": "slow@example.com", "password": "pw", "user_type": "hirer",
+                })).json()
+                store = storage.get_user_store()
+                find_by_id = store.find_by_id
+
+                async def slow_find_by_id(user_id):
+                    await asyncio.sleep(0.05)
+                    return await find_by_id(user_id)
+
+                store.find_by_id = slow_find_by_id
+                server.principal_cache.clear()
+                headers = {"Authorization": f"Bearer {created['access_token']}"}
+                return await asyncio.gather(
+                    http.get("/api/profile", headers=headers),
+                    http.post("/api/token/refresh", json={"refresh_token": created["refresh_token"]}),
+                )
+
+    profile, refreshed = asyncio.run(main())
+    assert profile.status_code == 200, profile.text
+    assert refreshed.status_code == 200, refreshed.text
+    assert profile.json()["email"] == refreshed.json()["user"]["email"] == "slow@example.com"
@@ -0,0 +1,75 @@
+import asyncio
+from datetime import datetime
+
+import statsstream
+from stats import StatsService
+from statsstream import StatsBroadcaster
+from storage import MemoryUserStore
+
+
+def test_clients_share_refreshes_and_streams_expire(monkeypatch):
+    monkeypatch.setattr(statsstream, "TICK_SECONDS", 0.01)
+
+    async def main():
+        store = MemoryUserStore()
+        broadcaster = StatsBroadcaster(StatsService(store), store, interval=0.02, min_interval=0,
+                                       heartbeat=60, change_stream=False, max_age=0.3)
+        await broadcaster.start()
+
+        async def client():
+            return [frame async for frame in broadcaster.events()]
+
+        clients = [asyncio.create_task(client()) for _ in range(3)]
+        await asyncio.sleep(0.05)
+        await store.insert({"id": "1", "name": "A", "email": "a@example.com", "user_type": "hirer",
+                            "created_at": datetime(2024, 1, 1)})
+        # Every stream ends on its own after max_age, without stop()
+        frames = await asyncio.wait_for(asyncio.gather(*clients), 1)
+        stats = broadcaster.stats()
+        await broadcaster.stop()
+        return frames, stats
+
+    frames, stats = asyncio.run(main())
+    for client_frames in frames:
+        assert client_frames[0].startswith(b"retry: ")
+        events = [frame for frame in client_frames if frame.startswith(b"id: ")]
+        assert b'"total_users":0' in events[0]
+        assert b'"total_users":1' in events[-1]
+    assert stats["expired"] == 3
+    assert stats["clients"] == 0
+
+
+def test_publish_after_expiry_still_ends_the_stream(monkeypatch):
+    monkeypatch.setattr(statsstream, "TICK_SECONDS", 0.01)
+
+    async def main():
+        store = MemoryUserStore()
+        broadcaster = StatsBroadcaster(StatsService(store), store, heartbeat=60, change_stream=False, max_age=0.02)
+        stream = broadcaster.events()
+        await stream.__anext__()
+        housekeeping = asyncio.create_task(broadcaster._housekeeping())
+        await asyncio.sleep(0.05)
+        # A snapshot published before the client reads its end marker
+        broadcaster._publish({"total_users": 1})
+        try:
+            await asyncio.wait_for(stream.__anext__(), 1)
+        except StopAsyncIteration:
+            return True
+        finally:
+            housekeeping.cancel()
+        return False
+
+    assert asyncio.run(main())
+
+
+def test_full_broadcaster_rejects():
+    async def main():
+        store = MemoryUserStore()
+        broadcaster = StatsBroadcaster(StatsService(store), store, max_clients=1, change_stream=False)
+        stream = broadcaster.events()
+        await stream.__anext__()
+        full = broadcaster.full
+        await stream.aclose()
+        return full, broadcaster.full
+
+    assert asyncio.run(main()) == (True, False)
@@ -0,0 +1,137 @@
+import json
+
+import storage
+from storage import DatabaseUnavailable
+from tests.conftest import auth, signup
+
+
+def signup_many(client, count):
+    return [
+        signup(client, email=f"user{i}@example.com", name=f"User{i} Jones", user_type=("hirer", "applicant")[i % 2])
+        for i in range(count)
+    ]
+
+
+def test_list_pages_with_cursor(client):
+    headers = auth(signup_many(client, 5)[0])
+    first = client.get("/api/users", params={"limit": 2}, headers=headers).json()
+    assert [user["name"] for user in first["users"]] == ["User0 Jones", "User1 Jones"]
+    assert first["next_cursor"]
+
+    names = [user["name"] for user in first["users"]]
+    cursor = first["next_cursor"]
+    while cursor:
+        page = client.get("/api/users", params={"limit": 2, "cursor": cursor}, headers=headers).json()
+        names += [user["name"] for user in page["users"]]
+        cursor = page["next_cursor"]
+    assert names == [f"User{i} Jones" for i in range(5)]
+
+
+def test_list_filters_by_user_type_and_streams_ndjson(client):
+    headers = auth(signup_many(client, 4)[0])
+    page = client.get("/api/users", params={"user_type": "applicant"}, headers=headers).json()
+    assert {user["user_type"] for user in page["users"]} == {"applicant"}
+
+    response = client.get("/api/users", params={"format": "ndjson"}, headers=headers)
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+    rows = [json.loads(line) for line in response.text.splitlines()]
+    assert len(rows) == 4
+    assert "password" not in rows[0]
+
+
+def test_list_filters_by_aware_timestamps(client):
+    headers = auth(signup_many(client, 2)[0])
+    for format in ("json", "ndjson"):
+        params = {"created_after": "2000-01-01T00:00:00Z", "created_before": "2999-01-01T02:00:00+02:00",
+                  "format": format}
+        response = client.get("/api/users", params=params, headers=headers)
+        assert response.status_code == 200, response.text
+        assert "User1 Jones" in response.text
+    params = {"created_after": "2999-01-01T00:00:00+05:00"}
+    assert client.get("/api/users", params=params, headers=headers).json()["users"] == []
+
+
+def test_list_requires_auth(client):
+    assert client.get("/api/users").status_code in (401, 403)
+    assert client.get("/api/users", params={"cursor": "x"}, headers={"Authorization": "Bearer junk"}).status_code == 401
+
+
+def test_users_etag_changes_on_signup(client):
+    headers = auth(signup_many(client, 2)[0])
+    response = client.get("/api/users", headers=headers)
+    etag = response.headers["etag"]
+    cached = client.get("/api/users", headers={**headers, "If-None-Match": etag})
+    assert cached.status_code == 304
+
+    signup(client, email="new@example.com")
+    response = client.get("/api/users", headers={**headers, "If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.headers["etag"] != etag
+
+
+def test_search_matches_word_prefixes(client):
+    headers = auth(signup(client, email="john@example.com", name="John Smith"))
+    signup(client, email="jane@example.com", name="Jane Doe")
+    signup(client, email="zoe@example.com", name="Zoë\tÉtoile")
+
+    def names(query):
+        response = client.get("/api/users/search", params={"q": query}, headers=headers)
+        assert response.status_code == 200
+        return [user["name"] for user in response.json()["users"]]
+
+    assert names("jo sm") == ["John Smith"]
+    assert names("ja") == ["Jane Doe"]
+    assert names("jane@") == ["Jane Doe"]
+    assert names("ÉTO") == ["Zoë\tÉtoile"]
+    assert names("nobody") == []
+    assert client.get("/api/users/search", params={"q": "  "}, headers=headers).status_code == 400
+    assert client.get("/api/users/search", params={"q": "john s"}, headers=headers).status_code == 400
+
+
+def test_stats_count_by_user_type(client):
+    signup_many(client, 3)
+    stats = client.get("/api/stats").json()
+    assert stats == {"total_users": 3, "hirers": 2, "applicants": 1, "freelancers": 0}
+
+
+def test_bulk_import_is_admin_only(client):
+    headers = auth(signup(client))
+    body = '{"name":"A","email":"a@example.com","password":"p","user_type":"hirer"}\n'
+    assert client.post("/api/users/import", content=body, headers=headers).status_code == 403
+
+
+def test_bulk_import_reports_bad_rows(client):
+    headers = auth(signup(client, email="admin@example.com", name="Admin"))
+    body = b"\n".join([
+        b'{"name":"Imported One","email":"one@example.com","password":"p","user_type":"hirer"}',
+        b'{"name":"Dup","email":"admin@example.com","password":"p","user_type":"hirer"}',
+        b"not json",
+        b'\xff\xfe{"name":"Latin-1"}',
+        b'{"name":"Boss","email":"boss@example.com","password":"p","user_type":"boss"}',
+    ])
+    response = client.post("/api/users/import", content=body, headers=headers)
+    assert response.status_code == 200
+    report = response.json()
+    assert report["imported"] == 1
+    errors = {failure["row"]: failure["error"] for failure in report["failed"]}
+    assert errors[2] == "Email already registered"
+    assert errors[3].startswith("Invalid JSON")
+    assert errors[4].startswith("Invalid UTF-8")
+    assert "boss" in errors[5]
+
+    response = client.post("/api/signin", json={"email": "one@example.com", "password": "p"})
+    assert response.status_code == 200
+
+
+def test_bulk_import_reports_batches_the_database_refused(client, monkeypatch):
+    headers = auth(signup(client, email="admin@example.com", name="Admin"))
+
+    async def unavailable(users):
+        raise DatabaseUnavailable("database call timed out after 30s")
+
+    monkeypatch.setattr(storage.get_user_store(), "insert_many", unavailable)
+    body = '{"name":"One","email":"one@example.com","password":"p","user_type":"hirer"}\n'
+    response = client.post("/api/users/import", content=body, headers=headers)
+    assert response.status_code == 200
+    assert response.json()["imported"] == 0
+    assert response.json()["failed"][0]["error"].startswith("Database unavailable")
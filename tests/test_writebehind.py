@@ -0,0 +1,90 @@
+import asyncio
+from datetime import datetime
+
+import pytest
+
+from storage import DuplicateEmailError, MemoryUserStore
+from writebehind import BatchQueue, WriteBehind
+
+
+def test_concurrent_inserts_are_batched():
+    batches = []
+
+    async def write(items):
+        batches.append(list(items))
+        await asyncio.sleep(0.01)
+        return {}
+
+    async def main():
+        queue = BatchQueue("test", write, batch_size=10, max_delay=0, max_pending=100)
+        await asyncio.gather(*(queue.put(i, wait=True) for i in range(25)))
+        await queue.close(1)
+
+    asyncio.run(main())
+    assert sorted(item for batch in batches for item in batch) == list(range(25))
+    # The first write goes out alone; the rest group-commit behind it
+    assert len(batches) < 25
+
+
+def test_duplicate_fails_only_its_own_caller():
+    async def main():
+        store = MemoryUserStore()
+        writer = WriteBehind(store, batch_size=10, max_pending=100, signup_delay=0, login_delay=0)
+        users = [{"id": str(i), "name": f"U{i}", "email": "same@example.com" if i < 2 else f"u{i}@example.com",
+                  "user_type": "hirer", "created_at": datetime(2024, 1, 1, second=i)} for i in range(4)]
+        results = await asyncio.gather(*(writer.insert_user(user) for user in users), return_exceptions=True)
+        await writer.close(1)
+        return store, results
+
+    store, results = asyncio.run(main())
+    assert sum(isinstance(result, DuplicateEmailError) for result in results) == 1
+    assert len(store.by_id) == 3
+
+
+def test_fire_and_forget_items_are_retried_after_a_failure():
+    attempts = []
+
+    async def write(items):
+        attempts.append(list(items))
+        if len(attempts) == 1:
+            raise ConnectionError("down")
+        return {}
+
+    async def main():
+        queue = BatchQueue("test", write, batch_size=10, max_delay=0, max_pending=10, retry_delay=0.01)
+        await queue.put("event")
+        await queue.close(1)
+
+    asyncio.run(main())
+    assert attempts == [["event"], ["event"]]
+
+
+def test_failed_batch_frees_the_slots_of_cancelled_waiters():
+    async def write(items):
+        await asyncio.sleep(0.02)
+        raise ConnectionError("down")
+
+    async def main():
+        queue = BatchQueue("test", write, batch_size=10, max_delay=0, max_pending=3, retry_delay=0.01)
+        waiters = [asyncio.create_task(queue.put(i, wait=True)) for i in range(3)]
+        await asyncio.sleep(0.005)
+        for waiter in waiters:
+            waiter.cancel()
+        await asyncio.sleep(0.05)
+        # Every slot is free again: three more puts must not block
+        await asyncio.wait_for(asyncio.gather(*(queue.put(i) for i in range(3))), 0.5)
+
+    asyncio.run(main())
+
+
+def test_waiting_caller_gets_the_batch_error():
+    async def write(items):
+        raise ConnectionError("down")
+
+    async def main():
+        queue = BatchQueue("test", write, batch_size=10, max_delay=0, max_pending=10)
+        with pytest.raises(ConnectionError):
+            await queue.put("row", wait=True)
+        assert queue._space._value == 10
+
+    asyncio.run(main())